@@ -4,20 +4,44 @@ Query utility for GuacaMol Benchmark Database.
 
 Provides convenient functions to retrieve benchmark definitions
 and compare with our training configs.
+
+BenchmarkDB queries the SQLite file on every call. load_snapshot() reads the
+whole catalog once into immutable in-memory structures with the same read
+API. It opens the file with mode=ro&immutable=1, or builds the catalog from
+the shipped SQL scripts when the file has not been created. The snapshot
+also precompiles one ConfigValidator per benchmark, which
+validate_configs() uses to check a directory of configs in parallel.
 """
 
+import os
 import sqlite3
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from types import MappingProxyType
+from typing import List, Dict, Any, Mapping, NamedTuple, Optional, Tuple
 import json
 
+DEFAULT_DB_PATH = Path(__file__).parent / "guacamol_benchmarks.db"
+
+# Shipped scripts that build the database, in order (see init_db.sh)
+SQL_SCRIPTS = [
+    'schema.sql',
+    'populate_table3.sql',
+    'add_config_mappings.sql',
+    'populate_config_mappings.sql',
+    'populate_baseline_results.sql',
+]
+
 
 class BenchmarkDB:
     """Interface to GuacaMol benchmark database."""
 
     def __init__(self, db_path: str = None):
         if db_path is None:
-            db_path = Path(__file__).parent / "guacamol_benchmarks.db"
+            db_path = DEFAULT_DB_PATH
         self.db_path = db_path
         self.conn = sqlite3.connect(db_path)
         self.conn.row_factory = sqlite3.Row  # Return rows as dicts
@@ -189,11 +213,7 @@ class BenchmarkDB:
 
     def validate_config(self, config_path: str, benchmark_name: str) -> Dict[str, Any]:
         """Compare a training config against the benchmark definition."""
-        import yaml
-
-        # Load config
-        with open(config_path) as f:
-            config = yaml.safe_load(f)
+        config = load_config(config_path)
 
         # Get benchmark
         benchmark = self.get_benchmark(benchmark_name)
@@ -201,63 +221,304 @@ class BenchmarkDB:
         if not benchmark:
             raise ValueError(f"Benchmark '{benchmark_name}' not found")
 
-        # Compare objectives
-        validation = {
-            'benchmark_name': benchmark_name,
-            'config_path': config_path,
-            'num_objectives_expected': len(benchmark['objectives']),
-            'num_objectives_actual': len(config.get('objectives', [])),
-            'aggregation_expected': benchmark['aggregation_method'],
-            'aggregation_actual': config.get('reward', {}).get('gradient_method'),
-            'objective_mismatches': []
-        }
-
-        # Check each objective
-        for i, expected_obj in enumerate(benchmark['objectives']):
-            if i >= len(config.get('objectives', [])):
-                validation['objective_mismatches'].append({
-                    'index': i,
+        return ConfigValidator.compile(benchmark)(config, config_path)
+
+
+# ============================================================================
+# Config validation
+# ============================================================================
+
+def load_config(config_path: str) -> Dict[str, Any]:
+    """Parse a YAML training config (with libyaml's C loader when available)."""
+    import yaml
+
+    with open(config_path) as f:
+        return yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
+
+
+class ObjectiveCheck(NamedTuple):
+    """What one benchmark objective requires of the config objective at its position"""
+    index: int
+    function_name: str
+    modifier: Optional[str]
+    check_modifier: bool                    # False for modifier 'none'
+    modifier_params: Tuple[Tuple[str, float], ...]
+
+
+class ConfigValidator(NamedTuple):
+    """
+    Checks for one benchmark, compiled once from its definition
+
+    Calling it with a parsed config returns the same result dict as
+    BenchmarkDB.validate_config(). Plain data, so it can be sent to worker
+    processes.
+    """
+    benchmark_name: str
+    aggregation: Optional[str]
+    checks: Tuple[ObjectiveCheck, ...]
+
+    @classmethod
+    def compile(cls, benchmark: Mapping[str, Any]) -> 'ConfigValidator':
+        checks = []
+        for i, obj in enumerate(benchmark['objectives']):
+            check_modifier = obj['modifier_type'] != 'none'
+            params = tuple(
+                (param, obj[f'modifier_{param}'])
+                for param in ('mu', 'sigma', 'threshold')
+                if obj[f'modifier_{param}'] is not None
+            ) if check_modifier else ()
+            checks.append(ObjectiveCheck(i, obj['function_name'], obj['modifier_type'], check_modifier, params))
+        return cls(benchmark['benchmark_name'], benchmark['aggregation_method'], tuple(checks))
+
+    def __call__(self, config: Mapping[str, Any], config_path: Optional[str] = None) -> Dict[str, Any]:
+        objectives = config.get('objectives', [])
+        mismatches = []
+
+        for check in self.checks:
+            if check.index >= len(objectives):
+                mismatches.append({
+                    'index': check.index,
                     'error': 'Missing objective',
-                    'expected': expected_obj['function_name']
+                    'expected': check.function_name
                 })
                 continue
 
-            actual_obj = config['objectives'][i]
+            if not check.check_modifier:
+                continue
+            actual_obj = objectives[check.index]
+
+            if actual_obj.get('modifier') != check.modifier:
+                mismatches.append({
+                    'index': check.index,
+                    'field': 'modifier',
+                    'expected': check.modifier,
+                    'actual': actual_obj.get('modifier')
+                })
 
-            # Check modifier
-            if expected_obj['modifier_type'] != 'none':
-                if actual_obj.get('modifier') != expected_obj['modifier_type']:
-                    validation['objective_mismatches'].append({
-                        'index': i,
-                        'field': 'modifier',
-                        'expected': expected_obj['modifier_type'],
-                        'actual': actual_obj.get('modifier')
+            actual_params = actual_obj.get('modifier_params', {})
+            for param, expected_val in check.modifier_params:
+                actual_val = actual_params.get(param)
+                if actual_val != expected_val:
+                    mismatches.append({
+                        'index': check.index,
+                        'field': f'modifier_params.{param}',
+                        'expected': expected_val,
+                        'actual': actual_val
                     })
 
-                # Check modifier parameters
-                expected_params = {}
-                if expected_obj['modifier_mu'] is not None:
-                    expected_params['mu'] = expected_obj['modifier_mu']
-                if expected_obj['modifier_sigma'] is not None:
-                    expected_params['sigma'] = expected_obj['modifier_sigma']
-                if expected_obj['modifier_threshold'] is not None:
-                    expected_params['threshold'] = expected_obj['modifier_threshold']
+        return {
+            'benchmark_name': self.benchmark_name,
+            'config_path': config_path,
+            'num_objectives_expected': len(self.checks),
+            'num_objectives_actual': len(objectives),
+            'aggregation_expected': self.aggregation,
+            'aggregation_actual': config.get('reward', {}).get('gradient_method'),
+            'objective_mismatches': mismatches,
+            'is_valid': not mismatches,
+        }
+
+
+# ============================================================================
+# In-memory snapshot
+# ============================================================================
+
+def _freeze(row: Mapping[str, Any]) -> Mapping[str, Any]:
+    return MappingProxyType(dict(row))
+
+
+def _thaw(benchmark: Mapping[str, Any]) -> Dict[str, Any]:
+    """Mutable copy of a frozen benchmark, as BenchmarkDB.get_benchmark() returns it."""
+    copy = dict(benchmark)
+    if 'objectives' in copy:
+        copy['objectives'] = [dict(obj) for obj in copy['objectives']]
+    return copy
+
+
+def _open_catalog(db_path: Optional[str] = None) -> sqlite3.Connection:
+    """The database file read-only and immutable, else an in-memory build from SQL_SCRIPTS."""
+    path = Path(db_path or DEFAULT_DB_PATH)
+    if path.exists():
+        # immutable=1: no locking or change detection; the file is not written while we read it
+        conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro&immutable=1", uri=True)
+    else:
+        conn = sqlite3.connect(':memory:')
+        for script in SQL_SCRIPTS:
+            conn.executescript((Path(__file__).parent / script).read_text())
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class BenchmarkSnapshot(BenchmarkDB):
+    """
+    The whole benchmark catalog in immutable in-memory structures
+
+    Same read methods as BenchmarkDB, answered from dicts and tuples built
+    once, without SQL. Methods return mutable copies. Build with
+    load_snapshot().
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        benchmarks = {row['benchmark_id']: dict(row) for row in conn.execute("SELECT * FROM benchmarks")}
+        objectives = {benchmark_id: [] for benchmark_id in benchmarks}
+        for row in conn.execute("SELECT * FROM scoring_functions ORDER BY benchmark_id, objective_order"):
+            objectives[row['benchmark_id']].append(_freeze(row))
+
+        by_name = {}
+        for benchmark_id, benchmark in benchmarks.items():
+            benchmark['objectives'] = tuple(objectives[benchmark_id])
+            by_name[benchmark['benchmark_name']] = _freeze(benchmark)
+        self._benchmarks: Mapping[str, Mapping[str, Any]] = MappingProxyType(by_name)
+
+        self._summary = tuple(
+            _freeze(row) for row in conn.execute(
+                "SELECT * FROM benchmark_summary ORDER BY category, benchmark_name"
+            )
+        )
+
+        comparisons = {}
+        has_mappings = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = 'table3_vs_config'"
+        ).fetchone()
+        if has_mappings:
+            for row in conn.execute("SELECT * FROM table3_vs_config ORDER BY benchmark_name, objective_order"):
+                comparisons.setdefault(row['benchmark_name'], []).append(_freeze(row))
+        self._comparisons = MappingProxyType({name: tuple(rows) for name, rows in comparisons.items()})
+
+        self.validators: Mapping[str, ConfigValidator] = MappingProxyType({
+            name: ConfigValidator.compile(benchmark) for name, benchmark in self._benchmarks.items()
+        })
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass  # Nothing to close; load_snapshot() shares the snapshot
+
+    def list_benchmarks(self, category: str = None) -> List[Dict[str, Any]]:
+        """List all benchmarks, optionally filtered by category."""
+        return [dict(row) for row in self._summary if not category or row['category'] == category]
+
+    def get_benchmark(self, benchmark_name: str) -> Optional[Dict[str, Any]]:
+        """Get complete benchmark definition with all objectives."""
+        benchmark = self._benchmarks.get(benchmark_name)
+        return _thaw(benchmark) if benchmark else None
+
+    def search_by_objective(self, objective_type: str) -> List[Dict[str, Any]]:
+        """Find benchmarks that use a specific objective type."""
+        return [
+            {k: v for k, v in benchmark.items() if k != 'objectives'}
+            for name, benchmark in sorted(self._benchmarks.items())
+            if any(obj['function_type'] == objective_type for obj in benchmark['objectives'])
+        ]
 
-                actual_params = actual_obj.get('modifier_params', {})
+    def get_modifier_usage(self) -> Dict[str, int]:
+        """Get counts of modifier usage across all benchmarks."""
+        counts = Counter(
+            obj['modifier_type'] for benchmark in self._benchmarks.values() for obj in benchmark['objectives']
+        )
+        return dict(counts.most_common())
 
-                for param, expected_val in expected_params.items():
-                    actual_val = actual_params.get(param)
-                    if actual_val != expected_val:
-                        validation['objective_mismatches'].append({
-                            'index': i,
-                            'field': f'modifier_params.{param}',
-                            'expected': expected_val,
-                            'actual': actual_val
-                        })
+    def get_config_comparison(self, benchmark_name: str) -> List[Dict[str, Any]]:
+        """Get Table 3 vs config comparison for a benchmark."""
+        return [dict(row) for row in self._comparisons.get(benchmark_name, ())]
 
-        validation['is_valid'] = len(validation['objective_mismatches']) == 0
+    def list_config_mismatches(self) -> List[Dict[str, Any]]:
+        """List all objectives with config notes (potential mismatches)."""
+        columns = ('benchmark_name', 'objective_order', 'table3_function', 'config_name', 'config_notes')
+        return [
+            {column: row[column] for column in columns}
+            for name in sorted(self._comparisons)
+            for row in self._comparisons[name]
+            if row['config_notes'] is not None
+        ]
 
-        return validation
+    def validate_config(self, config_path: str, benchmark_name: str) -> Dict[str, Any]:
+        """Compare a training config against the benchmark definition."""
+        validator = self.validators.get(benchmark_name)
+        if validator is None:
+            raise ValueError(f"Benchmark '{benchmark_name}' not found")
+        return validator(load_config(config_path), config_path)
+
+
+@lru_cache(maxsize=None)
+def load_snapshot(db_path: Optional[str] = None) -> BenchmarkSnapshot:
+    """
+    The catalog snapshot, loaded on the first call for each db_path
+
+    Args:
+        db_path: Database file (default: guacamol_benchmarks.db next to this
+            script); built in memory from SQL_SCRIPTS if it does not exist
+    """
+    conn = _open_catalog(db_path)
+    try:
+        return BenchmarkSnapshot(conn)
+    finally:
+        conn.close()
+
+
+# ============================================================================
+# Directory validation
+# ============================================================================
+
+_worker_validators: Dict[str, ConfigValidator] = {}
+
+
+def _init_worker(validators: Dict[str, ConfigValidator]) -> None:
+    _worker_validators.clear()
+    _worker_validators.update(validators)
+
+
+def _validate_file(task: Tuple[str, Optional[str]]) -> Dict[str, Any]:
+    """Validate one config file; errors are reported in the result, not raised."""
+    config_path, benchmark_name = task
+    try:
+        config = load_config(config_path)
+        name = benchmark_name or config.get('guacamol_benchmark_name')
+        if not name:
+            raise ValueError("no benchmark given and no guacamol_benchmark_name in config")
+        validator = _worker_validators.get(name)
+        if validator is None:
+            raise ValueError(f"Benchmark '{name}' not found")
+        return validator(config, config_path)
+    except Exception as e:
+        return {'config_path': config_path, 'benchmark_name': benchmark_name, 'is_valid': False, 'error': str(e)}
+
+
+def find_configs(path: str) -> List[str]:
+    """A config file itself, or every *.yaml/*.yml under a directory (sorted)."""
+    root = Path(path)
+    if not root.is_dir():
+        return [str(root)]
+    return sorted(str(p) for p in root.rglob('*') if p.suffix in ('.yaml', '.yml') and p.is_file())
+
+
+def validate_configs(
+    path: str,
+    benchmark_name: Optional[str] = None,
+    workers: Optional[int] = None,
+    snapshot: Optional[BenchmarkSnapshot] = None
+) -> List[Dict[str, Any]]:
+    """
+    Validate a config file or a directory of configs, in parallel
+
+    Args:
+        path: Config file or directory (searched recursively)
+        benchmark_name: Benchmark for every config (default: each config's
+            guacamol_benchmark_name, as written by --export)
+        workers: Worker processes (default: one per CPU; 1 validates in this process)
+        snapshot: Catalog to validate against (default: load_snapshot())
+
+    Returns:
+        validate_config() results in path order; configs that could not be
+        read or matched have is_valid False and an 'error'
+    """
+    snapshot = snapshot or load_snapshot()
+    tasks = [(config_path, benchmark_name) for config_path in find_configs(path)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+
+    if workers <= 1:
+        _init_worker(dict(snapshot.validators))
+        return [_validate_file(task) for task in tasks]
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(dict(snapshot.validators),)) as pool:
+        return list(pool.map(_validate_file, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
 
 
 def main():
@@ -270,15 +531,20 @@ def main():
     parser.add_argument('--get', type=str, help='Get specific benchmark')
     parser.add_argument('--export', type=str, help='Export benchmark as JSON config')
     parser.add_argument('--output', type=str, help='Output path for export')
-    parser.add_argument('--validate', type=str, nargs=2, metavar=('CONFIG', 'BENCHMARK'),
-                        help='Validate config against benchmark')
+    parser.add_argument('--validate', type=str, nargs='+', metavar='PATH',
+                        help='Validate CONFIG BENCHMARK, or a config directory in parallel: '
+                             'DIR [BENCHMARK] (default: each config\'s guacamol_benchmark_name)')
+    parser.add_argument('--workers', type=int, help='Processes for directory validation (default: one per CPU)')
     parser.add_argument('--modifiers', action='store_true', help='Show modifier usage stats')
     parser.add_argument('--compare', type=str, help='Show Table 3 vs config comparison for benchmark')
     parser.add_argument('--mismatches', action='store_true', help='List all config mismatches/notes')
 
     args = parser.parse_args()
+    if args.validate and len(args.validate) > 2:
+        parser.error('--validate takes CONFIG BENCHMARK or DIR [BENCHMARK]')
 
-    with BenchmarkDB() as db:
+    # Read-only CLI: answer everything from the in-memory snapshot
+    with load_snapshot() as db:
         if args.list:
             benchmarks = db.list_benchmarks(category=args.category)
             print(f"\nFound {len(benchmarks)} benchmarks:\n")
@@ -311,6 +577,22 @@ def main():
             else:
                 print(json.dumps(config, indent=2))
 
+        elif args.validate and (len(args.validate) == 1 or Path(args.validate[0]).is_dir()):
+            results = validate_configs(*args.validate, workers=args.workers, snapshot=db)
+            for result in results:
+                if 'error' in result:
+                    print(f"  ✗ {result['config_path']}: {result['error']}")
+                elif result['is_valid']:
+                    print(f"  ✓ {result['config_path']} ({result['benchmark_name']})")
+                else:
+                    print(f"  ✗ {result['config_path']} ({result['benchmark_name']}): "
+                          f"{len(result['objective_mismatches'])} mismatches")
+                    for mismatch in result['objective_mismatches']:
+                        print(f"      Objective {mismatch.get('index', '?')}: {mismatch}")
+            invalid = sum(1 for result in results if not result['is_valid'])
+            print(f"\n{len(results) - invalid}/{len(results)} configs valid")
+            sys.exit(1 if invalid else 0)
+
         elif args.validate:
             config_path, benchmark_name = args.validate
             validation = db.validate_config(config_path, benchmark_name)
@@ -0,0 +1,114 @@
+"""
+Test script for the in-memory benchmark snapshot
+
+Checks that BenchmarkSnapshot answers every query exactly like BenchmarkDB,
+from both the immutable file and the shipped SQL scripts, that its data cannot
+be modified, and that precompiled validators and parallel directory
+validation agree with validate_config().
+"""
+
+import operator
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from query_benchmarks import (
+    SQL_SCRIPTS, BenchmarkDB, BenchmarkSnapshot, ConfigValidator, load_snapshot, validate_configs,
+)
+
+TEST_DIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(TEST_DIR, 'guacamol_benchmarks.db')
+
+print("=" * 80)
+print("TESTING BENCHMARK SNAPSHOT")
+print("=" * 80)
+
+# Build a database file the way init_db.sh does
+conn = sqlite3.connect(DB_PATH)
+for script in SQL_SCRIPTS:
+    conn.executescript((Path(__file__).parent / script).read_text())
+conn.close()
+
+# Test 1: Same answers as BenchmarkDB
+print("\n1. Query parity...")
+db = BenchmarkDB(DB_PATH)
+from_file = load_snapshot(DB_PATH)
+from_scripts = load_snapshot(os.path.join(TEST_DIR, 'missing.db'))
+assert load_snapshot(DB_PATH) is from_file  # Loaded once
+names = [b['benchmark_name'] for b in db.list_benchmarks()]
+assert len(names) == 20
+
+for snapshot in (from_file, from_scripts):
+    assert isinstance(snapshot, BenchmarkSnapshot)
+    assert snapshot.list_benchmarks() == db.list_benchmarks()
+    assert snapshot.list_benchmarks('mpo') == db.get_mpo_benchmarks()
+    for name in names + ['Unknown benchmark']:
+        assert snapshot.get_benchmark(name) == db.get_benchmark(name), name
+        assert snapshot.get_config_comparison(name) == db.get_config_comparison(name), name
+    for function_type in ('similarity', 'tpsa', 'smarts', 'qed'):
+        assert snapshot.search_by_objective(function_type) == db.search_by_objective(function_type)
+    assert snapshot.get_modifier_usage() == db.get_modifier_usage()
+    assert snapshot.list_config_mismatches() == db.list_config_mismatches()
+    assert snapshot.export_benchmark_json('Fexofenadine MPO') == db.export_benchmark_json('Fexofenadine MPO')
+print("   ✓ Snapshot from the immutable file and from the SQL scripts match BenchmarkDB")
+
+# Test 2: Immutable
+print("\n2. Immutability...")
+benchmark = from_file.get_benchmark('Fexofenadine MPO')
+benchmark['objectives'][0]['modifier_type'] = 'none'
+assert from_file.get_benchmark('Fexofenadine MPO')['objectives'][0]['modifier_type'] == 'thresholded'
+for mutate in (
+    lambda: operator.setitem(from_file._benchmarks, 'x', {}),
+    lambda: operator.setitem(from_file._benchmarks['Fexofenadine MPO']['objectives'][0], 'modifier_mu', 0),
+    lambda: operator.setitem(from_file.validators, 'x', None),
+):
+    try:
+        mutate()
+        raise AssertionError("snapshot modified")
+    except TypeError:
+        pass
+print("   ✓ Returned dicts are copies; internal structures are read-only")
+
+# Test 3: Validators
+print("\n3. Precompiled validators...")
+config_dir = Path(TEST_DIR) / 'configs'
+(config_dir / 'mpo').mkdir(parents=True)
+expected = {}
+for n, name in enumerate(names):
+    config = db.export_benchmark_json(name)
+    if n % 3 == 0 and config['objectives']:
+        config['objectives'][-1]['modifier'] = 'clipped'  # Introduce a mismatch
+    path = config_dir / ('mpo' if 'MPO' in name else '') / f"{n:02d}.yaml"
+    path.write_text(yaml.safe_dump(config))
+    expected[str(path)] = db.validate_config(str(path), name)
+    assert from_file.validate_config(str(path), name) == expected[str(path)]
+    assert ConfigValidator.compile(db.get_benchmark(name))(config, str(path)) == expected[str(path)]
+assert any(not result['is_valid'] for result in expected.values())
+assert any(result['is_valid'] for result in expected.values())
+print("   ✓ Same results as validate_config()")
+
+# Test 4: Directory validation
+print("\n4. Parallel directory validation...")
+(config_dir / 'no_benchmark.yml').write_text(yaml.safe_dump({'objectives': []}))
+(config_dir / 'notes.txt').write_text('not a config')
+results = validate_configs(str(config_dir), workers=4, snapshot=from_file)
+assert len(results) == len(expected) + 1
+by_path = {result['config_path']: result for result in results}
+assert 'error' in by_path[str(config_dir / 'no_benchmark.yml')]
+assert all(by_path[path] == result for path, result in expected.items())
+assert [r['config_path'] for r in results] == sorted(r['config_path'] for r in results)
+assert validate_configs(str(config_dir), workers=1, snapshot=from_file) == results
+
+fexofenadine = validate_configs(str(config_dir / 'mpo'), benchmark_name='Fexofenadine MPO', workers=2)
+assert all(result['benchmark_name'] == 'Fexofenadine MPO' for result in fexofenadine)
+print(f"   ✓ {len(results)} configs validated by 4 processes")
+
+print("\n" + "=" * 80)
+print("ALL TESTS PASSED ✓")
+print("=" * 80)
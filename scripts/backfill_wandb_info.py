@@ -8,46 +8,20 @@ actual W&B runs by config prefix and timestamp proximity.
 import sys
 import os
 from pathlib import Path
-from datetime import datetime
 
 # Add paths
 sys.path.insert(0, str(Path(__file__).parent.parent))
 sys.path.insert(0, '/home/ubuntu/mango')
 
 from training_db.core import get_connection, update_run_status
+from training_db.run_matching import RunMatcher
+from training_db.wandb_client import get_api
 from apis.our_wandb.core import _get_wandb_config
-import wandb
 
 
-def find_wandb_match(api, db_run, entity, project, all_runs):
-    """Find matching W&B run for a database entry."""
-    run_id = db_run['run_id']
-    created_at = datetime.fromisoformat(db_run['created_at'].replace('Z', '+00:00'))
-    
-    # Extract config prefix from run_id
-    # Format: {config}_{instance_id}
-    parts = run_id.rsplit('_', 1)
-    if len(parts) != 2:
-        return None
-        
-    config_prefix = parts[0]
-    
-    # Search for runs with matching config prefix and similar timestamp
-    matches = []
-    for run in all_runs:
-        if config_prefix in run.name:
-            # Check if created time is close (within 30 minutes)
-            run_created = datetime.fromisoformat(run.created_at.replace('Z', '+00:00'))
-            time_diff = abs((run_created - created_at).total_seconds())
-            if time_diff < 1800:  # Within 30 minutes
-                matches.append((run, time_diff))
-    
-    if matches:
-        # Sort by time difference and return best match
-        matches.sort(key=lambda x: x[1])
-        return matches[0][0]
-    
-    return None
+def find_wandb_match(db_run, matcher):
+    """Find matching W&B run for a database entry (same config prefix, within 30 minutes)."""
+    return matcher.match(db_run['run_id'], db_run['created_at'])
 
 
 def main():
@@ -65,12 +39,12 @@ def main():
         sys.exit(1)
     
     # Initialize W&B API
-    api = wandb.Api()
+    api = get_api()
     
     # Fetch all recent runs from W&B (once, to avoid repeated API calls)
     print("\nFetching runs from W&B...")
-    all_runs = list(api.runs(f"{entity}/{project}", order="-created_at"))
-    print(f"Fetched {len(all_runs)} runs from W&B")
+    matcher = RunMatcher(api.runs(f"{entity}/{project}", order="-created_at"))
+    print(f"Fetched {len(matcher)} runs from W&B")
     
     # Query database for runs without W&B info
     print("\nQuerying database for runs without W&B info...")
@@ -97,7 +71,7 @@ def main():
         
         try:
             # Find matching W&B run
-            wandb_run = find_wandb_match(api, db_run, entity, project, all_runs)
+            wandb_run = find_wandb_match(db_run, matcher)
             
             if wandb_run:
                 print(f"  ✓ Matched with: {wandb_run.name}")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Benchmark the training_db API on synthetic databases.
+
+Grows one throwaway database through each size (default 1k, 10k and 100k runs,
+generated with training_db.synthetic) and times every public read and write
+call at each size: a warm-up call, then --repeat timed calls, reporting the
+median and p90. Results are written as JSON; given a --baseline from an
+earlier run, any call whose median got slower by more than --threshold (and by
+more than --min-delta-ms, to ignore timer noise on sub-millisecond calls)
+is reported and the script exits 1, so it can gate CI.
+
+The W&B-bound calls (sync_run_complete, get_objectives_display_data) are left
+to benchmark_sync.py, which runs them against a fake W&B API.
+
+Usage:
+    python benchmark_api.py                                   # 1k/10k/100k runs
+    python benchmark_api.py --sizes 1000,10000 --history 200 --output results.json
+    python benchmark_api.py --baseline baseline.json --threshold 0.25
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Throwaway database, set before training_db reads it
+BENCH_DIR = tempfile.mkdtemp(prefix='mangodb_api_bench_')
+os.environ['TRAINING_DB_PATH'] = os.path.join(BENCH_DIR, 'training_runs.db')
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import training_db as api
+from training_db.core import init_db
+from training_db.events import latest_seq
+from training_db.history_store import load_history, summarize_history
+from training_db.synthetic import generate_database
+
+
+def run_id(n):
+    return f"syn_{n:07d}_i-{n:017x}"
+
+
+def api_cases(size, history, rng):
+    """(name, call(i)) for every benchmarked call; i is the timed iteration."""
+    existing = lambda: run_id(rng.randrange(size))
+    new_run = lambda i: f"bench_{size}_{i}_i-{i:08x}"
+    config = {'reward': {'gradient_method': 'mgda'}, 'training': {'batch_size': 16}}
+    sample = [run_id(n) for n in rng.sample(range(size), min(100, size))]
+    statuses = ['running', 'completed', 'crashed', 'not_running']
+
+    cases = [
+        # Reads
+        ('get_run', lambda i: api.get_run(existing())),
+        ('query_runs', lambda i: api.query_runs({'status': 'completed', 'gradient_method': 'mgda'}, limit=100)),
+        ('query_runs_created_after', lambda i: api.query_runs({'created_after': '2025-06-01'}, limit=100)),
+        ('query_runs_between', lambda i: api.query_runs_between('2025-06-01', '2025-06-08', limit=100)),
+        ('summarize_durations', lambda i: api.summarize_durations()),
+        ('get_stats', lambda i: api.get_stats()),
+        ('get_run_objectives', lambda i: api.get_run_objectives(existing())),
+        ('query_runs_by_objectives', lambda i: api.query_runs_by_objectives(
+            {'QED': {'min': 0.8}}, gradient_method='mgda', limit=100)),
+        ('get_objective_statistics', lambda i: api.get_objective_statistics('QED')),
+        ('get_objective_distribution', lambda i: api.get_objective_distribution('QED')),
+        ('compare_gradient_methods', lambda i: api.compare_gradient_methods('QED')),
+        ('top_k_runs', lambda i: api.top_k_runs('QED', k=10)),
+        ('find_stale_runs', lambda i: api.find_stale_runs()),
+        ('changes_since', lambda i: api.changes_since(max(0, latest_seq() - 1000))),
+        ('parse_objective_alias', lambda i: api.parse_objective_alias('COMT_activity_maximize')),
+        ('init_db', lambda i: init_db()),  # Schema already current
+        # Writes
+        ('insert_run', lambda i: api.insert_run(new_run(i), None, config, status='launched')),
+        ('update_run_status', lambda i: api.update_run_status(existing(), statuses[i % 4], duration_seconds=i)),
+        ('attach_blog_post', lambda i: api.attach_blog_post(existing(), f"https://blog/{i}")),
+        ('attach_crash_data', lambda i: api.attach_crash_data(existing(), f"e/{i}", f"r/{i}", f"a/{i}")),
+        ('attach_conversation', lambda i: api.attach_conversation(existing(), f"c/{i}")),
+        ('insert_objective', lambda i: api.insert_objective(new_run(i), 'QED', weight=1.0, direction='maximize')),
+        ('update_objective_metric', lambda i: api.update_objective_metric(new_run(i), 'QED', 'raw_mean', 0.5)),
+        ('update_objective_metrics', lambda i: api.update_objective_metrics(
+            new_run(i), {'QED': {'raw_mean': 0.6, 'raw_std': 0.1}})),
+        ('heartbeat', lambda i: api.heartbeat(existing(), step=i, interval=0)),
+        ('delete_run_objectives', lambda i: api.delete_run_objectives(new_run(i))),
+    ]
+    if history:
+        cases += [
+            ('load_history', lambda i: load_history(existing(), keys=['loss'])),
+            ('summarize_history', lambda i: summarize_history(['loss'], run_ids=sample)),
+        ]
+    return cases
+
+
+def time_case(call, repeat):
+    """Seconds per call: one warm-up, then `repeat` timed calls."""
+    call(repeat)  # Warm-up iteration number, distinct from the timed ones
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        call(i)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'median_ms': statistics.median(timings) * 1000,
+        'p90_ms': timings[min(len(timings) - 1, int(len(timings) * 0.9))] * 1000,
+        'min_ms': timings[0] * 1000,
+    }
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Calls slower than the baseline beyond both thresholds: [(size, name, baseline ms, now ms)]."""
+    regressions = []
+    for size, calls in results.items():
+        for name, now in calls.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+            if (now['median_ms'] > before['median_ms'] * (1 + threshold)
+                    and now['median_ms'] - before['median_ms'] > min_delta_ms):
+                regressions.append((size, name, before['median_ms'], now['median_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the training_db API on synthetic databases')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Comma-separated run counts')
+    parser.add_argument('--objectives', type=int, default=3, help='Objectives per run')
+    parser.add_argument('--history', type=int, default=0, help='History steps per run (0: no run_history)')
+    parser.add_argument('--config-bytes', type=int, default=2048, help='Approximate config_json size')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed calls per API and size')
+    parser.add_argument('--output', help='Write results JSON here')
+    parser.add_argument('--baseline', help='Results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.5, help='Allowed slowdown (0.5 = 50%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.2, help='Ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db()
+
+    results = {}
+    generated = 0
+    for size in sizes:
+        start = time.perf_counter()
+        generate_database(size - generated, args.objectives, args.history, args.config_bytes, first=generated)
+        generated = size
+        print(f"\n{size} runs (generated in {time.perf_counter() - start:.1f}s, "
+              f"{os.path.getsize(os.environ['TRAINING_DB_PATH']) / 1e6:.0f} MB):")
+
+        results[str(size)] = {}
+        rng = random.Random(size)
+        for name, call in api_cases(size, args.history, rng):
+            with contextlib.redirect_stdout(io.StringIO()):  # The API prints on every write
+                timings = time_case(call, args.repeat)
+            results[str(size)][name] = summarize(timings)
+            print(f"  {name:28s} median {results[str(size)][name]['median_ms']:9.3f}ms   "
+                  f"p90 {results[str(size)][name]['p90_ms']:9.3f}ms")
+
+    report = {
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'parameters': {key: getattr(args, key) for key in ('objectives', 'history', 'config_bytes', 'repeat')},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('parameters') != report['parameters']:
+            print(f"\nWarning: baseline parameters {baseline.get('parameters')} differ from {report['parameters']}")
+        regressions = compare(results, baseline['results'], args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for size, name, before, now in regressions:
+                print(f"  {size} runs, {name}: {before:.3f}ms -> {now:.3f}ms ({now / before - 1:+.0%})")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
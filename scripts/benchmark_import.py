@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Measure what `import training_db` costs a trainer or cron job.
+
+Imports the package (or any --module) in fresh interpreters with
+`python -X importtime` and reports the median cumulative import time, the
+slowest modules by their own time, and whether any heavy dependency was
+pulled in. Exits 1 if a heavy module was imported or the median exceeds
+--max-ms. Nothing touches the database: TRAINING_DB_PATH points into a
+directory that import must not create, and the script checks that it was
+not created.
+
+Usage:
+    python benchmark_import.py                          # import training_db, 10 runs
+    python benchmark_import.py --module training_db.core --runs 20
+    python benchmark_import.py --max-ms 100
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = str(Path(__file__).parent.parent)
+
+# Must stay out of a plain `import training_db`
+HEAVY_MODULES = ['wandb', 'yaml', 'pandas', 'numpy', 'boto3', 'duckdb', 'asyncio', 'http.server']
+
+
+def import_once(module, env):
+    """One fresh `python -X importtime -c 'import module'`: {module: (self us, cumulative us)}, imported."""
+    probe = f"import sys, {module}; print(','.join(sorted(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', probe],
+        capture_output=True, text=True, env=env, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(own), int(cumulative))
+    return times, set(result.stdout.strip().split(','))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure training_db import time')
+    parser.add_argument('--module', default='training_db', help='Module to import')
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters to average over')
+    parser.add_argument('--max-ms', type=float, default=200.0, help='Fail if the median exceeds this')
+    parser.add_argument('--top', type=int, default=10, help='Slowest modules to list')
+    args = parser.parse_args()
+
+    db_dir = os.path.join(tempfile.mkdtemp(prefix='mangodb_import_'), 'not_created')
+    env = dict(os.environ, TRAINING_DB_PATH=os.path.join(db_dir, 'training_runs.db'))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPO_ROOT, env.get('PYTHONPATH')]))
+
+    import_once(args.module, env)  # Warm the bytecode cache
+    runs = [import_once(args.module, env) for _ in range(args.runs)]
+    totals = [times[args.module][1] / 1000 for times, _ in runs]
+    times, imported = runs[-1]
+    median = statistics.median(totals)
+
+    print(f"import {args.module}: median {median:.1f}ms, min {min(totals):.1f}ms over {args.runs} runs")
+    print("\nSlowest modules (self time, last run):")
+    for name, (own, cumulative) in sorted(times.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"  {own / 1000:7.2f}ms  {name}")
+
+    heavy = [name for name in HEAVY_MODULES if name in imported]
+    created = os.path.exists(db_dir)
+    print(f"\nHeavy modules imported: {', '.join(heavy) or 'none'}")
+    print(f"Database directory created at import: {'yes' if created else 'no'}")
+
+    failed = heavy or created or median > args.max_ms
+    if median > args.max_ms:
+        print(f"Median {median:.1f}ms exceeds {args.max_ms:.0f}ms")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
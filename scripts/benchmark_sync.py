@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark the W&B -> database sync offline.
+
+Runs sync_runs() against FakeWandbApi on a throwaway database and reports
+throughput, API calls and injected errors. A second (warm) pass shows what the
+on-disk W&B cache saves when runs have not changed.
+
+Usage:
+    python benchmark_sync.py                                  # 200 runs, 50ms latency
+    python benchmark_sync.py --runs 1000 --history 5000 --latency 0.2 --error-rate 0.05
+    python benchmark_sync.py --workers 1 --rate 0             # Serial baseline
+    python benchmark_sync.py --recording /tmp/recording.json  # Replay recorded runs
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Throwaway database and cache, set before training_db reads them
+BENCH_DIR = tempfile.mkdtemp(prefix='mangodb_bench_')
+os.environ['TRAINING_DB_PATH'] = os.path.join(BENCH_DIR, 'training_runs.db')
+os.environ['WANDB_CACHE_PATH'] = os.path.join(BENCH_DIR, 'wandb_cache.db')
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from training_db.core import get_connection, init_db
+from training_db.run_sync import query_stale_runs, sync_runs
+from training_db.wandb_cache import WandbCache, get_cache
+from training_db.wandb_client import FakeWandbApi, synthetic_runs
+
+
+def seed_database(api):
+    """Insert one 'running' database row per fake W&B run."""
+    with get_connection() as conn:
+        conn.executemany("""
+            INSERT INTO training_runs (run_id, run_name, wandb_run_id, status, created_at)
+            VALUES (?, ?, ?, 'running', ?)
+        """, [
+            (f"{run.name}_i-bench", run.name, run.id, run.created_at)
+            for run in api.runs(f"{api.entity}/{api.project}")
+        ])
+
+
+def timed_pass(label, api, args, cache):
+    calls, errors = api.calls, api.errors
+    stale = query_stale_runs()
+    start = time.perf_counter()
+    stats = sync_runs(
+        api, stale, api.entity, api.project,
+        workers=args.workers,
+        rate=args.rate or None,
+        cache=cache,
+    )
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{label}:")
+    print(f"  Runs: {len(stale)} in {elapsed:.2f}s ({len(stale) / elapsed:.1f} runs/s)")
+    print(f"  API calls: {api.calls - calls} ({api.errors - errors} injected errors), "
+          f"max concurrent: {api.max_in_flight}")
+    print(f"  Updated: {stats['updated']}, errors: {stats['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark W&B sync against a local fake')
+    parser.add_argument('--runs', type=int, default=200, help='Synthetic runs')
+    parser.add_argument('--history', type=int, default=500, help='History steps per run')
+    parser.add_argument('--recording', help='Replay runs recorded with wandb_client.record_runs()')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds per fake API call')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probability of a failed call')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent fetches')
+    parser.add_argument('--rate', type=float, default=0, help='Max requests/s (0 = unlimited)')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the W&B cache on both passes')
+    args = parser.parse_args()
+
+    fake_args = dict(latency=args.latency, error_rate=args.error_rate, seed=0)
+    if args.recording:
+        api = FakeWandbApi.load(args.recording, **fake_args)
+    else:
+        api = FakeWandbApi(synthetic_runs(args.runs, history_length=args.history), **fake_args)
+
+    init_db()
+    seed_database(api)
+    cache = WandbCache(':memory:') if args.no_cache else get_cache()
+
+    print(f"Benchmark: {args.workers} workers, {args.latency * 1000:.0f}ms latency, "
+          f"{args.error_rate:.0%} errors, data in {BENCH_DIR}")
+    timed_pass("Cold pass", api, args, cache)
+    timed_pass("Warm pass (unchanged runs)", api, args, cache)
+
+
+if __name__ == '__main__':
+    main()
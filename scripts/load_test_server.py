@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Load-test the read-only HTTP query service.
+
+Seeds a throwaway database with synthetic runs and objectives, starts
+training_db.server in-process and hits a mix of endpoints from concurrent
+keep-alive clients, first with plain GETs and then revalidating with
+If-None-Match (what a polling dashboard does). Reports requests per second,
+latency and how many answers were 304s. With --url, targets a running server
+instead (nothing is seeded).
+
+Usage:
+    python load_test_server.py                          # 2000 runs, 8 clients, 5s per phase
+    python load_test_server.py --clients 32 --duration 10
+    python load_test_server.py --url http://localhost:8765
+"""
+
+import argparse
+import http.client
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+# Throwaway database, set before training_db reads it
+BENCH_DIR = tempfile.mkdtemp(prefix='mangodb_load_')
+os.environ.setdefault('TRAINING_DB_PATH', os.path.join(BENCH_DIR, 'training_runs.db'))
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+GRADIENT_METHODS = ['mgda', 'pcgrad', 'imtlg', 'linear']
+OBJECTIVES = ['COMT_activity', 'DRD5_activity', 'QED']
+STATUSES = ['completed', 'running', 'crashed']
+
+
+def seed_database(runs):
+    """Insert synthetic runs with one result per objective."""
+    from training_db.core import get_connection, init_db
+
+    init_db()
+    rng = random.Random(0)
+    with get_connection() as conn:
+        conn.executemany("""
+            INSERT INTO training_runs (run_id, status, gradient_method, created_at)
+            VALUES (?, ?, ?, ?)
+        """, [
+            (f"load_{n:05d}_i-{n:08x}", rng.choice(STATUSES), rng.choice(GRADIENT_METHODS),
+             f"2025-01-{1 + n % 28:02d}T00:00:00Z")
+            for n in range(runs)
+        ])
+        conn.executemany(
+            "INSERT INTO objectives_catalog (objective_name, direction) VALUES (?, 'maximize')",
+            [(name,) for name in OBJECTIVES]
+        )
+        conn.execute("""
+            INSERT INTO run_objectives (run_id, objective_id, weight, raw_mean, raw_std)
+            SELECT r.run_id, c.objective_id, 1.0, ABS(RANDOM() % 1000) / 1000.0, 0.05
+            FROM training_runs r CROSS JOIN objectives_catalog c
+        """)
+
+
+def request_mix(runs):
+    return [
+        '/stats',
+        '/runs?status=running&limit=50',
+        '/runs?gradient_method=mgda&order_by=created_at%20DESC&limit=100',
+    ] + [f"/runs/load_{n:05d}_i-{n:08x}" for n in range(0, runs, max(1, runs // 20))] + [
+        f"/objectives/{name}/{kind}" for name in OBJECTIVES for kind in ('statistics', 'top', 'compare')
+    ]
+
+
+def client(host, port, paths, deadline, revalidate, results, lock):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    etags = {}
+    latencies = []
+    counts = {200: 0, 304: 0, 'other': 0}
+    rng = random.Random(threading.get_ident())
+
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        headers = {'If-None-Match': etags[path]} if revalidate and path in etags else {}
+        start = time.perf_counter()
+        conn.request('GET', path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+
+        if response.status in (200, 304):
+            counts[response.status] += 1
+            if response.getheader('ETag'):
+                etags[path] = response.getheader('ETag')
+        else:
+            counts['other'] += 1
+
+    conn.close()
+    with lock:
+        results['latencies'].extend(latencies)
+        for key, value in counts.items():
+            results[key] += value
+
+
+def run_phase(label, host, port, paths, args, revalidate):
+    results = {'latencies': [], 200: 0, 304: 0, 'other': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=client, args=(host, port, paths, deadline, revalidate, results, lock))
+        for _ in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(results['latencies'])
+    total = len(latencies)
+    print(f"\n{label}:")
+    print(f"  Requests: {total} in {elapsed:.1f}s ({total / elapsed:.0f} req/s)")
+    if total:
+        print(f"  Latency: p50 {latencies[total // 2] * 1000:.2f}ms, "
+              f"p99 {latencies[min(total - 1, int(total * 0.99))] * 1000:.2f}ms")
+    print(f"  200: {results[200]}, 304: {results[304]}, errors: {results['other']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the training_db HTTP query service')
+    parser.add_argument('--url', help='Target a running server instead of starting one')
+    parser.add_argument('--runs', type=int, default=2000, help='Synthetic runs to seed')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent keep-alive clients')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per phase')
+    parser.add_argument('--pool-size', type=int, default=8, help='Server database connections')
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        from training_db.server import QueryServer
+
+        seed_database(args.runs)
+        server = QueryServer(('127.0.0.1', 0), args.pool_size)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = '127.0.0.1', server.server_port
+
+    paths = request_mix(args.runs)
+    print(f"Load test: {args.clients} clients, {len(paths)} distinct requests, "
+          f"{args.duration:.0f}s per phase, http://{host}:{port}")
+    try:
+        run_phase("Plain GETs", host, port, paths, args, revalidate=False)
+        run_phase("Revalidating (If-None-Match)", host, port, paths, args, revalidate=True)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Load-test concurrent writers, as during a sweep launch.
+
+Starts N writer processes against one throwaway database. Each performs the
+launch-to-completion writes of a training run, over and over:
+insert_run, insert_objective per objective, update_run_status('running'),
+update_objective_metrics and update_run_status('completed').
+All writers start at the same moment. The script then reports writes per
+second, p50/p99/max latency per write, errors by type, and SQLITE_BUSY
+retries (see training_db/retry.py). It finishes by checking that every run
+and objective row actually landed.
+insert_objective only prints its errors, so lost objective rows show up in
+that check.
+
+Usage:
+    python load_test_writes.py                              # 16 writers x 50 runs
+    python load_test_writes.py --writers 64 --runs 20
+    python load_test_writes.py --attempts 1 --busy-timeout 0  # No retries, no lock waiting
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+OBJECTIVES = ['COMT_activity', 'DRD5_activity', 'QED']
+
+
+def writer(number, runs, start_at):
+    """One writer process: `runs` launch-to-completion sequences; returns its measurements."""
+    from training_db import insert_objective, insert_run, update_objective_metrics, update_run_status
+    from training_db.retry import retry_stats
+
+    latencies = []
+    errors = Counter()
+
+    def timed(call, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            call(*args, **kwargs)
+        except Exception as e:
+            errors[f"{type(e).__name__}: {e}"] += 1
+        latencies.append(time.perf_counter() - start)
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # The API prints on every write
+        for n in range(runs):
+            run_id = f"load_w{number:03d}_{n:05d}_i-{number:04x}{n:08x}"
+            timed(insert_run, run_id, None, {'reward': {'gradient_method': 'mgda'}}, status='launched')
+            for name in OBJECTIVES:
+                timed(insert_objective, run_id, name, weight=1.0, direction='maximize')
+            timed(update_run_status, run_id, 'running', wandb_run_id=f"w{number}x{n}")
+            timed(update_objective_metrics, run_id, {name: {'raw_mean': 0.5, 'raw_std': 0.1} for name in OBJECTIVES})
+            timed(update_run_status, run_id, 'completed', duration_seconds=n)
+    return {
+        'latencies': latencies,
+        'errors': errors,
+        'elapsed': time.perf_counter() - started,
+        **retry_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test concurrent training_db writers')
+    parser.add_argument('--writers', type=int, default=16, help='Concurrent writer processes')
+    parser.add_argument('--runs', type=int, default=50, help='Runs written per writer')
+    parser.add_argument('--busy-timeout', type=float, help='Seconds to wait on a lock (TRAINING_DB_BUSY_TIMEOUT)')
+    parser.add_argument('--attempts', type=int, help='Attempts per write (TRAINING_DB_RETRY_ATTEMPTS)')
+    parser.add_argument('--wal', action='store_true', help='Switch the database to WAL mode first')
+    args = parser.parse_args()
+
+    # Throwaway database; settings reach the writers through the environment
+    os.environ['TRAINING_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='mangodb_writes_'), 'training_runs.db')
+    if args.busy_timeout is not None:
+        os.environ['TRAINING_DB_BUSY_TIMEOUT'] = str(args.busy_timeout)
+    if args.attempts is not None:
+        os.environ['TRAINING_DB_RETRY_ATTEMPTS'] = str(args.attempts)
+
+    from training_db.core import get_connection, init_db
+    from training_db.retry import DEFAULT_POLICY, BUSY_TIMEOUT
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db()
+    if args.wal:
+        with get_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+
+    print(f"Load test: {args.writers} writers x {args.runs} runs, busy timeout {BUSY_TIMEOUT}s, "
+          f"{DEFAULT_POLICY.attempts} attempts, {'WAL' if args.wal else 'rollback journal'}")
+
+    start_at = time.time() + 1.0 + args.writers * 0.05  # Time for every process to import
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(args.writers) as pool:
+        results = pool.starmap(writer, [(number, args.runs, start_at) for number in range(args.writers)])
+
+    latencies = sorted(latency for result in results for latency in result['latencies'])
+    errors = sum((result['errors'] for result in results), Counter())
+    elapsed = max(result['elapsed'] for result in results)
+    total = len(latencies)
+
+    print(f"\nWrites: {total} in {elapsed:.1f}s ({total / elapsed:.0f} writes/s)")
+    print(f"Latency: p50 {latencies[total // 2] * 1000:.1f}ms, "
+          f"p99 {latencies[min(total - 1, int(total * 0.99))] * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms")
+    print(f"Retries: {sum(result['retries'] for result in results)}, "
+          f"gave up: {sum(result['exhausted'] for result in results)}")
+    print(f"Errors: {sum(errors.values())}")
+    for error, count in errors.most_common(5):
+        print(f"  {count:6d}  {error}")
+
+    with get_connection() as conn:
+        runs = conn.execute("SELECT COUNT(*) FROM training_runs WHERE status = 'completed'").fetchone()[0]
+        objectives = conn.execute("SELECT COUNT(*) FROM run_objectives WHERE raw_mean IS NOT NULL").fetchone()[0]
+    expected = args.writers * args.runs
+    print(f"Landed: {runs}/{expected} completed runs, {objectives}/{expected * len(OBJECTIVES)} objective results")
+    sys.exit(0 if not errors and runs == expected and objectives == expected * len(OBJECTIVES) else 1)
+
+
+if __name__ == '__main__':
+    main()
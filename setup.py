@@ -16,8 +16,15 @@ setup(
     ],
     extras_require={
         'postgres': ['psycopg2-binary'],  # For PostgreSQL migration
+        'analytics': ['duckdb'],  # DuckDB analytics backend (training_db.analytics)
     },
     package_data={
         'training_db': ['*.sql', '*.md'],
     },
+    entry_points={
+        'console_scripts': [
+            'mangodb=training_db.daemon:main',  # Reconciliation daemon
+            'mangodb-server=training_db.server:main',  # Read-only HTTP query service
+        ],
+    },
 )
@@ -13,6 +13,7 @@ Usage:
 
     # During training
     update_run_status(run_id, 'running', wandb_run_id=wandb.run.id)
+    heartbeat(run_id, step)               # Every step; written at most every 30s
 
     # On completion
     update_objective_metric(run_id, 'COMT_activity', 'raw_mean', 0.856)
@@ -25,14 +26,21 @@ Usage:
 
     # Query by objectives
     runs = query_runs_by_objectives({'COMT_activity': {'min': 0.8}})
+
+Importing the package loads only the SQLite API. The event log (asyncio) and
+the W&B sync helpers (yaml, wandb) are imported on first use of their names.
 """
 
+import importlib
+
 from .core import (
     init_db,
     insert_run,
     update_run_status,
     get_run,
     query_runs,
+    query_runs_between,
+    summarize_durations,
     attach_blog_post,
     attach_crash_data,
     attach_conversation,
@@ -42,19 +50,47 @@ from .core import (
 from .objectives import (
     insert_objective,
     update_objective_metric,
+    update_objective_metrics,
     get_run_objectives,
     query_runs_by_objectives,
     get_objective_statistics,
+    get_objective_distribution,
     compare_gradient_methods,
+    top_k_runs,
     delete_run_objectives,
 )
 
-from .wandb_sync import (
-    get_objectives_display_data,
-    sync_run_complete,
-    parse_config_objectives,
+from .heartbeats import (
+    heartbeat,
+    find_stale_runs,
 )
 
+from .catalog import (
+    parse_objective_alias,
+)
+
+# Names imported on first access (see __getattr__): {name: submodule}
+_LAZY = {
+    'changes_since': 'events',
+    'watch_runs': 'events',
+    'get_objectives_display_data': 'wandb_sync',
+    'sync_run_complete': 'wandb_sync',
+    'parse_config_objectives': 'wandb_sync',
+}
+
+
+def __getattr__(name):
+    submodule = _LAZY.get(name)
+    if submodule is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{submodule}", __name__), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
 __all__ = [
     # Core functions
     'init_db',
@@ -62,6 +98,8 @@ __all__ = [
     'update_run_status',
     'get_run',
     'query_runs',
+    'query_runs_between',
+    'summarize_durations',
     'attach_blog_post',
     'attach_crash_data',
     'attach_conversation',
@@ -69,11 +107,22 @@ __all__ = [
     # Objectives functions
     'insert_objective',
     'update_objective_metric',
+    'update_objective_metrics',
     'get_run_objectives',
     'query_runs_by_objectives',
     'get_objective_statistics',
+    'get_objective_distribution',
     'compare_gradient_methods',
+    'top_k_runs',
     'delete_run_objectives',
+    # Heartbeat functions
+    'heartbeat',
+    'find_stale_runs',
+    # Event log functions
+    'changes_since',
+    'watch_runs',
+    # Catalog functions
+    'parse_objective_alias',
     # W&B sync functions
     'get_objectives_display_data',
     'sync_run_complete',
@@ -0,0 +1,514 @@
+"""
+Analytics Backends
+
+The read-heavy, aggregate queries (gradient-method comparisons, per-objective
+statistics and cross-run history aggregation) go through an AnalyticsBackend,
+so they can run somewhere other than the transactional SQLite store:
+
+    SQLiteAnalytics   The default: plain SQL on the training database, with the
+                      stddev/median UDFs from objective_stats and JSON1 for
+                      run_history.
+    DuckDBAnalytics   Embedded DuckDB (optional: pip install duckdb). Reads the
+                      same SQLite file through DuckDB's sqlite extension, or a
+                      Parquet snapshot written by snapshot_parquet(). In the
+                      snapshot run_history is stored long and sorted
+                      (run_id, step, key, value), so history aggregation is a
+                      columnar scan instead of parsing JSON per step.
+
+Writes never go through a backend; SQLite remains the store of record.
+
+The process-wide backend comes from set_analytics(), else TRAINING_DB_ANALYTICS:
+    sqlite                      (default)
+    duckdb                      DuckDB over the SQLite file
+    duckdb:/path/to/snapshot    DuckDB over a Parquet snapshot directory
+
+Usage:
+    from training_db.analytics import DuckDBAnalytics, get_analytics, set_analytics, snapshot_parquet
+
+    get_analytics().history_summary(['loss'], run_ids=[...])
+
+    snapshot_parquet('/data/snapshots/today')          # Nightly, for notebooks
+    set_analytics(DuckDBAnalytics(parquet_dir='/data/snapshots/today'))
+"""
+
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from . import objective_stats
+from .catalog import get_catalog
+from .core import connection_path, db_path, get_connection
+
+# Tables copied into a Parquet snapshot (run_history is flattened, see below)
+SNAPSHOT_TABLES = ['training_runs', 'objectives_catalog', 'run_objectives']
+HISTORY_VALUES_FILE = 'history_values.parquet'
+
+
+def _json_path(key: str) -> str:
+    """JSON path selecting one top-level key, quoted so '/' and '.' in W&B keys are literal."""
+    return '$."' + key.replace('"', '\\"') + '"'
+
+
+def _summary_row(row) -> Dict[str, Any]:
+    return {'count': row[0], 'min': row[1], 'max': row[2], 'mean': row[3], 'last': row[4]}
+
+
+# ============================================================================
+# Interface
+# ============================================================================
+
+class AnalyticsBackend(ABC):
+    """
+    Aggregate queries over runs, objectives and history
+
+    Implementations return plain dicts/lists in the shapes documented below,
+    so callers (objectives.py, the HTTP service, notebooks) do not care where
+    the query ran. A backend missing any of them cannot be instantiated.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def compare_gradient_methods(self, objective_name: str, status: str = 'completed') -> List[Dict]:
+        """
+        Per-gradient-method results on one objective
+
+        Returns:
+            List of dicts with gradient_method, count, avg, best, worst,
+            avg_hours, best average first
+        """
+
+    @abstractmethod
+    def objective_statistics(
+        self,
+        objective_name: str,
+        gradient_method: Optional[str] = None,
+        status: str = 'completed'
+    ) -> Dict:
+        """
+        Statistics of an objective's raw_mean across runs
+
+        Returns:
+            Dict with count, mean, min, max, avg_std, std, median
+        """
+
+    @abstractmethod
+    def history_summary(
+        self,
+        keys: Sequence[str],
+        run_ids: Optional[Sequence[str]] = None
+    ) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Per-run aggregates of logged history values
+
+        Args:
+            keys: History keys to aggregate (e.g. 'loss')
+            run_ids: Runs to include (default: all)
+
+        Returns:
+            {run_id: {key: {'count', 'min', 'max', 'mean', 'last'}}}; only
+            numeric values count, and 'last' is the value at the highest step
+        """
+
+    @abstractmethod
+    def history_curve(
+        self,
+        key: str,
+        run_ids: Optional[Sequence[str]] = None,
+        bucket_steps: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        One history key aggregated across runs, per bucket of steps
+
+        Returns:
+            List of dicts with step (bucket start), runs, mean, min, max,
+            ordered by step
+        """
+
+    def close(self) -> None:
+        pass
+
+
+# ============================================================================
+# SQLite
+# ============================================================================
+
+class SQLiteAnalytics(AnalyticsBackend):
+    """
+    Analytics on the training database itself
+
+    Without a path, connections come from core.get_connection(), so a
+    process-wide pool (e.g. the HTTP service's read-only one) is used.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+
+    @contextmanager
+    def _connect(self):
+        if self.path is None:
+            with get_connection() as conn:
+                yield conn
+        else:
+            conn = sqlite3.connect(self.path)
+            try:
+                yield conn
+            finally:
+                conn.close()
+
+    def _objective_id(self, conn, objective_name: str) -> Optional[int]:
+        return get_catalog(self.path or connection_path()).get_id(conn, objective_name)
+
+    def compare_gradient_methods(self, objective_name, status='completed'):
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT
+                    r.gradient_method,
+                    COUNT(*) as count,
+                    AVG(o.raw_mean) as avg,
+                    MAX(o.raw_mean) as best,
+                    MIN(o.raw_mean) as worst,
+                    AVG(r.duration_seconds / 3600.0) as avg_hours
+                FROM training_runs r
+                JOIN run_objectives o ON r.run_id = o.run_id
+                WHERE r.status = ?
+                    AND o.objective_id = ?
+                    AND r.gradient_method IS NOT NULL
+                GROUP BY r.gradient_method
+                ORDER BY avg DESC
+            """, (status, self._objective_id(conn, objective_name))).fetchall()
+
+        return [
+            {'gradient_method': row[0], 'count': row[1], 'avg': row[2],
+             'best': row[3], 'worst': row[4], 'avg_hours': row[5]}
+            for row in rows
+        ]
+
+    def objective_statistics(self, objective_name, gradient_method=None, status='completed'):
+        with self._connect() as conn:
+            objective_stats.register_functions(conn)
+            where_clauses = ["r.status = ?", "o.objective_id = ?"]
+            params = [status, self._objective_id(conn, objective_name)]
+
+            if gradient_method:
+                where_clauses.append("r.gradient_method = ?")
+                params.append(gradient_method)
+
+            row = conn.execute(f"""
+                SELECT
+                    COUNT(*) as count,
+                    AVG(o.raw_mean) as mean,
+                    MIN(o.raw_mean) as min,
+                    MAX(o.raw_mean) as max,
+                    AVG(o.raw_std) as avg_std,
+                    stddev(o.raw_mean) as std,
+                    median(o.raw_mean) as median
+                FROM training_runs r
+                JOIN run_objectives o ON r.run_id = o.run_id
+                WHERE {" AND ".join(where_clauses)}
+            """, params).fetchone()
+
+        return {'count': row[0], 'mean': row[1], 'min': row[2], 'max': row[3],
+                'avg_std': row[4], 'std': row[5], 'median': row[6]}
+
+    def _values_sql(self, key: str, run_ids: Optional[Sequence[str]]):
+        """(sql, params) selecting run_id, step, v for one key's numeric values."""
+        sql = """
+            SELECT run_id, step, json_extract(metrics_json, ?) AS v
+            FROM run_history
+            WHERE json_type(metrics_json, ?) IN ('integer', 'real')
+        """
+        params: List[Any] = [_json_path(key), _json_path(key)]
+        if run_ids is not None:
+            sql += f" AND run_id IN ({','.join('?' * len(run_ids))})"
+            params.extend(run_ids)
+        return sql, params
+
+    def history_summary(self, keys, run_ids=None):
+        summary: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        if run_ids is not None and not run_ids:
+            return summary
+
+        with self._connect() as conn:
+            for key in keys:
+                values_sql, params = self._values_sql(key, run_ids)
+                # SQLite takes the bare v of a MAX(step) aggregate from the row holding the max
+                last = dict(conn.execute(
+                    f"SELECT run_id, v FROM (SELECT run_id, MAX(step), v FROM ({values_sql}) GROUP BY run_id)",
+                    params
+                ).fetchall())
+                for row in conn.execute(f"""
+                    SELECT run_id, COUNT(v), MIN(v), MAX(v), AVG(v)
+                    FROM ({values_sql})
+                    GROUP BY run_id
+                """, params):
+                    summary.setdefault(row[0], {})[key] = _summary_row(tuple(row[1:]) + (last.get(row[0]),))
+        return summary
+
+    def history_curve(self, key, run_ids=None, bucket_steps=100):
+        if run_ids is not None and not run_ids:
+            return []
+
+        values_sql, params = self._values_sql(key, run_ids)
+        with self._connect() as conn:
+            rows = conn.execute(f"""
+                SELECT (step / ?) * ? AS bucket, COUNT(DISTINCT run_id), AVG(v), MIN(v), MAX(v)
+                FROM ({values_sql})
+                GROUP BY bucket
+                ORDER BY bucket
+            """, [bucket_steps, bucket_steps] + params).fetchall()
+        return [{'step': row[0], 'runs': row[1], 'mean': row[2], 'min': row[3], 'max': row[4]} for row in rows]
+
+
+# ============================================================================
+# DuckDB
+# ============================================================================
+
+def _import_duckdb():
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError("DuckDB analytics need the duckdb package: pip install duckdb")
+    return duckdb
+
+
+def _sql_string(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _attach_sqlite(conn, path: str) -> None:
+    """
+    Attach a SQLite database read-only as schema src
+
+    Loads DuckDB's sqlite extension, downloading it on first use. Hosts
+    without network access need it installed once from a file (see README).
+    """
+    try:
+        conn.execute("LOAD sqlite")
+    except _import_duckdb().Error:
+        conn.execute("INSTALL sqlite")
+        conn.execute("LOAD sqlite")
+    conn.execute(f"ATTACH {_sql_string(path)} AS src (TYPE SQLITE, READ_ONLY)")
+
+
+# Long (run_id, step, key, value) rows from run_history; numeric values only
+HISTORY_VALUES_SQL = """
+    SELECT run_id, step, key, TRY_CAST(json_extract_string(metrics_json, '$."' || key || '"') AS DOUBLE) AS value
+    FROM (SELECT run_id, step, metrics_json, unnest(json_keys(metrics_json)) AS key FROM src.run_history)
+"""
+
+
+class DuckDBAnalytics(AnalyticsBackend):
+    """
+    Analytics on embedded DuckDB
+
+    Args:
+        path: SQLite database to read (default: TRAINING_DB_PATH); ignored
+            when parquet_dir is given
+        parquet_dir: Directory written by snapshot_parquet()
+
+    Over the live SQLite file DuckDB scans the tables directly, extracting
+    history keys from metrics_json per query; over a snapshot it reads the
+    pre-flattened history_values.parquet.
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, path: Optional[str] = None, parquet_dir: Optional[str] = None):
+        duckdb = _import_duckdb()
+        self.path = path or db_path()
+        self.parquet_dir = parquet_dir
+        self._conn = duckdb.connect(':memory:')
+        self._local = threading.local()
+
+        if parquet_dir is None:
+            _attach_sqlite(self._conn, self.path)
+            for table in SNAPSHOT_TABLES:
+                self._conn.execute(f"CREATE VIEW {table} AS SELECT * FROM src.{table}")
+        else:
+            for table in SNAPSHOT_TABLES + [Path(HISTORY_VALUES_FILE).stem]:
+                file = os.path.join(parquet_dir, f"{table}.parquet")
+                self._conn.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet({_sql_string(file)})")
+
+    def _cursor(self):
+        """A cursor per thread; one DuckDB connection must not be shared between threads."""
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            cursor = self._local.cursor = self._conn.cursor()
+        return cursor
+
+    def _values_sql(self, keys: Sequence[str], run_ids: Optional[Sequence[str]]):
+        """(sql, params) selecting run_id, step, key, value for the given keys."""
+        params: List[Any] = []
+        if self.parquet_dir is not None:
+            sql = f"SELECT run_id, step, key, value FROM history_values WHERE key IN ({','.join('?' * len(keys))})"
+            params.extend(keys)
+        else:
+            sql = " UNION ALL ".join(
+                "SELECT run_id, step, ? AS key, TRY_CAST(json_extract_string(metrics_json, ?) AS DOUBLE) AS value "
+                "FROM src.run_history"
+                for _ in keys
+            )
+            for key in keys:
+                params.extend([key, _json_path(key)])
+            sql = f"SELECT * FROM ({sql}) WHERE value IS NOT NULL"
+        if run_ids is not None:
+            sql = f"SELECT * FROM ({sql}) WHERE run_id IN ({','.join('?' * len(run_ids))})"
+            params.extend(run_ids)
+        return sql, params
+
+    def compare_gradient_methods(self, objective_name, status='completed'):
+        rows = self._cursor().execute("""
+            SELECT
+                r.gradient_method,
+                COUNT(*) AS count,
+                AVG(o.raw_mean) AS avg,
+                MAX(o.raw_mean) AS best,
+                MIN(o.raw_mean) AS worst,
+                AVG(r.duration_seconds / 3600.0) AS avg_hours
+            FROM training_runs r
+            JOIN run_objectives o ON r.run_id = o.run_id
+            JOIN objectives_catalog c ON c.objective_id = o.objective_id
+            WHERE r.status = ?
+                AND c.objective_name = ?
+                AND r.gradient_method IS NOT NULL
+            GROUP BY r.gradient_method
+            ORDER BY avg DESC
+        """, [status, objective_name]).fetchall()
+
+        return [
+            {'gradient_method': row[0], 'count': row[1], 'avg': row[2],
+             'best': row[3], 'worst': row[4], 'avg_hours': row[5]}
+            for row in rows
+        ]
+
+    def objective_statistics(self, objective_name, gradient_method=None, status='completed'):
+        where_clauses = ["r.status = ?", "c.objective_name = ?"]
+        params: List[Any] = [status, objective_name]
+        if gradient_method:
+            where_clauses.append("r.gradient_method = ?")
+            params.append(gradient_method)
+
+        row = self._cursor().execute(f"""
+            SELECT
+                COUNT(*),
+                AVG(o.raw_mean),
+                MIN(o.raw_mean),
+                MAX(o.raw_mean),
+                AVG(o.raw_std),
+                stddev_samp(o.raw_mean),
+                median(o.raw_mean)
+            FROM training_runs r
+            JOIN run_objectives o ON r.run_id = o.run_id
+            JOIN objectives_catalog c ON c.objective_id = o.objective_id
+            WHERE {" AND ".join(where_clauses)}
+        """, params).fetchone()
+
+        return {'count': row[0], 'mean': row[1], 'min': row[2], 'max': row[3],
+                'avg_std': row[4], 'std': row[5], 'median': row[6]}
+
+    def history_summary(self, keys, run_ids=None):
+        summary: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        if not keys or (run_ids is not None and not run_ids):
+            return summary
+
+        values_sql, params = self._values_sql(keys, run_ids)
+        for row in self._cursor().execute(f"""
+            SELECT run_id, key, COUNT(value), MIN(value), MAX(value), AVG(value), arg_max(value, step)
+            FROM ({values_sql})
+            GROUP BY run_id, key
+        """, params).fetchall():
+            summary.setdefault(row[0], {})[row[1]] = _summary_row(row[2:])
+        return summary
+
+    def history_curve(self, key, run_ids=None, bucket_steps=100):
+        if run_ids is not None and not run_ids:
+            return []
+
+        values_sql, params = self._values_sql([key], run_ids)
+        rows = self._cursor().execute(f"""
+            SELECT (step // ?) * ? AS bucket, COUNT(DISTINCT run_id), AVG(value), MIN(value), MAX(value)
+            FROM ({values_sql})
+            GROUP BY bucket
+            ORDER BY bucket
+        """, [bucket_steps, bucket_steps] + params).fetchall()
+        return [{'step': row[0], 'runs': row[1], 'mean': row[2], 'min': row[3], 'max': row[4]} for row in rows]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def snapshot_parquet(out_dir: str, path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Write a Parquet snapshot of the training database for DuckDBAnalytics
+
+    Copies training_runs, objectives_catalog and run_objectives as they are,
+    and flattens run_history into history_values.parquet: one
+    (run_id, step, key, value) row per numeric value, sorted by key, run_id
+    and step so per-key scans read contiguous row groups.
+
+    Args:
+        out_dir: Directory to write (created if missing; files are replaced)
+        path: SQLite database (default: TRAINING_DB_PATH)
+
+    Returns:
+        {file name: rows written}
+    """
+    duckdb = _import_duckdb()
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    conn = duckdb.connect(':memory:')
+    try:
+        _attach_sqlite(conn, path or db_path())
+        queries = {f"{table}.parquet": f"SELECT * FROM src.{table}" for table in SNAPSHOT_TABLES}
+        queries[HISTORY_VALUES_FILE] = (
+            f"SELECT * FROM ({HISTORY_VALUES_SQL}) WHERE value IS NOT NULL ORDER BY key, run_id, step"
+        )
+
+        written = {}
+        for name, query in queries.items():
+            file = os.path.join(out_dir, name)
+            conn.execute(f"COPY ({query}) TO {_sql_string(file)} (FORMAT PARQUET)")
+            written[name] = conn.execute(f"SELECT COUNT(*) FROM read_parquet({_sql_string(file)})").fetchone()[0]
+        return written
+    finally:
+        conn.close()
+
+
+# ============================================================================
+# Process-wide backend
+# ============================================================================
+
+_backend: Optional[AnalyticsBackend] = None
+_backend_lock = threading.Lock()
+
+
+def backend_from_spec(spec: str) -> AnalyticsBackend:
+    """Build a backend from a TRAINING_DB_ANALYTICS value ('sqlite', 'duckdb' or 'duckdb:<parquet dir>')."""
+    name, _, argument = spec.partition(':')
+    if name == 'sqlite':
+        return SQLiteAnalytics()
+    if name == 'duckdb':
+        return DuckDBAnalytics(parquet_dir=argument or None)
+    raise ValueError(f"Unknown analytics backend {spec!r} (expected sqlite, duckdb or duckdb:<dir>)")
+
+
+def get_analytics() -> AnalyticsBackend:
+    """The backend set with set_analytics(), else the one TRAINING_DB_ANALYTICS names."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = backend_from_spec(os.environ.get('TRAINING_DB_ANALYTICS', 'sqlite'))
+        return _backend
+
+
+def set_analytics(backend: Optional[AnalyticsBackend]) -> None:
+    """Route analytics through a backend for this process (None: back to TRAINING_DB_ANALYTICS)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,164 @@
+"""
+Parallel JSON Backfill
+
+Re-derives columns from stored JSON (config_json, final_metrics_json) with the
+json.loads/extract work spread over a process pool. One reader streams chunks of
+rows to the workers and a single writer applies their results, one transaction
+per chunk, so SQLite still only ever sees one writer.
+
+Usage:
+    # Re-extract hyperparameter columns after adding one to extract_hyperparameters()
+    python3 -m training_db.backfill hyperparameters --workers 8
+
+    # Re-run the objectives backfill of schema v2
+    python3 -m training_db.backfill objectives --workers 8
+
+    # Or run a migration with parallel backfills
+    migrate(db_path, mapper=ProcessPoolMapper(workers=8))
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import core
+from .core import extract_hyperparameters
+from .migrations import (
+    DEFAULT_CHUNK_SIZE,
+    HISTORY_BACKFILL,
+    OBJECTIVES_BACKFILL,
+    Backfill,
+    map_serial,
+    run_backfill,
+)
+
+
+def _extract_rows(extract: Callable[[tuple], Any], rows: List[tuple]) -> List[Any]:
+    return [extract(row) for row in rows]
+
+
+class ProcessPoolMapper:
+    """
+    Chunk mapper that runs extract() in worker processes
+
+    Keeps up to max_in_flight chunks queued in the pool (bounding memory) and
+    yields results in submission order so the writer can checkpoint by rowid.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_in_flight: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or 2 * self.workers
+
+    def __call__(
+        self,
+        extract: Callable[[tuple], Any],
+        chunks: Iterable[List[tuple]]
+    ) -> Iterator[Tuple[List[tuple], List[Any]]]:
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for rows in chunks:
+                pending.append((rows, pool.submit(_extract_rows, extract, rows)))
+                if len(pending) >= self.max_in_flight:
+                    rows, future = pending.popleft()
+                    yield rows, future.result()
+
+            while pending:
+                rows, future = pending.popleft()
+                yield rows, future.result()
+
+
+# ============================================================================
+# Hyperparameter re-extraction
+# ============================================================================
+
+def extract_run_hyperparameters(row) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Parse config_json of one run into its hyperparameter columns
+
+    Args:
+        row: (rowid, run_id, config_json)
+    """
+    _, run_id, config_json = row
+    if not config_json:
+        return None
+    try:
+        return run_id, extract_hyperparameters(json.loads(config_json))
+    except (json.JSONDecodeError, AttributeError, TypeError):
+        return None
+
+
+def apply_run_hyperparameters(conn, results: List[Optional[Tuple[str, Dict[str, Any]]]]) -> int:
+    """Write extract_run_hyperparameters() results; returns number of runs updated."""
+    updated = 0
+    for result in results:
+        if result is None:
+            continue
+        run_id, columns = result
+        updated += conn.execute(f"""
+            UPDATE training_runs
+            SET {', '.join(f'{column} = ?' for column in columns)}
+            WHERE run_id = ?
+        """, list(columns.values()) + [run_id]).rowcount
+    return updated
+
+
+HYPERPARAMETERS = Backfill(
+    name='hyperparameters',
+    table='training_runs',
+    columns=('run_id', 'config_json'),
+    extract=extract_run_hyperparameters,
+    apply=apply_run_hyperparameters,
+)
+
+BACKFILLS = {
+    'history': HISTORY_BACKFILL,
+    'hyperparameters': HYPERPARAMETERS,
+    'objectives': OBJECTIVES_BACKFILL,
+}
+
+
+def run_parallel_backfill(
+    backfill: Backfill,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    db_path: Optional[str] = None,
+    verbose: bool = True
+) -> int:
+    """
+    Run a backfill over all rows with extraction in a process pool
+
+    Args:
+        backfill: What to re-derive (e.g. HYPERPARAMETERS)
+        workers: Worker processes (default: CPU count); 1 runs in this process
+        chunk_size: Rows per worker task and per write transaction
+        db_path: Database file (default: TRAINING_DB_PATH)
+        verbose: Print progress and throughput
+
+    Returns:
+        Rows processed
+    """
+    conn = sqlite3.connect(db_path or core.db_path())
+    try:
+        mapper = map_serial if workers == 1 else ProcessPoolMapper(workers)
+        return run_backfill(conn, backfill, chunk_size, mapper, verbose=verbose)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-derive training_db columns from stored JSON')
+    parser.add_argument('backfill', choices=sorted(BACKFILLS), help='What to re-derive')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='Rows per worker task and per write transaction')
+    args = parser.parse_args()
+
+    run_parallel_backfill(BACKFILLS[args.backfill], workers=args.workers, chunk_size=args.chunk_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+Objectives Catalog
+
+Interns objective names into small integer IDs. run_objectives rows reference
+objectives_catalog.objective_id instead of repeating name/alias/uniprot strings,
+and W&B alias parsing ("COMT_activity_maximize" -> "COMT_activity") lives here.
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+DIRECTIONS = ('maximize', 'minimize')
+
+METRIC_TYPES = ('raw_mean', 'normalized_mean', 'raw_std', 'normalized_std')
+
+
+def parse_objective_alias(alias: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a W&B objective alias into (objective_name, direction)
+
+    Example:
+        parse_objective_alias('COMT_activity_maximize')  # ('COMT_activity', 'maximize')
+        parse_objective_alias('QED')                     # ('QED', None)
+    """
+    for direction in DIRECTIONS:
+        suffix = f"_{direction}"
+        if alias.endswith(suffix):
+            return alias[:-len(suffix)], direction
+    return alias, None
+
+
+def parse_metric_key(key: str) -> Optional[Tuple[str, str, Optional[str], str]]:
+    """
+    Parse a W&B objective metric key
+
+    Args:
+        key: Summary/history key, e.g. "objectives/COMT_activity_maximize/raw_mean"
+
+    Returns:
+        (objective_name, objective_alias, direction, metric_type), or None if the
+        key is not an objective metric
+    """
+    parts = key.split('/')
+    if len(parts) != 3 or parts[0] != 'objectives' or parts[2] not in METRIC_TYPES:
+        return None
+
+    objective_alias = parts[1]
+    objective_name, direction = parse_objective_alias(objective_alias)
+    return objective_name, objective_alias, direction, parts[2]
+
+
+class ObjectiveCatalog:
+    """In-process name <-> ID cache in front of the objectives_catalog table."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._entries: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, row) -> int:
+        entry = {
+            'objective_id': row[0],
+            'objective_name': row[1],
+            'objective_alias': row[2],
+            'uniprot': row[3],
+            'direction': row[4],
+        }
+        with self._lock:
+            self._ids[entry['objective_name']] = entry['objective_id']
+            self._entries[entry['objective_id']] = entry
+        return entry['objective_id']
+
+    def get_id(self, conn, objective_name: str) -> Optional[int]:
+        """Resolve a canonical objective name to its ID (None if never seen)."""
+        objective_id = self._ids.get(objective_name)
+        if objective_id is not None:
+            return objective_id
+
+        row = conn.execute("""
+            SELECT objective_id, objective_name, objective_alias, uniprot, direction
+            FROM objectives_catalog
+            WHERE objective_name = ?
+        """, (objective_name,)).fetchone()
+
+        return self._remember(row) if row else None
+
+    def get_entry(self, conn, objective_id: int) -> Optional[Dict]:
+        """Resolve an objective ID to its catalog entry."""
+        entry = self._entries.get(objective_id)
+        if entry is not None:
+            return dict(entry)
+
+        row = conn.execute("""
+            SELECT objective_id, objective_name, objective_alias, uniprot, direction
+            FROM objectives_catalog
+            WHERE objective_id = ?
+        """, (objective_id,)).fetchone()
+
+        if not row:
+            return None
+        self._remember(row)
+        return dict(self._entries[objective_id])
+
+    def intern(
+        self,
+        conn,
+        objective_name: str,
+        objective_alias: Optional[str] = None,
+        uniprot: Optional[str] = None,
+        direction: Optional[str] = None
+    ) -> int:
+        """
+        Return the ID for an objective, creating the catalog entry if needed
+
+        Attributes missing from an existing entry (alias, uniprot, direction)
+        are filled in; attributes already recorded are never overwritten.
+        """
+        if direction is None and objective_alias:
+            direction = parse_objective_alias(objective_alias)[1]
+
+        objective_id = self._ids.get(objective_name)
+        if objective_id is not None:
+            entry = self._entries[objective_id]
+            if all(
+                value is None or entry[field] is not None
+                for field, value in (
+                    ('objective_alias', objective_alias),
+                    ('uniprot', uniprot),
+                    ('direction', direction),
+                )
+            ):
+                return objective_id
+
+        conn.execute("""
+            INSERT INTO objectives_catalog (
+                objective_name, objective_alias, uniprot, direction
+            ) VALUES (?, ?, ?, ?)
+            ON CONFLICT(objective_name) DO UPDATE SET
+                objective_alias = COALESCE(objective_alias, excluded.objective_alias),
+                uniprot = COALESCE(uniprot, excluded.uniprot),
+                direction = COALESCE(direction, excluded.direction)
+        """, (objective_name, objective_alias, uniprot, direction))
+
+        row = conn.execute("""
+            SELECT objective_id, objective_name, objective_alias, uniprot, direction
+            FROM objectives_catalog
+            WHERE objective_name = ?
+        """, (objective_name,)).fetchone()
+
+        return self._remember(row)
+
+    def clear(self) -> None:
+        """Drop all cached entries (e.g. after a migration rebuilt the catalog)."""
+        with self._lock:
+            self._ids.clear()
+            self._entries.clear()
+
+
+_catalogs: Dict[str, ObjectiveCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(db_path: str) -> ObjectiveCatalog:
+    """Get the process-wide catalog cache for a database file."""
+    with _catalogs_lock:
+        catalog = _catalogs.get(db_path)
+        if catalog is None:
+            catalog = _catalogs[db_path] = ObjectiveCatalog()
+        return catalog
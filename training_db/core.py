@@ -3,23 +3,96 @@
 import sqlite3
 import json
 import os
+import queue
 from pathlib import Path
 from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
-# Database path (can be overridden via environment variable)
-DB_PATH = os.environ.get('TRAINING_DB_PATH', os.path.expanduser('~/mango/data/training_runs.db'))
+from .migrations import NOW_MS_SQL, SCHEMA_VERSION, epoch_ms_sql, get_schema_version, migrate
+from .retry import connect, retry_on_busy
+from .run_matching import parse_timestamp
 
-# Ensure data directory exists
-Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+DEFAULT_DB_PATH = os.path.expanduser('~/mango/data/training_runs.db')
+
+
+def db_path() -> str:
+    """
+    Database path: TRAINING_DB_PATH, read at call time, else DEFAULT_DB_PATH
+
+    Every module resolves the path through here, so reads and writes always
+    go to the same file even when the variable is set after import.
+    """
+    return os.environ.get('TRAINING_DB_PATH', DEFAULT_DB_PATH)
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of reusable connections to one database (thread-safe)
+
+    Long-running processes (see daemon.py) install one with
+    set_connection_pool() so get_connection() borrows connections instead of
+    opening a new one per call. Connections are opened on first use; callers
+    block while all `size` are borrowed. With read_only, connections are opened
+    with mode=ro and any write through them fails.
+    """
+
+    def __init__(self, size: int = 4, path: Optional[str] = None, read_only: bool = False):
+        self.path = path or db_path()
+        self.read_only = read_only
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        for _ in range(size):
+            self._idle.put(None)  # Placeholder until first use
+
+    def acquire(self) -> sqlite3.Connection:
+        conn = self._idle.get()
+        if conn is None:
+            if self.read_only:
+                uri = Path(self.path).resolve().as_uri() + '?mode=ro'
+                conn = sqlite3.connect(uri, uri=True, timeout=30, check_same_thread=False)
+            else:
+                conn = connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._all.append(conn)
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        """Close every connection opened so far (borrowed ones included)."""
+        for conn in self._all:
+            conn.close()
+        self._all.clear()
+
+
+_pool: Optional[ConnectionPool] = None
+
+
+def set_connection_pool(pool: Optional[ConnectionPool]) -> None:
+    """Route get_connection() through a pool (None: back to one connection per call)."""
+    global _pool
+    _pool = pool
+
+
+def connection_path() -> str:
+    """Database file get_connection() reads and writes (the pool's, when one is installed)."""
+    pool = _pool
+    return pool.path if pool is not None else db_path()
 
 
 @contextmanager
 def get_connection():
     """Context manager for database connections."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # Return dicts instead of tuples
+    pool = _pool
+    if pool is not None:
+        conn = pool.acquire()
+    else:
+        conn = connect(db_path())
+        conn.row_factory = sqlite3.Row  # Return dicts instead of tuples
     try:
         yield conn
         conn.commit()
@@ -27,22 +100,95 @@ def get_connection():
         conn.rollback()
         raise
     finally:
-        conn.close()
+        if pool is not None:
+            pool.release(conn)
+        else:
+            conn.close()
 
 
 def init_db():
-    """Initialize database with schema (idempotent)."""
-    schema_path = Path(__file__).parent / 'schema.sql'
-
-    with open(schema_path, 'r') as f:
-        schema_sql = f.read()
+    """
+    Initialize or upgrade the database schema (idempotent).
 
+    Reads PRAGMA user_version and returns without touching the schema when the
+    database is already current; otherwise runs pending migrations.
+    """
     with get_connection() as conn:
-        conn.executescript(schema_sql)
+        version = get_schema_version(conn)
 
-    print(f"Database initialized at {DB_PATH}")
+    if version < SCHEMA_VERSION:
+        version = migrate(db_path())
 
+    print(f"Database initialized at {db_path()} (schema v{version})")
 
+
+def extract_hyperparameters(config_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract the indexed hyperparameter columns of training_runs from a config.
+
+    Shared by insert_run() and the hyperparameter re-extraction backfill, so
+    adding a column here is enough to populate it for old runs too.
+    """
+    training = config_dict.get('training', {})
+    reward = config_dict.get('reward', {})
+    grouping = config_dict.get('grouping', {})
+
+    return {
+        # Original 7 fields
+        'batch_size': training.get('batch_size'),
+        'learning_rate': training.get('learning_rate'),
+        'beta': reward.get('beta'),
+        'gradient_method': reward.get('gradient_method'),
+        'num_gpus': training.get('num_processes') or config_dict.get('distributed', {}).get('num_processes'),
+        'num_objectives': len(config_dict.get('objectives', [])),
+        'num_scaffolds': len(config_dict.get('generation', {}).get('scaffolds', [])),
+        # New 13 fields
+        'gradient_accumulation_steps': training.get('gradient_accumulation_steps'),
+        'max_steps': training.get('max_steps'),
+        'max_grad_norm': training.get('max_grad_norm'),
+        'mixed_precision': training.get('mixed_precision'),
+        'gradient_checkpointing': training.get('gradient_checkpointing'),
+        'fp16': training.get('fp16'),
+        'bf16': training.get('bf16'),
+        'enable_moving_targets': reward.get('enable_moving_targets'),
+        'return_groups': grouping.get('return_groups'),
+        'n_clusters': grouping.get('n_clusters'),
+    }
+
+
+def _run_insert(
+    run_id: str,
+    wandb_run_id: Optional[str],
+    config_dict: Dict[str, Any],
+    chain_of_custody_id: Optional[str] = None,
+    or_ignore: bool = False,
+    **kwargs
+):
+    """Build the INSERT statement and parameters for insert_run()."""
+    values = {
+        'run_id': run_id,
+        'wandb_run_id': wandb_run_id,
+        'run_name': kwargs.get('run_name'),
+        'config_file_path': kwargs.get('config_file_path'),
+        'host': kwargs.get('host'),
+        'instance_id': kwargs.get('instance_id'),
+        'chain_of_custody_id': chain_of_custody_id,
+        'created_at': kwargs.get('created_at') or datetime.utcnow().isoformat() + 'Z',
+        'status': kwargs.get('status', 'running'),  # Default to 'running' if not specified
+        'config_json': json.dumps(config_dict),
+    }
+    values.update(extract_hyperparameters(config_dict))
+
+    # Epoch-ms columns in the same statement (the fallback trigger then skips the row)
+    columns = list(values) + ['created_ms', 'updated_ms']
+    placeholders = ['?' for _ in values] + [epoch_ms_sql('?'), NOW_MS_SQL]
+    return f"""
+        INSERT {'OR IGNORE ' if or_ignore else ''}INTO training_runs ({', '.join(columns)})
+        VALUES ({', '.join(placeholders)})
+    """, list(values.values()) + [values['created_at']]
+
+
+@retry_on_busy
 def insert_run(
     run_id: str,
     wandb_run_id: Optional[str],
@@ -60,67 +206,63 @@ def insert_run(
         chain_of_custody_id: 6-character tracking ID
         **kwargs: Additional fields (run_name, config_file_path, host, instance_id)
     """
-    # Extract training config
-    training = config_dict.get('training', {})
-    reward = config_dict.get('reward', {})
-    grouping = config_dict.get('grouping', {})
-
     with get_connection() as conn:
-        conn.execute("""
-            INSERT INTO training_runs (
-                run_id, wandb_run_id, run_name, config_file_path,
-                host, instance_id, chain_of_custody_id,
-                created_at, status, config_json,
-                batch_size, learning_rate, beta, gradient_method,
-                num_gpus, num_objectives, num_scaffolds,
-                gradient_accumulation_steps, max_steps, max_grad_norm,
-                mixed_precision, gradient_checkpointing, fp16, bf16,
-                enable_moving_targets, return_groups, n_clusters
-            ) VALUES (
-                ?, ?, ?, ?,
-                ?, ?, ?,
-                ?, ?, ?,
-                ?, ?, ?, ?,
-                ?, ?, ?,
-                ?, ?, ?,
-                ?, ?, ?, ?,
-                ?, ?, ?
-            )
-        """, (
-            run_id,
-            wandb_run_id,
-            kwargs.get('run_name'),
-            kwargs.get('config_file_path'),
-            kwargs.get('host'),
-            kwargs.get('instance_id'),
-            chain_of_custody_id,
-            datetime.utcnow().isoformat() + 'Z',
-            kwargs.get('status', 'running'),  # Default to 'running' if not specified
-            json.dumps(config_dict),
-            # Original 7 fields
-            training.get('batch_size'),
-            training.get('learning_rate'),
-            reward.get('beta'),
-            reward.get('gradient_method'),
-            training.get('num_processes') or config_dict.get('distributed', {}).get('num_processes'),
-            len(config_dict.get('objectives', [])),
-            len(config_dict.get('generation', {}).get('scaffolds', [])),
-            # New 13 fields
-            training.get('gradient_accumulation_steps'),
-            training.get('max_steps'),
-            training.get('max_grad_norm'),
-            training.get('mixed_precision'),
-            training.get('gradient_checkpointing'),
-            training.get('fp16'),
-            training.get('bf16'),
-            reward.get('enable_moving_targets'),
-            grouping.get('return_groups'),
-            grouping.get('n_clusters')
-        ))
+        conn.execute(*_run_insert(run_id, wandb_run_id, config_dict, chain_of_custody_id, **kwargs))
 
     print(f"Inserted run {run_id} into database")
 
 
+def _status_update(run_id: str, status: str, **kwargs):
+    """Build the UPDATE statement and parameters for update_run_status()."""
+    set_clauses = ['status = ?', f'updated_ms = {NOW_MS_SQL}']
+    params = [status]
+
+    # Add optional fields
+    if 'duration_seconds' in kwargs:
+        set_clauses.append('duration_seconds = ?')
+        params.append(kwargs['duration_seconds'])
+
+    if 'final_metrics_json' in kwargs:
+        set_clauses.append('final_metrics_json = ?')
+        params.append(json.dumps(kwargs['final_metrics_json']))
+
+    if 'history_json' in kwargs:
+        set_clauses.append('history_json = ?')
+        params.append(json.dumps(kwargs['history_json']))
+
+    if 'ended_at' in kwargs:
+        set_clauses.extend(['ended_at = ?', f'ended_ms = {epoch_ms_sql("?")}'])
+        value = kwargs['ended_at'].isoformat() + 'Z' if hasattr(kwargs['ended_at'], 'isoformat') else kwargs['ended_at']
+        params.extend([value, value])
+
+    if 'started_at' in kwargs:
+        set_clauses.extend(['started_at = ?', f'started_ms = {epoch_ms_sql("?")}'])
+        value = kwargs['started_at'].isoformat() + 'Z' if hasattr(kwargs['started_at'], 'isoformat') else kwargs['started_at']
+        params.extend([value, value])
+
+    if 'wandb_run_id' in kwargs:
+        set_clauses.append('wandb_run_id = ?')
+        params.append(kwargs['wandb_run_id'])
+
+    if 'wandb_url' in kwargs:
+        set_clauses.append('wandb_url = ?')
+        params.append(kwargs['wandb_url'])
+
+    if 'run_name' in kwargs:
+        set_clauses.append('run_name = ?')
+        params.append(kwargs['run_name'])
+
+    params.append(run_id)  # For WHERE clause
+
+    sql = f"""
+        UPDATE training_runs
+        SET {', '.join(set_clauses)}
+        WHERE run_id = ?
+    """
+    return sql, params
+
+
+@retry_on_busy
 def update_run_status(
     run_id: str,
     status: str,
@@ -136,53 +278,35 @@ def update_run_status(
                   ended_at, started_at, wandb_run_id, wandb_url, run_name, history_json)
     """
     with get_connection() as conn:
-        set_clauses = ['status = ?']
-        params = [status]
-
-        # Add optional fields
-        if 'duration_seconds' in kwargs:
-            set_clauses.append('duration_seconds = ?')
-            params.append(kwargs['duration_seconds'])
-
-        if 'final_metrics_json' in kwargs:
-            set_clauses.append('final_metrics_json = ?')
-            params.append(json.dumps(kwargs['final_metrics_json']))
-
-        if 'history_json' in kwargs:
-            set_clauses.append('history_json = ?')
-            params.append(json.dumps(kwargs['history_json']))
-
-        if 'ended_at' in kwargs:
-            set_clauses.append('ended_at = ?')
-            params.append(kwargs['ended_at'].isoformat() + 'Z' if hasattr(kwargs['ended_at'], 'isoformat') else kwargs['ended_at'])
+        conn.execute(*_status_update(run_id, status, **kwargs))
 
-        if 'started_at' in kwargs:
-            set_clauses.append('started_at = ?')
-            params.append(kwargs['started_at'].isoformat() + 'Z' if hasattr(kwargs['started_at'], 'isoformat') else kwargs['started_at'])
+    print(f"Updated run {run_id}: status={status}")
 
-        if 'wandb_run_id' in kwargs:
-            set_clauses.append('wandb_run_id = ?')
-            params.append(kwargs['wandb_run_id'])
 
-        if 'wandb_url' in kwargs:
-            set_clauses.append('wandb_url = ?')
-            params.append(kwargs['wandb_url'])
+@retry_on_busy
+def update_runs_status(updates: List[Dict[str, Any]]) -> int:
+    """
+    Apply several update_run_status() calls in a single transaction.
 
-        if 'run_name' in kwargs:
-            set_clauses.append('run_name = ?')
-            params.append(kwargs['run_name'])
+    Args:
+        updates: Dicts with 'run_id', 'status' and any optional update_run_status() fields
 
-        params.append(run_id)  # For WHERE clause
+    Returns:
+        Number of runs updated
+    """
+    if not updates:
+        return 0
 
-        conn.execute(f"""
-            UPDATE training_runs
-            SET {', '.join(set_clauses)}
-            WHERE run_id = ?
-        """, params)
+    updated = 0
+    with get_connection() as conn:
+        for update in updates:
+            fields = {k: v for k, v in update.items() if k not in ('run_id', 'status')}
+            updated += conn.execute(*_status_update(update['run_id'], update['status'], **fields)).rowcount
 
-    print(f"Updated run {run_id}: status={status}")
+    return updated
 
 
+@retry_on_busy
 def attach_blog_post(run_id: str, blog_url: str) -> None:
     """Attach blog post URL (called from blog workflow)."""
     with get_connection() as conn:
@@ -195,6 +319,7 @@ def attach_blog_post(run_id: str, blog_url: str) -> None:
     print(f"Attached blog post to run {run_id}: {blog_url}")
 
 
+@retry_on_busy
 def attach_crash_data(
     run_id: str,
     error_log_s3_key: str,
@@ -222,6 +347,7 @@ def attach_crash_data(
     print(f"Attached crash data to run {run_id}")
 
 
+@retry_on_busy
 def attach_conversation(run_id: str, conversation_s3_key: str) -> None:
     """Attach conversation context (called at launch)."""
     with get_connection() as conn:
@@ -234,9 +360,76 @@ def attach_conversation(run_id: str, conversation_s3_key: str) -> None:
     print(f"Attached conversation to run {run_id}: {conversation_s3_key}")
 
 
+def to_epoch_ms(value: Any) -> Optional[int]:
+    """
+    Timestamp -> UTC epoch milliseconds (the *_ms columns)
+
+    Accepts a datetime or ISO string (with or without 'Z'; naive means UTC),
+    or epoch milliseconds as a number or digit string. None stays None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return int(round(parse_timestamp(value) * 1000))
+
+
+# Time-range filters on the indexed epoch-millisecond columns: name -> (column, operator)
+TIME_FILTERS = {
+    f"{field}_{side}": (f"{field}_ms", '>=' if side == 'after' else '<')
+    for field in ('created', 'started', 'ended', 'updated')
+    for side in ('after', 'before')
+}
+
+
+def _run_filters(filters: Optional[Dict[str, Any]]):
+    """WHERE clause and parameters for query_runs() filters."""
+    where_clauses = []
+    params = []
+
+    if filters:
+        if 'status' in filters:
+            where_clauses.append('status = ?')
+            params.append(filters['status'])
+
+        if 'host' in filters:
+            where_clauses.append('host = ?')
+            params.append(filters['host'])
+
+        if 'gradient_method' in filters:
+            where_clauses.append('gradient_method = ?')
+            params.append(filters['gradient_method'])
+
+        if 'min_duration_hours' in filters:
+            where_clauses.append('duration_seconds >= ?')
+            params.append(filters['min_duration_hours'] * 3600)
+
+        for name, (column, operator) in TIME_FILTERS.items():
+            if filters.get(name) is not None:
+                where_clauses.append(f'{column} {operator} ?')
+                params.append(to_epoch_ms(filters[name]))
+
+        if 'has_blog_post' in filters:
+            if filters['has_blog_post']:
+                where_clauses.append('blog_post_url IS NOT NULL')
+            else:
+                where_clauses.append('blog_post_url IS NULL')
+
+        if 'has_crash_analysis' in filters:
+            if filters['has_crash_analysis']:
+                where_clauses.append('crash_analysis_s3_key IS NOT NULL')
+            else:
+                where_clauses.append('crash_analysis_s3_key IS NULL')
+
+    where_sql = ' AND '.join(where_clauses) if where_clauses else '1=1'
+    return where_sql, params
+
+
 def query_runs(
     filters: Optional[Dict[str, Any]] = None,
-    order_by: str = 'created_at DESC',
+    order_by: str = 'created_ms DESC',
     limit: int = 100
 ) -> List[Dict[str, Any]]:
     """
@@ -248,53 +441,19 @@ def query_runs(
             - host: Filter by host ('expanse' or 'ec2')
             - gradient_method: Filter by gradient method
             - min_duration_hours: Minimum duration in hours
-            - created_after: ISO timestamp string
+            - created_after / created_before: Time range (see to_epoch_ms();
+              after is inclusive, before exclusive). Also started_*, ended_*
+              and updated_*
             - has_blog_post: True/False
             - has_crash_analysis: True/False
-        order_by: ORDER BY clause (default: 'created_at DESC')
+        order_by: ORDER BY clause (default: 'created_ms DESC')
         limit: Maximum results to return
 
     Returns:
         List of run dictionaries
     """
     with get_connection() as conn:
-        where_clauses = []
-        params = []
-
-        if filters:
-            if 'status' in filters:
-                where_clauses.append('status = ?')
-                params.append(filters['status'])
-
-            if 'host' in filters:
-                where_clauses.append('host = ?')
-                params.append(filters['host'])
-
-            if 'gradient_method' in filters:
-                where_clauses.append('gradient_method = ?')
-                params.append(filters['gradient_method'])
-
-            if 'min_duration_hours' in filters:
-                where_clauses.append('duration_seconds >= ?')
-                params.append(filters['min_duration_hours'] * 3600)
-
-            if 'created_after' in filters:
-                where_clauses.append('created_at >= ?')
-                params.append(filters['created_after'])
-
-            if 'has_blog_post' in filters:
-                if filters['has_blog_post']:
-                    where_clauses.append('blog_post_url IS NOT NULL')
-                else:
-                    where_clauses.append('blog_post_url IS NULL')
-
-            if 'has_crash_analysis' in filters:
-                if filters['has_crash_analysis']:
-                    where_clauses.append('crash_analysis_s3_key IS NOT NULL')
-                else:
-                    where_clauses.append('crash_analysis_s3_key IS NULL')
-
-        where_sql = ' AND '.join(where_clauses) if where_clauses else '1=1'
+        where_sql, params = _run_filters(filters)
 
         query = f"""
             SELECT * FROM training_runs
@@ -311,6 +470,74 @@ def query_runs(
         return [dict(row) for row in cursor.fetchall()]
 
 
+def query_runs_between(
+    start: Any = None,
+    end: Any = None,
+    field: str = 'created',
+    filters: Optional[Dict[str, Any]] = None,
+    limit: int = 1000
+) -> List[Dict[str, Any]]:
+    """
+    Runs whose created/started/ended/updated time falls in [start, end), oldest first
+
+    One range scan of the field's *_ms index, which also gives the order.
+
+    Args:
+        start: Inclusive lower bound (datetime, ISO string or epoch ms; None = open)
+        end: Exclusive upper bound (same types)
+        field: 'created', 'started', 'ended' or 'updated'
+        filters: Further query_runs() filters
+        limit: Maximum results to return
+
+    Example:
+        query_runs_between(datetime(2025, 1, 6), datetime(2025, 1, 13), field='ended',
+                           filters={'status': 'completed'})
+    """
+    if f"{field}_after" not in TIME_FILTERS:
+        raise ValueError(f"field must be created, started, ended or updated, got {field!r}")
+    filters = dict(filters or {}, **{f"{field}_after": start, f"{field}_before": end})
+    return query_runs(filters, order_by=f"{field}_ms ASC", limit=limit)
+
+
+def summarize_durations(
+    group_by: str = 'gradient_method',
+    filters: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Wall-clock run durations (ended_ms - started_ms) rolled up per group, in SQL
+
+    Args:
+        group_by: training_runs column to group on
+        filters: query_runs() filters, e.g. {'ended_after': '2025-01-01'}
+
+    Returns:
+        One dict per group: group, runs, timed (runs with both start and end),
+        total_hours, mean_hours, min_hours, max_hours; largest total first
+    """
+    if not group_by.isidentifier():
+        raise ValueError(f"group_by must be a column name, got {group_by!r}")
+    where_sql, params = _run_filters(filters)
+    with get_connection() as conn:
+        cursor = conn.execute(f"""
+            SELECT
+                {group_by} AS "group",
+                COUNT(*) AS runs,
+                COUNT(duration_ms) AS timed,
+                SUM(duration_ms) / 3600000.0 AS total_hours,
+                AVG(duration_ms) / 3600000.0 AS mean_hours,
+                MIN(duration_ms) / 3600000.0 AS min_hours,
+                MAX(duration_ms) / 3600000.0 AS max_hours
+            FROM (
+                SELECT {group_by}, ended_ms - started_ms AS duration_ms
+                FROM training_runs
+                WHERE {where_sql}
+            )
+            GROUP BY {group_by}
+            ORDER BY total_hours DESC
+        """, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+
 def get_run(run_id: str) -> Optional[Dict[str, Any]]:
     """Get single run by ID."""
     with get_connection() as conn:
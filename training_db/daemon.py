@@ -0,0 +1,361 @@
+"""
+mangodb Reconciliation Daemon
+
+One long-running process for the periodic jobs that used to be separate cron
+scripts (update_runs_from_wandb.py, cleanup_orphaned_runs.py,
+fix_running_jobs.py). Each job is a Task (see reconcile.py) run on its own
+interval. The tasks share:
+
+- one connection pool (core.set_connection_pool)
+- one W&B client, W&B cache and EC2 client, created on first use
+- an in-memory view of launched/running runs, refreshed once per tick from
+  the run_events log (events.py)
+
+Only one instance works at a time: the daemon holds the 'mangodb-daemon' lease
+(leases.py) and renews it in the background. A second instance waits in standby
+and takes over when the lease expires. The one-shot scripts take the same lease,
+so they refuse to run next to the daemon instead of racing it.
+
+SIGTERM/SIGINT finish the running task, release the lease and exit.
+
+Usage:
+    mangodb                                  # Run all tasks forever
+    mangodb --tasks wandb_sync --once        # One pass of one task
+    python -m training_db.daemon --list
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from .core import ConnectionPool, get_connection, init_db, set_connection_pool
+from .events import latest_seq
+from .leases import DEFAULT_TTL, LeaseKeeper, acquire_lease, lease_owner
+from .reconcile import cleanup_orphaned_runs, fix_running_runs, merge_host_journals, sync_wandb_runs
+from .run_sync import DEFAULT_RATE, DEFAULT_WORKERS
+from .wandb_cache import WandbCache, get_cache
+from .wandb_client import get_api, wandb_project
+
+LEASE_NAME = 'mangodb-daemon'
+DEFAULT_POOL_SIZE = 4
+ACTIVE_STATUSES = ('launched', 'running')
+
+
+class Task(NamedTuple):
+    name: str
+    interval: float  # Seconds between the end of one run and the start of the next
+    run: Callable[['DaemonContext'], Dict[str, Any]]
+    description: str = ''
+
+
+# Run in this order when due at the same time
+TASKS = [
+    Task('journal_merge', 60, merge_host_journals, 'Replay host write journals'),
+    Task('fix_running', 300, fix_running_runs, 'Attach W&B IDs to running runs without one'),
+    Task('wandb_sync', 60, sync_wandb_runs, 'Poll due runs from W&B'),
+    Task('orphan_cleanup', 300, cleanup_orphaned_runs, 'Mark runs on dead EC2 instances as crashed'),
+]
+TASKS_BY_NAME = {task.name: task for task in TASKS}
+
+
+# ============================================================================
+# Shared state
+# ============================================================================
+
+class ActiveRuns:
+    """
+    In-memory view of launched and running runs, shared by all tasks of a tick
+
+    The first refresh loads every active run; later ones read run_events since
+    the last refresh and reload only the runs that changed.
+    """
+
+    COLUMNS = ('run_id', 'run_name', 'wandb_run_id', 'status', 'created_at', 'instance_id', 'host')
+    RELOAD_CHUNK = 500  # run_ids per reload query
+
+    def __init__(self):
+        self._runs: Dict[str, Dict[str, Any]] = {}
+        self.seq: Optional[int] = None  # Last run_events seq applied
+        self.refreshed_at: Optional[float] = None
+
+    def refresh(self) -> int:
+        """Bring the view up to date; returns the number of active runs."""
+        with get_connection() as conn:
+            # Read the seq before the rows: a change in between is reloaded again next time
+            seq = latest_seq(conn)
+            if self.seq is None:
+                rows = conn.execute(f"""
+                    SELECT {', '.join(self.COLUMNS)} FROM training_runs
+                    WHERE status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})
+                    ORDER BY created_at DESC
+                """, ACTIVE_STATUSES).fetchall()
+                self._runs = {row['run_id']: dict(row) for row in rows}
+            elif seq > self.seq:
+                changed = [row[0] for row in conn.execute(
+                    "SELECT DISTINCT run_id FROM run_events WHERE seq > ? AND seq <= ?", (self.seq, seq)
+                )]
+                for start in range(0, len(changed), self.RELOAD_CHUNK):
+                    chunk = changed[start:start + self.RELOAD_CHUNK]
+                    for run_id in chunk:
+                        self._runs.pop(run_id, None)
+                    rows = conn.execute(f"""
+                        SELECT {', '.join(self.COLUMNS)} FROM training_runs
+                        WHERE run_id IN ({', '.join('?' for _ in chunk)})
+                    """, chunk).fetchall()
+                    self._runs.update(
+                        (row['run_id'], dict(row)) for row in rows if row['status'] in ACTIVE_STATUSES
+                    )
+        self.seq = seq
+        self.refreshed_at = time.time()
+        return len(self._runs)
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def all(self) -> List[Dict[str, Any]]:
+        return list(self._runs.values())
+
+    def with_status(self, *statuses: str) -> List[Dict[str, Any]]:
+        return [run for run in self._runs.values() if run['status'] in statuses]
+
+    def update(self, run_id: str, status: str, **fields) -> None:
+        """Reflect a write a task made; runs that are no longer active drop out."""
+        if status not in ACTIVE_STATUSES:
+            self._runs.pop(run_id, None)
+        elif run_id in self._runs:
+            self._runs[run_id].update(fields, status=status)
+
+
+class DaemonContext:
+    """
+    What tasks share: options, lazily created clients, the active-run view
+
+    Args:
+        entity, project: W&B project (default: wandb_client.wandb_project())
+        workers, rate: W&B fetch concurrency and request rate (run_sync)
+        dry_run: Report, but write nothing
+        verbose: Per-run output from the W&B sync
+        limit: Max runs per W&B sync pass
+        poll_all: Poll every stale run instead of the due ones
+        mark_stale: Mark launched runs W&B never saw as not_running
+        use_cache: Use the on-disk W&B cache
+    """
+
+    def __init__(
+        self,
+        entity: Optional[str] = None,
+        project: Optional[str] = None,
+        workers: int = DEFAULT_WORKERS,
+        rate: Optional[float] = DEFAULT_RATE,
+        dry_run: bool = False,
+        verbose: bool = False,
+        limit: Optional[int] = None,
+        poll_all: bool = False,
+        mark_stale: bool = True,
+        use_cache: bool = True
+    ):
+        default_entity, default_project = wandb_project()
+        self.entity = entity or default_entity
+        self.project = project or default_project
+        self.workers = workers
+        self.rate = rate
+        self.dry_run = dry_run
+        self.verbose = verbose
+        self.limit = limit
+        self.poll_all = poll_all
+        self.mark_stale = mark_stale
+        self.use_cache = use_cache
+        self.active = ActiveRuns()
+        self._wandb_api = None
+        self._ec2 = None
+        self._cache = None
+        self.journal_offsets: Dict[str, int] = {}  # Journal file -> bytes merged so far
+
+    @property
+    def wandb_api(self):
+        if self._wandb_api is None:
+            self._wandb_api = get_api(timeout=60)
+        return self._wandb_api
+
+    @property
+    def ec2(self):
+        if self._ec2 is None:
+            import boto3
+            self._ec2 = boto3.client('ec2', region_name=os.environ.get('AWS_DEFAULT_REGION', 'us-east-2'))
+        return self._ec2
+
+    @property
+    def cache(self) -> WandbCache:
+        if self._cache is None:
+            self._cache = get_cache() if self.use_cache else WandbCache(':memory:')
+        return self._cache
+
+
+# ============================================================================
+# Daemon
+# ============================================================================
+
+def _log(message: str) -> None:
+    print(f"[{datetime.now().isoformat(timespec='seconds')}] {message}", flush=True)
+
+
+class Daemon:
+    """Runs tasks on their intervals while holding the daemon lease."""
+
+    def __init__(
+        self,
+        tasks: Sequence[Task] = TASKS,
+        context: Optional[DaemonContext] = None,
+        lease_name: str = LEASE_NAME,
+        lease_ttl: float = DEFAULT_TTL,
+        pool_size: int = DEFAULT_POOL_SIZE
+    ):
+        self.tasks = list(tasks)
+        self.context = context or DaemonContext()
+        self.lease_name = lease_name
+        self.lease_ttl = lease_ttl
+        self.pool_size = pool_size
+        self.owner = lease_owner()
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.errors: Dict[str, str] = {}
+        self.exit_code: Optional[int] = None
+        self._next_run = {task.name: 0.0 for task in self.tasks}
+        self._stop = threading.Event()
+        self._keeper: Optional[LeaseKeeper] = None
+
+    def stop(self, *_) -> None:
+        """Finish the current task, then shut down (also the SIGTERM/SIGINT handler)."""
+        if not self._stop.is_set():
+            _log("Shutting down after the current task")
+        self._stop.set()
+
+    def _working(self) -> bool:
+        return not self._stop.is_set() and self._keeper is not None and not self._keeper.lost.is_set()
+
+    def run_due_tasks(self) -> None:
+        """One tick: refresh the active-run view, then run every due task."""
+        now = time.time()
+        due = [task for task in self.tasks if self._next_run[task.name] <= now]
+        if not due:
+            return
+
+        self.context.active.refresh()
+        for task in due:
+            if not self._working():
+                return
+
+            started = time.monotonic()
+            try:
+                stats = task.run(self.context)
+                self.results[task.name] = stats
+                self.errors.pop(task.name, None)
+                summary = ', '.join(f"{key}={value}" for key, value in stats.items())
+                _log(f"{task.name}: {summary} ({time.monotonic() - started:.1f}s)")
+            except Exception as e:
+                self.errors[task.name] = str(e)
+                _log(f"{task.name}: ERROR {e}")
+                traceback.print_exc()
+            self._next_run[task.name] = time.time() + task.interval
+
+    def run(self, once: bool = False) -> int:
+        """
+        Work until stopped (or, with once, for one pass over all tasks)
+
+        Returns:
+            Exit code (also kept in .exit_code): 0, or 1 if in once mode the
+            lease is held elsewhere or a task failed
+        """
+        self.exit_code = self._run(once)
+        return self.exit_code
+
+    def _run(self, once: bool) -> int:
+        pool = ConnectionPool(self.pool_size)
+        set_connection_pool(pool)
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        standby = False
+        try:
+            while not self._stop.is_set():
+                if self._keeper is None:
+                    if not acquire_lease(self.lease_name, self.owner, self.lease_ttl):
+                        if once:
+                            _log(f"Another instance holds the {self.lease_name} lease; not running")
+                            return 1
+                        if not standby:
+                            _log(f"Standby: another instance holds the {self.lease_name} lease")
+                            standby = True
+                        self._stop.wait(self.lease_ttl / 2)
+                        continue
+                    _log(f"Acquired {self.lease_name} lease as {self.owner}")
+                    standby = False
+                    self._keeper = LeaseKeeper(self.lease_name, self.owner, self.lease_ttl).start()
+
+                self.run_due_tasks()
+
+                if self._keeper.lost.is_set():
+                    self._keeper = None
+                    continue
+                if once:
+                    return 1 if self.errors else 0
+
+                next_due = min(self._next_run.values())
+                self._stop.wait(max(0.0, next_due - time.time()))
+            return 0
+        finally:
+            if self._keeper is not None:
+                self._keeper.stop()
+                self._keeper = None
+            set_connection_pool(None)
+            pool.close()
+            if not once:
+                _log("Stopped")
+
+
+def run_once(task_names: Sequence[str], context: Optional[DaemonContext] = None) -> Daemon:
+    """
+    One pass of the named tasks under the daemon lease (what the scripts use)
+
+    Returns:
+        The finished Daemon; per-task counts are in .results, failures in .errors
+    """
+    daemon = Daemon([TASKS_BY_NAME[name] for name in task_names], context)
+    daemon.run(once=True)
+    return daemon
+
+
+def main():
+    parser = argparse.ArgumentParser(description='mangodb reconciliation daemon')
+    parser.add_argument('--tasks', nargs='+', choices=list(TASKS_BY_NAME), help='Tasks to run (default: all)')
+    parser.add_argument('--once', action='store_true', help='Run each task once and exit')
+    parser.add_argument('--list', action='store_true', help='List tasks and exit')
+    parser.add_argument('--dry-run', action='store_true', help='Report, but write nothing')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Concurrent W&B fetches')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help='Max W&B API requests per second (0 = unlimited)')
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE, help='Database connections')
+    parser.add_argument('--lease-ttl', type=float, default=DEFAULT_TTL,
+                        help='Seconds before a dead instance\'s lease can be taken over')
+    args = parser.parse_args()
+
+    if args.list:
+        for task in TASKS:
+            print(f"{task.name:16} every {task.interval:>5.0f}s  {task.description}")
+        return
+
+    init_db()
+    tasks = [TASKS_BY_NAME[name] for name in args.tasks] if args.tasks else TASKS
+    context = DaemonContext(workers=args.workers, rate=args.rate or None, dry_run=args.dry_run)
+    daemon = Daemon(tasks, context, lease_ttl=args.lease_ttl, pool_size=args.pool_size)
+    sys.exit(daemon.run(once=args.once))
+
+
+if __name__ == '__main__':
+    main()
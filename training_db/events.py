@@ -0,0 +1,110 @@
+"""
+Run Event Log
+
+run_events is an append-only log of changes to training_runs, written by
+triggers (migrations.RUN_EVENTS_TRIGGERS), so every write path is covered:
+inserts, status transitions, W&B IDs, blog posts, crash data, conversations and
+deletes. Each event has a sequence number that is never reused and increases in
+commit order (SQLite has one writer at a time), so a consumer that remembers
+the last seq it processed reads exactly the changes it has not seen.
+
+Usage:
+    seq = 0
+    for event in changes_since(seq):
+        handle(event)
+        seq = event['seq']
+
+    async for event in watch_runs():            # New events as they commit
+        print(event['run_id'], event['old_status'], '->', event['new_status'])
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from .core import get_connection
+
+DEFAULT_LIMIT = 1000  # Events per changes_since() call
+WATCH_INTERVAL = 1.0  # Seconds between polls when watch_runs() has caught up
+
+EVENT_COLUMNS = ('seq', 'run_id', 'event', 'old_status', 'new_status', 'fields_json', 'created_at')
+
+
+def _event(row) -> Dict[str, Any]:
+    event = dict(zip(EVENT_COLUMNS, row))
+    fields_json = event.pop('fields_json')
+    event['fields'] = json.loads(fields_json) if fields_json else {}
+    return event
+
+
+def latest_seq(conn=None) -> int:
+    """Sequence number of the newest event (0 if the log is empty)."""
+    query = "SELECT COALESCE(MAX(seq), 0) FROM run_events"
+    if conn is not None:
+        return conn.execute(query).fetchone()[0]
+    with get_connection() as conn:
+        return conn.execute(query).fetchone()[0]
+
+
+def changes_since(
+    seq: int = 0,
+    limit: int = DEFAULT_LIMIT,
+    events: Optional[Sequence[str]] = None,
+    run_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Events after `seq`, oldest first
+
+    Args:
+        seq: Last sequence number already processed (0 = from the start)
+        limit: Max events to return; call again from the last seq for more
+        events: Only these event types (e.g. ['status'])
+        run_id: Only events of this run
+
+    Returns:
+        Dicts with seq, run_id, event, old_status, new_status, fields, created_at
+    """
+    query = f"SELECT {', '.join(EVENT_COLUMNS)} FROM run_events WHERE seq > ?"
+    params: List[Any] = [seq]
+    if events:
+        query += f" AND event IN ({', '.join('?' for _ in events)})"
+        params.extend(events)
+    if run_id is not None:
+        query += " AND run_id = ?"
+        params.append(run_id)
+    query += " ORDER BY seq LIMIT ?"
+    params.append(limit)
+
+    with get_connection() as conn:
+        return [_event(row) for row in conn.execute(query, params).fetchall()]
+
+
+async def watch_runs(
+    since: Optional[int] = None,
+    interval: float = WATCH_INTERVAL,
+    events: Optional[Sequence[str]] = None,
+    limit: int = DEFAULT_LIMIT
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield events as they are committed, forever
+
+    Reads run in a worker thread, so the event loop is never blocked on SQLite.
+    Polls every `interval` seconds once caught up; each poll is one range scan
+    on the primary key.
+
+    Args:
+        since: Last seq already processed (default: the current end of the
+            log, i.e. only new events)
+        interval: Seconds between polls when there is nothing new
+        events: Only these event types
+        limit: Max events per read
+    """
+    loop = asyncio.get_running_loop()  # run_in_executor, not asyncio.to_thread (3.9+)
+    seq = since if since is not None else await loop.run_in_executor(None, latest_seq)
+    while True:
+        batch = await loop.run_in_executor(None, changes_since, seq, limit, events)
+        for event in batch:
+            seq = event['seq']
+            yield event
+        if len(batch) < limit:
+            await asyncio.sleep(interval)
@@ -0,0 +1,148 @@
+"""
+Run Heartbeats
+
+Liveness without asking W&B or EC2: a training process calls heartbeat() from
+its loop and run_heartbeats keeps the time (and step) of its latest beat. A
+beat is one UPSERT of one row, and calls within HEARTBEAT_INTERVAL seconds of
+the last write only update an in-process record, so calling heartbeat() every
+step costs a dict update. The latest coalesced beat is written at exit.
+
+find_stale_runs() is an index scan on beat_at: launched/running runs whose
+heartbeats stopped. Runs that never sent one are not reported; the daemon's
+orphan cleanup still checks those (and the stale ones) against EC2.
+
+Usage:
+    from training_db.heartbeats import heartbeat, find_stale_runs
+
+    for step, batch in enumerate(loader):      # In train.py
+        ...
+        heartbeat(run_id, step)
+
+    for run in find_stale_runs(timeout=600):   # In a reconciler
+        print(run['run_id'], run['beat_at'])
+"""
+
+import atexit
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .core import get_connection
+
+HEARTBEAT_INTERVAL = 30.0  # Min seconds between writes for one run
+STALE_TIMEOUT = 600.0  # Seconds without a heartbeat before a run counts as stale
+
+# run_id -> last write time, and beats coalesced since then
+_last_write: Dict[str, float] = {}
+_pending: Dict[str, Tuple[float, Optional[int], Optional[Dict[str, Any]]]] = {}
+_lock = threading.Lock()
+_atexit_registered = False
+
+
+def _write(run_id: str, beat_at: float, step: Optional[int], extra: Optional[Dict[str, Any]]) -> bool:
+    try:
+        with get_connection() as conn:
+            conn.execute("""
+                INSERT INTO run_heartbeats (run_id, beat_at, step, extra_json)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(run_id) DO UPDATE SET
+                    beat_at = excluded.beat_at,
+                    step = COALESCE(excluded.step, run_heartbeats.step),
+                    extra_json = COALESCE(excluded.extra_json, run_heartbeats.extra_json)
+            """, (run_id, beat_at, step, json.dumps(extra) if extra is not None else None))
+        return True
+    except sqlite3.Error as e:
+        # A heartbeat must never take the training run down with it
+        print(f"Warning: heartbeat for {run_id} not written: {e}")
+        return False
+
+
+def heartbeat(
+    run_id: str,
+    step: Optional[int] = None,
+    extra: Optional[Dict[str, Any]] = None,
+    interval: float = HEARTBEAT_INTERVAL,
+    now: Optional[float] = None
+) -> bool:
+    """
+    Report that a run is alive
+
+    Writes at most once per `interval` seconds per run; beats in between are
+    kept in memory and the latest one goes out with the next write or at exit.
+
+    Args:
+        run_id: Run identifier
+        step: Current training step
+        extra: Small JSON-serializable dict (e.g. {'loss': 0.31, 'gpu_mem_gb': 61})
+        interval: Min seconds between writes (0 = write every call)
+        now: POSIX time (default: time.time())
+
+    Returns:
+        True if this call wrote to the database
+    """
+    global _atexit_registered
+    now = time.time() if now is None else now
+    with _lock:
+        last = _last_write.get(run_id)
+        if last is not None and now - last < interval:
+            _pending[run_id] = (now, step, extra)
+            if not _atexit_registered:
+                atexit.register(flush_heartbeats)
+                _atexit_registered = True
+            return False
+        _last_write[run_id] = now
+        _pending.pop(run_id, None)
+
+    return _write(run_id, now, step, extra)
+
+
+def flush_heartbeats() -> int:
+    """Write coalesced beats now (registered with atexit); returns the number written."""
+    with _lock:
+        pending = list(_pending.items())
+        _pending.clear()
+        for run_id, (beat_at, _, _) in pending:
+            _last_write[run_id] = beat_at
+
+    return sum(_write(run_id, *beat) for run_id, beat in pending)
+
+
+def find_stale_runs(
+    timeout: float = STALE_TIMEOUT,
+    now: Optional[float] = None,
+    statuses: Tuple[str, ...] = ('launched', 'running')
+) -> List[Dict[str, Any]]:
+    """
+    Runs whose last heartbeat is older than `timeout` seconds
+
+    Args:
+        timeout: Seconds without a heartbeat
+        now: POSIX time (default: time.time())
+        statuses: Only runs with these statuses
+
+    Returns:
+        Dicts with run_id, status, instance_id, host, beat_at, step, oldest beat first
+    """
+    now = time.time() if now is None else now
+    with get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT r.run_id, r.status, r.instance_id, r.host, h.beat_at, h.step
+            FROM run_heartbeats h
+            JOIN training_runs r ON r.run_id = h.run_id
+            WHERE h.beat_at < ?
+              AND r.status IN ({', '.join('?' for _ in statuses)})
+            ORDER BY h.beat_at
+        """, (now - timeout, *statuses)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def live_run_ids(timeout: float = STALE_TIMEOUT, now: Optional[float] = None) -> Set[str]:
+    """Runs with a heartbeat in the last `timeout` seconds."""
+    now = time.time() if now is None else now
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT run_id FROM run_heartbeats WHERE beat_at >= ?", (now - timeout,)
+        ).fetchall()
+    return {row[0] for row in rows}
@@ -0,0 +1,186 @@
+"""
+Run History Store
+
+Per-step W&B history lives in run_history: one row per run and step, holding
+the values logged at that step as JSON. Steps are written as the history is
+read, in batched transactions, so ingesting a run never holds more than one
+batch of steps in memory however long the run is. Each ingest continues after
+the last stored step.
+
+Readers that want the old history_json shape ({key: [value per step]}) use
+load_history(), optionally restricted to a few keys. Aggregates across runs
+(summarize_history(), history_curve()) run on the analytics backend (see
+analytics.py), which can be DuckDB over a Parquet snapshot for large histories.
+
+Usage:
+    from training_db.history_store import ingest_run_history, load_history
+
+    steps = ingest_run_history(run, run_id)        # run: wandb.apis.public.Run
+    curves = load_history(run_id, keys=['loss'])   # {'_step': [...], 'loss': [...]}
+    final = summarize_history(['loss'])            # {run_id: {'loss': {'min': ..., 'last': ...}}}
+"""
+
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .analytics import get_analytics
+from .core import get_connection
+from .migrations import history_step_rows
+
+DEFAULT_BATCH_STEPS = 500  # Steps per write transaction
+
+
+def last_stored_step(run_id: str, conn=None) -> Optional[int]:
+    """Highest step stored for a run, or None if it has no history yet."""
+    query = "SELECT MAX(step) FROM run_history WHERE run_id = ?"
+    if conn is not None:
+        return conn.execute(query, (run_id,)).fetchone()[0]
+    with get_connection() as conn:
+        return conn.execute(query, (run_id,)).fetchone()[0]
+
+
+def write_steps(conn, run_id: str, steps: Sequence[Dict[str, Any]], first_step: int = 0) -> int:
+    """
+    Insert (or replace) history steps of one run on an open connection
+
+    The caller commits. Steps without _step are numbered from first_step.
+    Returns the number of steps written.
+    """
+    cursor = conn.executemany(
+        "INSERT OR REPLACE INTO run_history (run_id, step, metrics_json) VALUES (?, ?, ?)",
+        history_step_rows(run_id, steps, first_step)
+    )
+    return cursor.rowcount
+
+
+def batched(steps: Iterable[Dict[str, Any]], size: int = DEFAULT_BATCH_STEPS) -> Iterator[List[Dict[str, Any]]]:
+    """Group a stream of history steps into lists of up to `size` steps."""
+    batch = []
+    for step in steps:
+        batch.append(step)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest_history(
+    run_id: str,
+    steps: Iterable[Dict[str, Any]],
+    batch_steps: int = DEFAULT_BATCH_STEPS,
+    first_step: int = 0
+) -> int:
+    """
+    Stream history steps into run_history, one transaction per batch
+
+    Batches committed before an error are kept, so a failed ingest can resume
+    from last_stored_step().
+
+    Args:
+        run_id: Run identifier
+        steps: History rows (e.g. run.scan_history()), consumed lazily
+        batch_steps: Steps per transaction
+        first_step: Step number of the first row, for rows without _step
+
+    Returns:
+        Number of steps written
+    """
+    written = 0
+    with get_connection() as conn:
+        for batch in batched(steps, batch_steps):
+            written += write_steps(conn, run_id, batch, first_step + written)
+            conn.commit()
+    return written
+
+
+def ingest_run_history(
+    run,
+    run_id: str,
+    batch_steps: int = DEFAULT_BATCH_STEPS,
+    full: bool = False
+) -> int:
+    """
+    Ingest the steps of a W&B run logged after the last stored step
+
+    Args:
+        run: wandb.apis.public.Run (or a compatible fake)
+        run_id: Database run identifier
+        batch_steps: Steps per transaction
+        full: Re-ingest the whole history
+
+    Returns:
+        Number of steps written
+    """
+    last = None if full else last_stored_step(run_id)
+    min_step = 0 if last is None else last + 1
+    return ingest_history(run_id, run.scan_history(min_step=min_step), batch_steps, min_step)
+
+
+def load_history(run_id: str, keys: Optional[Sequence[str]] = None) -> Dict[str, List[Any]]:
+    """
+    History of a run in columnar form
+
+    Args:
+        run_id: Run identifier
+        keys: Keys to return (default: all); '_step' is always included
+
+    Returns:
+        {key: [value per step]}, with None where a step did not log the key
+    """
+    columns: Dict[str, List[Any]] = {'_step': []}
+    if keys is not None:
+        columns.update((key, []) for key in keys)
+
+    with get_connection() as conn:
+        cursor = conn.execute(
+            "SELECT step, metrics_json FROM run_history WHERE run_id = ? ORDER BY step",
+            (run_id,)
+        )
+        for count, (step, metrics_json) in enumerate(cursor):
+            values = json.loads(metrics_json)
+            values['_step'] = step
+            if keys is None:
+                for key in values.keys() - columns.keys():
+                    columns[key] = [None] * count
+            for key, column in columns.items():
+                column.append(values.get(key))
+
+    return columns
+
+
+def delete_history(run_id: str) -> int:
+    """Delete all stored steps of a run; returns the number deleted."""
+    with get_connection() as conn:
+        return conn.execute("DELETE FROM run_history WHERE run_id = ?", (run_id,)).rowcount
+
+
+def summarize_history(
+    keys: Sequence[str],
+    run_ids: Optional[Sequence[str]] = None
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Per-run count, min, max, mean and last value of history keys
+
+    Args:
+        keys: History keys to aggregate
+        run_ids: Runs to include (default: all runs with history)
+
+    Returns:
+        {run_id: {key: {'count', 'min', 'max', 'mean', 'last'}}}
+    """
+    return get_analytics().history_summary(keys, run_ids)
+
+
+def history_curve(
+    key: str,
+    run_ids: Optional[Sequence[str]] = None,
+    bucket_steps: int = 100
+) -> List[Dict[str, Any]]:
+    """
+    Mean, min and max of one history key across runs, per bucket of steps
+
+    Returns:
+        [{'step': bucket start, 'runs': n, 'mean': ..., 'min': ..., 'max': ...}]
+    """
+    return get_analytics().history_curve(key, run_ids, bucket_steps)
@@ -0,0 +1,466 @@
+"""
+Host Write Journal
+
+Trainers on EC2 and Expanse write through the shared database file, so a write
+made while the file is unreachable or locked is lost (or, in insert_objective,
+silently dropped). A JournalWriter offers the same write calls but only
+appends them to a local journal, one JSON line per write with an idempotency
+key, one file per host; lines are fsynced in batches by a background thread,
+which also forwards them to the database whenever it is reachable. The trainer
+never waits on the shared database.
+
+merge_journals() replays journal files into the database in bulk (the daemon's
+journal_merge task does so for journal_dir()). Entries are applied in timestamp
+order, each at most once (journal_applied records their keys), and a write is
+skipped as stale when the database already holds a newer one:
+
+- status changes: a status event in run_events newer than the entry
+- objective metrics: a run_objectives row updated after the entry
+- inserts: the row already exists
+
+Entries for runs the database does not know yet are retried on the next merge.
+
+Usage:
+    journal = get_journal()                      # On the trainer
+    journal.insert_run(run_id, None, config)
+    journal.update_run_status(run_id, 'running', wandb_run_id=wandb.run.id)
+    journal.update_objective_metric(run_id, 'COMT_activity', 'raw_mean', 0.856)
+
+    merge_journals(['/mnt/efs/journals/ip-10-0-0-1.jsonl'])   # Anywhere
+"""
+
+import argparse
+import atexit
+import fcntl
+import glob
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .catalog import METRIC_TYPES, get_catalog
+from .core import _run_insert, _status_update, db_path, get_connection, init_db
+from .events import latest_seq
+
+DEFAULT_JOURNAL_DIR = os.path.expanduser('~/.mangodb/journal')
+FLUSH_INTERVAL = 1.0  # Seconds between fsynced appends (and forwarding attempts)
+FLUSH_ENTRIES = 100  # Flush early once this many writes are buffered
+MERGE_BATCH = 1000  # Entries per merge transaction
+CLOSE_TIMEOUT = 10.0  # Seconds close() waits for the last forwarding attempt
+
+APPLIED, STALE, MISSING = 'applied', 'stale', 'missing'
+
+
+# ============================================================================
+# Journal files
+# ============================================================================
+
+def journal_dir() -> str:
+    """Journal directory: TRAINING_DB_JOURNAL_DIR, read at call time, else DEFAULT_JOURNAL_DIR."""
+    return os.environ.get('TRAINING_DB_JOURNAL_DIR', DEFAULT_JOURNAL_DIR)
+
+
+def journal_path(directory: Optional[str] = None, host: Optional[str] = None) -> str:
+    """Journal file of a host: <directory>/<host>.jsonl (default directory: journal_dir())."""
+    return os.path.join(directory or journal_dir(), f"{host or socket.gethostname()}.jsonl")
+
+
+def append_entries(path: str, entries: Sequence[Dict[str, Any]]) -> None:
+    """Append entries as JSON lines with one write and one fsync (processes of a host share the file)."""
+    data = ''.join(json.dumps(entry, default=str) + '\n' for entry in entries).encode()
+    fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        size = os.fstat(fd).st_size
+        if size and os.pread(fd, 1, size - 1) != b'\n':
+            data = b'\n' + data  # A writer died mid-line; keep our first entry readable
+        while data:
+            data = data[os.write(fd, data):]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_journal(path: str, offset: int = 0) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Entries of a journal file from a byte offset
+
+    Returns:
+        (entries, offset after the last complete line, unreadable lines skipped)
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+
+    end = data.rfind(b'\n') + 1  # A line still being written is left for next time
+    entries = []
+    corrupt = 0
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            corrupt += 1
+    return entries, offset + end, corrupt
+
+
+# ============================================================================
+# Replay
+# ============================================================================
+
+def _utc(ts: float) -> datetime:
+    return datetime.utcfromtimestamp(ts)
+
+
+def _apply_insert_run(conn, args: Dict[str, Any], ts: float) -> str:
+    kwargs = dict(args.get('kwargs') or {})
+    kwargs.setdefault('created_at', _utc(ts).isoformat() + 'Z')
+    cursor = conn.execute(*_run_insert(
+        args['run_id'], args.get('wandb_run_id'), args.get('config_dict') or {},
+        args.get('chain_of_custody_id'), or_ignore=True, **kwargs
+    ))
+    return APPLIED if cursor.rowcount else STALE
+
+
+def _apply_update_run_status(conn, args: Dict[str, Any], ts: float) -> str:
+    newer = conn.execute("""
+        SELECT 1 FROM run_events
+        WHERE run_id = ? AND event = 'status' AND created_at > ?
+        LIMIT 1
+    """, (args['run_id'], ts)).fetchone()
+    if newer:
+        return STALE
+    cursor = conn.execute(*_status_update(args['run_id'], args['status'], **(args.get('fields') or {})))
+    return APPLIED if cursor.rowcount else MISSING
+
+
+def _apply_insert_objective(conn, args: Dict[str, Any], ts: float) -> str:
+    if conn.execute("SELECT 1 FROM training_runs WHERE run_id = ?", (args['run_id'],)).fetchone() is None:
+        return MISSING
+    objective_id = get_catalog(db_path()).intern(
+        conn, args['objective_name'], args.get('objective_alias'), args.get('uniprot'), args.get('direction')
+    )
+    cursor = conn.execute("""
+        INSERT OR IGNORE INTO run_objectives (run_id, objective_id, weight, created_at, updated_at, created_ms, updated_ms)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (args['run_id'], objective_id, args.get('weight'), _utc(ts), _utc(ts), round(ts * 1000), round(ts * 1000)))
+    return APPLIED if cursor.rowcount else STALE
+
+
+def _apply_update_objective_metrics(conn, args: Dict[str, Any], ts: float) -> str:
+    catalog = get_catalog(db_path())
+    stamp = _utc(ts)
+    stamp_ms = round(ts * 1000)
+    applied = False
+    for objective_name, values in args['metrics'].items():
+        values = {k: v for k, v in values.items() if k in METRIC_TYPES}
+        objective_id = catalog.get_id(conn, objective_name)
+        if objective_id is None or not values:
+            continue
+        cursor = conn.execute(f"""
+            UPDATE run_objectives
+            SET {', '.join(f'{column} = ?' for column in values)}, updated_at = ?, updated_ms = ?
+            WHERE run_id = ? AND objective_id = ? AND (updated_ms IS NULL OR updated_ms <= ?)
+        """, list(values.values()) + [stamp, stamp_ms, args['run_id'], objective_id, stamp_ms])
+        applied = applied or cursor.rowcount > 0
+
+    if applied:
+        return APPLIED
+    exists = conn.execute("SELECT 1 FROM run_objectives WHERE run_id = ? LIMIT 1", (args['run_id'],)).fetchone()
+    return STALE if exists else MISSING
+
+
+def _apply_attach_crash_data(conn, args: Dict[str, Any], ts: float) -> str:
+    cursor = conn.execute("""
+        UPDATE training_runs
+        SET status = 'crashed',
+            ended_at = ?,
+            error_log_s3_key = ?,
+            crash_report_s3_key = ?,
+            crash_analysis_s3_key = ?,
+            ended_ms = ?,
+            updated_ms = ?
+        WHERE run_id = ?
+    """, (
+        _utc(ts).isoformat() + 'Z',
+        args['error_log_s3_key'],
+        args['crash_report_s3_key'],
+        args['crash_analysis_s3_key'],
+        round(ts * 1000),
+        round(ts * 1000),
+        args['run_id'],
+    ))
+    return APPLIED if cursor.rowcount else MISSING
+
+
+def _apply_attach_conversation(conn, args: Dict[str, Any], ts: float) -> str:
+    cursor = conn.execute(
+        "UPDATE training_runs SET conversation_s3_key = ?, updated_ms = ? WHERE run_id = ?",
+        (args['conversation_s3_key'], round(ts * 1000), args['run_id'])
+    )
+    return APPLIED if cursor.rowcount else MISSING
+
+
+# op -> apply(conn, args, ts) returning APPLIED, STALE or MISSING
+JOURNAL_OPS: Dict[str, Callable[[Any, Dict[str, Any], float], str]] = {
+    'insert_run': _apply_insert_run,
+    'update_run_status': _apply_update_run_status,
+    'insert_objective': _apply_insert_objective,
+    'update_objective_metrics': _apply_update_objective_metrics,
+    'attach_crash_data': _apply_attach_crash_data,
+    'attach_conversation': _apply_attach_conversation,
+}
+
+
+def merge_entries(entries: Iterable[Dict[str, Any]], batch_size: int = MERGE_BATCH) -> Dict[str, int]:
+    """
+    Apply journal entries to the database, oldest first, one transaction per batch
+
+    Returns:
+        Counts: read, applied, stale, missing (retried next time), duplicate
+        (applied before), failed
+    """
+    unique = {entry['key']: entry for entry in entries}
+    ordered = sorted(unique.values(), key=lambda entry: (entry['ts'], entry['key']))
+    stats = {'read': len(ordered), APPLIED: 0, STALE: 0, MISSING: 0, 'duplicate': 0, 'failed': 0}
+
+    with get_connection() as conn:
+        for start in range(0, len(ordered), batch_size):
+            batch = ordered[start:start + batch_size]
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")  # Else releasing the first savepoint would commit it alone
+            done = {row[0] for row in conn.execute(
+                f"SELECT key FROM journal_applied WHERE key IN ({', '.join('?' for _ in batch)})",
+                [entry['key'] for entry in batch]
+            )}
+
+            for entry in batch:
+                if entry['key'] in done:
+                    stats['duplicate'] += 1
+                    continue
+                apply = JOURNAL_OPS.get(entry['op'])
+                if apply is None:
+                    print(f"  Journal entry {entry['key']}: unknown op {entry['op']!r}")
+                    stats['failed'] += 1
+                    continue
+
+                conn.execute("SAVEPOINT journal_entry")
+                try:
+                    seq = latest_seq(conn)
+                    outcome = apply(conn, entry['args'], entry['ts'])
+                    # Events of a replayed write carry the time it was made, for later staleness checks
+                    conn.execute("UPDATE run_events SET created_at = ? WHERE seq > ?", (entry['ts'], seq))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO journal_entry")
+                    conn.execute("RELEASE journal_entry")
+                    get_catalog(db_path()).clear()  # May have cached a rolled-back catalog row
+                    print(f"  Journal entry {entry['key']} ({entry['op']}): {e}")
+                    stats['failed'] += 1
+                    continue
+                conn.execute("RELEASE journal_entry")
+
+                stats[outcome] += 1
+                if outcome != MISSING:
+                    conn.execute("""
+                        INSERT INTO journal_applied (key, host, op, run_id, ts, outcome, applied_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, (
+                        entry['key'], entry.get('host'), entry['op'], entry['args'].get('run_id'),
+                        entry['ts'], outcome, time.time()
+                    ))
+            conn.commit()
+
+    return stats
+
+
+def merge_journals(
+    paths: Sequence[str],
+    offsets: Optional[Dict[str, int]] = None,
+    batch_size: int = MERGE_BATCH
+) -> Dict[str, int]:
+    """
+    Replay journal files into the database
+
+    Args:
+        paths: Journal files
+        offsets: {path: byte offset already merged}; read from and updated in
+            place, advancing past files whose entries all went in
+        batch_size: Entries per transaction
+
+    Returns:
+        merge_entries() counts plus 'corrupt' (unreadable lines)
+    """
+    offsets = {} if offsets is None else offsets
+    entries = []
+    ends = {}
+    corrupt = 0
+    for path in paths:
+        file_entries, end, file_corrupt = read_journal(path, offsets.get(path, 0))
+        entries.extend(file_entries)
+        ends[path] = end
+        corrupt += file_corrupt
+
+    stats = merge_entries(entries, batch_size)
+    if not stats[MISSING] and not stats['failed']:
+        offsets.update(ends)
+    return dict(stats, corrupt=corrupt)
+
+
+# ============================================================================
+# Writer
+# ============================================================================
+
+def _field(value: Any) -> Any:
+    return value.isoformat() + 'Z' if isinstance(value, datetime) else value
+
+
+class JournalWriter:
+    """
+    Records API writes in the host journal; a background thread fsyncs them in
+    batches and forwards them to the database when it can
+
+    Args:
+        path: Journal file (default: journal_path())
+        flush_interval: Seconds between flushes
+        forward: Replay this journal into the database after each flush
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_interval: float = FLUSH_INTERVAL, forward: bool = True):
+        self.path = path or journal_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.flush_interval = flush_interval
+        self.forward_enabled = forward
+        self.host = socket.gethostname()
+        self.last_error: Optional[Exception] = None
+        self._offsets: Dict[str, int] = {}
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='mangodb-journal', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, op: str, **args) -> str:
+        """Buffer one write; returns its idempotency key. Never touches the database."""
+        entry = {'key': uuid.uuid4().hex, 'ts': time.time(), 'host': self.host, 'op': op, 'args': args}
+        with self._lock:
+            self._buffer.append(entry)
+            if len(self._buffer) >= FLUSH_ENTRIES:
+                self._wake.set()
+        return entry['key']
+
+    def flush(self) -> int:
+        """Append buffered writes to the journal file (one fsync); returns the number written."""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._buffer = self._buffer, []
+            if entries:
+                try:
+                    append_entries(self.path, entries)
+                except OSError:
+                    with self._lock:
+                        self._buffer[:0] = entries  # Keep them for the next flush
+                    raise
+            return len(entries)
+
+    def forward(self) -> Dict[str, int]:
+        """Replay the journal into the database (idempotent; raises if it is unreachable)."""
+        if not os.path.exists(self.path):
+            return {}
+        return merge_journals([self.path], self._offsets)
+
+    def _run(self) -> None:
+        while True:
+            stopping = self._stop.is_set()
+            try:
+                self.flush()
+                if self.forward_enabled:
+                    self.forward()
+                self.last_error = None
+            except Exception as e:
+                if type(e) is not type(self.last_error):
+                    print(f"Warning: journal {self.path}: {e} (will retry)")
+                self.last_error = e
+            if stopping:
+                return
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+
+    def close(self, timeout: float = CLOSE_TIMEOUT) -> None:
+        """Flush, make a last forwarding attempt (up to `timeout` seconds) and stop."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self.flush()  # Forwarding is stuck on the database; the journal still gets everything
+
+    # Same signatures as the training_db write API
+
+    def insert_run(self, run_id: str, wandb_run_id: Optional[str], config_dict: Dict[str, Any],
+                   chain_of_custody_id: Optional[str] = None, **kwargs) -> str:
+        return self.record('insert_run', run_id=run_id, wandb_run_id=wandb_run_id, config_dict=config_dict,
+                           chain_of_custody_id=chain_of_custody_id,
+                           kwargs={k: _field(v) for k, v in kwargs.items()})
+
+    def update_run_status(self, run_id: str, status: str, **kwargs) -> str:
+        return self.record('update_run_status', run_id=run_id, status=status,
+                           fields={k: _field(v) for k, v in kwargs.items()})
+
+    def insert_objective(self, run_id: str, objective_name: str, objective_alias: Optional[str] = None,
+                         uniprot: Optional[str] = None, weight: Optional[float] = None,
+                         direction: Optional[str] = None) -> str:
+        return self.record('insert_objective', run_id=run_id, objective_name=objective_name,
+                           objective_alias=objective_alias, uniprot=uniprot, weight=weight, direction=direction)
+
+    def update_objective_metric(self, run_id: str, objective_name: str, metric_type: str, value: float) -> str:
+        return self.update_objective_metrics(run_id, {objective_name: {metric_type: value}})
+
+    def update_objective_metrics(self, run_id: str, metrics: Dict[str, Dict[str, float]]) -> str:
+        return self.record('update_objective_metrics', run_id=run_id, metrics=metrics)
+
+    def attach_crash_data(self, run_id: str, error_log_s3_key: str, crash_report_s3_key: str,
+                          crash_analysis_s3_key: str) -> str:
+        key = self.record('attach_crash_data', run_id=run_id, error_log_s3_key=error_log_s3_key,
+                          crash_report_s3_key=crash_report_s3_key, crash_analysis_s3_key=crash_analysis_s3_key)
+        self.flush()  # The process is usually about to die
+        return key
+
+    def attach_conversation(self, run_id: str, conversation_s3_key: str) -> str:
+        return self.record('attach_conversation', run_id=run_id, conversation_s3_key=conversation_s3_key)
+
+
+_journal: Optional[JournalWriter] = None
+_journal_lock = threading.Lock()
+
+
+def get_journal() -> JournalWriter:
+    """Process-wide JournalWriter for this host's journal."""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = JournalWriter()
+        return _journal
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay host write journals into the training database')
+    parser.add_argument('paths', nargs='*', help=f'Journal files (default: {journal_dir()}/*.jsonl)')
+    args = parser.parse_args()
+
+    init_db()
+    paths = args.paths or sorted(glob.glob(os.path.join(journal_dir(), '*.jsonl')))
+    stats = merge_journals(paths)
+    print(f"Merged {len(paths)} journals: " + ', '.join(f"{key}={value}" for key, value in stats.items()))
+
+
+if __name__ == '__main__':
+    main()
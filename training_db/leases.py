@@ -0,0 +1,116 @@
+"""
+Database Leases
+
+A lease is a named, expiring lock row in the leases table. Whoever holds an
+unexpired lease may do the work it guards; the holder keeps it by renewing
+before it expires, and anyone may take it over once it has expired (e.g. after
+the holder crashed). Acquiring and renewing are the same single UPSERT, so two
+processes can never both succeed.
+
+Usage:
+    owner = lease_owner()
+    if acquire_lease('mangodb-daemon', owner, ttl=120):
+        ...                                  # Renew at least every ttl seconds
+        release_lease('mangodb-daemon', owner)
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from .core import get_connection
+from .retry import retry_on_busy
+
+DEFAULT_TTL = 120.0  # Seconds a lease stays valid without renewal
+
+
+def lease_owner() -> str:
+    """Owner id for this process: host:pid:nonce."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+@retry_on_busy
+def acquire_lease(name: str, owner: str, ttl: float = DEFAULT_TTL, now: Optional[float] = None) -> bool:
+    """
+    Acquire or renew a lease
+
+    Succeeds if the lease is free, expired, or already held by `owner`.
+
+    Returns:
+        True if `owner` now holds the lease for `ttl` seconds
+    """
+    now = time.time() if now is None else now
+    with get_connection() as conn:
+        cursor = conn.execute("""
+            INSERT INTO leases (name, owner, acquired_at, expires_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                acquired_at = CASE WHEN leases.owner = excluded.owner
+                              THEN leases.acquired_at ELSE excluded.acquired_at END,
+                owner = excluded.owner,
+                expires_at = excluded.expires_at
+            WHERE leases.owner = excluded.owner OR leases.expires_at <= excluded.acquired_at
+        """, (name, owner, now, now + ttl))
+        return cursor.rowcount == 1
+
+
+@retry_on_busy
+def release_lease(name: str, owner: str) -> bool:
+    """Give up a lease held by `owner`; returns False if it was not held."""
+    with get_connection() as conn:
+        cursor = conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+        return cursor.rowcount == 1
+
+
+def get_lease(name: str) -> Optional[Dict]:
+    """Current holder of a lease (expired or not), or None."""
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT name, owner, acquired_at, expires_at FROM leases WHERE name = ?", (name,)
+        ).fetchone()
+    return dict(row) if row else None
+
+
+class LeaseKeeper:
+    """
+    Background thread that keeps renewing a held lease
+
+    Renews every ttl/3 seconds. If a renewal fails (the lease expired and was
+    taken over), `lost` is set and the thread stops; the holder must stop
+    doing the guarded work.
+    """
+
+    def __init__(self, name: str, owner: str, ttl: float = DEFAULT_TTL):
+        self.name = name
+        self.owner = owner
+        self.ttl = ttl
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'LeaseKeeper-{name}', daemon=True)
+
+    def start(self) -> 'LeaseKeeper':
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                renewed = acquire_lease(self.name, self.owner, self.ttl)
+            except Exception as e:
+                print(f"  Lease {self.name}: renewal failed: {e}")
+                continue
+            if not renewed:
+                print(f"  Lease {self.name}: lost to another instance")
+                self.lost.set()
+                return
+
+    def stop(self, release: bool = True) -> None:
+        """Stop renewing and (by default) release the lease."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        if release and not self.lost.is_set():
+            release_lease(self.name, self.owner)
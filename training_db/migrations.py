@@ -0,0 +1,995 @@
+"""
+Versioned Schema Migrations
+
+The schema version lives in SQLite's PRAGMA user_version. init_db() reads it and
+returns immediately when the database is current; otherwise the pending
+migrations run in order.
+
+Each migration is an idempotent DDL step plus optional backfills. Backfills walk
+their source table in rowid order, in bounded chunks, committing each chunk
+together with a checkpoint in migration_progress. An interrupted migration
+resumes from the last committed chunk.
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .catalog import get_catalog, parse_metric_key, parse_objective_alias
+
+DEFAULT_CHUNK_SIZE = 500
+
+SCHEMA_DIR = Path(__file__).parent
+
+
+class Backfill(NamedTuple):
+    """
+    Chunked data backfill over one table
+
+    Rows are read as (rowid, *columns) in rowid order. extract(row) parses one
+    row and must be a module-level function without database access;
+    apply(conn, results) writes a chunk of extract() results and returns the
+    number of rows it changed.
+    """
+    name: str
+    table: str
+    columns: Sequence[str]
+    extract: Callable[[tuple], Any]
+    apply: Callable[[sqlite3.Connection, List[Any]], int]
+
+
+# mapper(extract, chunks) -> iterator of (rows, [extract(row) for row in rows]), in order
+ChunkMapper = Callable[
+    [Callable[[tuple], Any], Iterable[List[tuple]]],
+    Iterator[Tuple[List[tuple], List[Any]]]
+]
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[sqlite3.Connection], None]
+    backfills: Sequence[Backfill] = ()
+
+
+PROGRESS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS migration_progress (
+        version INTEGER NOT NULL,
+        step TEXT NOT NULL,
+        last_rowid INTEGER NOT NULL DEFAULT 0,
+        rows_done INTEGER NOT NULL DEFAULT 0,
+        completed_at TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (version, step)
+    )
+"""
+
+
+# ============================================================================
+# v2: extracted hyperparameters, objectives_catalog + run_objectives
+# ============================================================================
+
+V2_TRAINING_RUNS_COLUMNS = [
+    ('gradient_accumulation_steps', 'INTEGER'),
+    ('max_steps', 'INTEGER'),
+    ('max_grad_norm', 'REAL'),
+    ('mixed_precision', 'BOOLEAN'),
+    ('gradient_checkpointing', 'BOOLEAN'),
+    ('fp16', 'BOOLEAN'),
+    ('bf16', 'BOOLEAN'),
+    ('enable_moving_targets', 'BOOLEAN'),
+    ('return_groups', 'BOOLEAN'),
+    ('n_clusters', 'INTEGER'),
+    ('final_loss', 'REAL'),
+    ('final_grad_norm', 'REAL'),
+    ('final_learning_rate', 'REAL'),
+    ('total_training_steps', 'INTEGER'),
+    ('history_json', 'TEXT'),
+]
+
+OBJECTIVES_CATALOG_SQL = """
+    CREATE TABLE IF NOT EXISTS objectives_catalog (
+        objective_id INTEGER PRIMARY KEY,
+        objective_name TEXT NOT NULL UNIQUE,
+        objective_alias TEXT,
+        uniprot TEXT,
+        direction TEXT,
+        generation INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+RUN_OBJECTIVES_SQL = """
+    CREATE TABLE IF NOT EXISTS run_objectives (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        run_id TEXT NOT NULL,
+        objective_id INTEGER NOT NULL,
+        weight REAL,
+        raw_mean REAL,
+        normalized_mean REAL,
+        raw_std REAL,
+        normalized_std REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (run_id) REFERENCES training_runs(run_id) ON DELETE CASCADE,
+        FOREIGN KEY (objective_id) REFERENCES objectives_catalog(objective_id)
+    )
+"""
+
+RUN_OBJECTIVES_INDEXES = [
+    "DROP INDEX IF EXISTS idx_obj_objective_id",  # Superseded by idx_obj_objective_raw_mean
+    "CREATE INDEX IF NOT EXISTS idx_obj_objective_raw_mean ON run_objectives(objective_id, raw_mean)",
+    "CREATE INDEX IF NOT EXISTS idx_obj_raw_mean ON run_objectives(raw_mean)",
+    "CREATE INDEX IF NOT EXISTS idx_obj_normalized_mean ON run_objectives(normalized_mean)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_obj_run_objective ON run_objectives(run_id, objective_id)",
+]
+
+# Keep objectives_catalog.generation current for cached statistics (see schema_v2.sql)
+GENERATION_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS bump_objective_generation_insert
+    AFTER INSERT ON run_objectives
+    BEGIN
+        UPDATE objectives_catalog SET generation = generation + 1
+        WHERE objective_id = NEW.objective_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS bump_objective_generation_update
+    AFTER UPDATE ON run_objectives
+    BEGIN
+        UPDATE objectives_catalog SET generation = generation + 1
+        WHERE objective_id IN (OLD.objective_id, NEW.objective_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS bump_objective_generation_delete
+    AFTER DELETE ON run_objectives
+    BEGIN
+        UPDATE objectives_catalog SET generation = generation + 1
+        WHERE objective_id = OLD.objective_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS bump_objective_generation_run
+    AFTER UPDATE OF status, gradient_method ON training_runs
+    WHEN OLD.status IS NOT NEW.status OR OLD.gradient_method IS NOT NEW.gradient_method
+    BEGIN
+        UPDATE objectives_catalog SET generation = generation + 1
+        WHERE objective_id IN (SELECT objective_id FROM run_objectives WHERE run_id = NEW.run_id);
+    END
+    """,
+]
+
+RUN_OBJECTIVES_VIEW_SQL = """
+    CREATE VIEW IF NOT EXISTS run_objectives_named AS
+    SELECT
+        o.id, o.run_id, o.objective_id,
+        c.objective_name, c.objective_alias, c.uniprot, c.direction,
+        o.weight, o.raw_mean, o.normalized_mean, o.raw_std, o.normalized_std,
+        o.created_at, o.updated_at
+    FROM run_objectives o
+    JOIN objectives_catalog c ON o.objective_id = c.objective_id
+"""
+
+# Indexes of the pre-catalog run_objectives table (keyed on objective_name)
+LEGACY_OBJECTIVE_INDEXES = [
+    'idx_obj_run_id',
+    'idx_obj_name',
+    'idx_obj_raw_mean',
+    'idx_obj_normalized_mean',
+    'idx_obj_direction',
+    'idx_obj_run_name',
+]
+
+
+def _columns(conn, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def intern_legacy_objectives(conn) -> int:
+    """
+    Rebuild a pre-catalog run_objectives table keyed on objectives_catalog
+
+    Returns:
+        Number of catalog entries created
+    """
+    interned = conn.execute("""
+        INSERT OR IGNORE INTO objectives_catalog (
+            objective_name, objective_alias, uniprot, direction
+        )
+        SELECT objective_name, MAX(objective_alias), MAX(uniprot), MAX(direction)
+        FROM run_objectives
+        GROUP BY objective_name
+    """).rowcount
+
+    conn.execute("ALTER TABLE run_objectives RENAME TO run_objectives_legacy")
+    for index_name in LEGACY_OBJECTIVE_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+    conn.execute(RUN_OBJECTIVES_SQL)
+    conn.execute("""
+        INSERT INTO run_objectives (
+            id, run_id, objective_id, weight,
+            raw_mean, normalized_mean, raw_std, normalized_std,
+            created_at, updated_at
+        )
+        SELECT
+            l.id, l.run_id, c.objective_id, l.weight,
+            l.raw_mean, l.normalized_mean, l.raw_std, l.normalized_std,
+            l.created_at, l.updated_at
+        FROM run_objectives_legacy l
+        JOIN objectives_catalog c ON c.objective_name = l.objective_name
+    """)
+    conn.execute("DROP TABLE run_objectives_legacy")
+
+    return interned
+
+
+def _upgrade_v2(conn) -> None:
+    existing = _columns(conn, 'training_runs')
+    for col_name, col_type in V2_TRAINING_RUNS_COLUMNS:
+        if col_name not in existing:
+            conn.execute(f"ALTER TABLE training_runs ADD COLUMN {col_name} {col_type}")
+            print(f"   ✓ Added column: {col_name}")
+
+    conn.execute(OBJECTIVES_CATALOG_SQL)
+    if 'generation' not in _columns(conn, 'objectives_catalog'):
+        conn.execute("ALTER TABLE objectives_catalog ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
+
+    if 'objective_name' in _columns(conn, 'run_objectives'):
+        interned = intern_legacy_objectives(conn)
+        print(f"   ✓ Interned {interned} objective names into objectives_catalog")
+    else:
+        conn.execute(RUN_OBJECTIVES_SQL)
+
+    for sql in RUN_OBJECTIVES_INDEXES + GENERATION_TRIGGERS + [RUN_OBJECTIVES_VIEW_SQL]:
+        conn.execute(sql)
+
+
+def extract_run_objectives(row) -> Optional[dict]:
+    """
+    Parse objectives (config_json) and final values (final_metrics_json) of one run
+
+    Args:
+        row: (rowid, run_id, config_json, final_metrics_json)
+
+    Returns:
+        Dict with run_id, objectives, metrics and error, or None if the run has
+        no objectives
+    """
+    _, run_id, config_json, final_metrics_json = row
+    if not config_json:
+        return None
+
+    try:
+        config = json.loads(config_json)
+    except json.JSONDecodeError as e:
+        return {'run_id': run_id, 'objectives': [], 'metrics': [], 'error': f"config_json: {e}"}
+
+    objectives = []
+    for obj in config.get('objectives') or []:
+        name = obj.get('name')
+        if not name:
+            continue
+        alias = obj.get('alias')
+        direction = obj.get('direction')
+        if not direction and alias:
+            direction = parse_objective_alias(alias)[1]
+        objectives.append((
+            name, alias, (obj.get('params') or {}).get('uniprot'), obj.get('weight'), direction
+        ))
+
+    if not objectives:
+        return None
+
+    metrics = []
+    error = None
+    if final_metrics_json:
+        try:
+            for key, value in json.loads(final_metrics_json).items():
+                # Parse: objectives/COMT_activity_maximize/raw_mean
+                parsed = parse_metric_key(key)
+                if parsed and isinstance(value, (int, float)):
+                    metrics.append((parsed[0], parsed[3], value))
+        except (json.JSONDecodeError, AttributeError) as e:
+            error = f"final_metrics_json: {e}"
+
+    return {'run_id': run_id, 'objectives': objectives, 'metrics': metrics, 'error': error}
+
+
+def apply_run_objectives(conn, results: List[Optional[dict]]) -> int:
+    """Write extract_run_objectives() results; returns number of runs backfilled."""
+    backfilled = 0
+    for result in results:
+        if result is None:
+            continue
+        if result['error']:
+            print(f"   ⚠ {result['run_id']}: invalid {result['error']}")
+
+        for name, alias, uniprot, weight, direction in result['objectives']:
+            conn.execute("""
+                INSERT OR IGNORE INTO objectives_catalog (
+                    objective_name, objective_alias, uniprot, direction
+                ) VALUES (?, ?, ?, ?)
+            """, (name, alias, uniprot, direction))
+            conn.execute("""
+                INSERT OR IGNORE INTO run_objectives (run_id, objective_id, weight)
+                SELECT ?, objective_id, ?
+                FROM objectives_catalog
+                WHERE objective_name = ?
+            """, (result['run_id'], weight, name))
+
+        for name, metric_type, value in result['metrics']:
+            conn.execute(f"""
+                UPDATE run_objectives
+                SET {metric_type} = ?
+                WHERE run_id = ? AND objective_id = (
+                    SELECT objective_id FROM objectives_catalog WHERE objective_name = ?
+                )
+            """, (value, result['run_id'], name))
+
+        if result['objectives']:
+            backfilled += 1
+
+    return backfilled
+
+
+OBJECTIVES_BACKFILL = Backfill(
+    name='run_objectives',
+    table='training_runs',
+    columns=('run_id', 'config_json', 'final_metrics_json'),
+    extract=extract_run_objectives,
+    apply=apply_run_objectives,
+)
+
+
+# ============================================================================
+# v3: run_history (one row per logged step, see history_store.py)
+# ============================================================================
+
+RUN_HISTORY_SQL = """
+    CREATE TABLE IF NOT EXISTS run_history (
+        run_id TEXT NOT NULL,
+        step INTEGER NOT NULL,
+        metrics_json TEXT NOT NULL,     -- {key: value} logged at this step
+        PRIMARY KEY (run_id, step),
+        FOREIGN KEY (run_id) REFERENCES training_runs(run_id) ON DELETE CASCADE
+    ) WITHOUT ROWID
+"""
+
+
+def _upgrade_v3(conn) -> None:
+    conn.execute(RUN_HISTORY_SQL)
+
+
+def history_step_rows(
+    run_id: str,
+    steps: Iterable[dict],
+    first_step: int = 0
+) -> Iterator[Tuple[str, int, str]]:
+    """
+    run_history rows for W&B history steps (scan_history() rows)
+
+    The step number is the row's _step, or first_step plus its position when
+    _step was not logged.
+    """
+    for position, step in enumerate(steps, first_step):
+        number = step.get('_step')
+        values = {k: v for k, v in step.items() if k != '_step' and v is not None}
+        yield run_id, int(number if number is not None else position), json.dumps(values)
+
+
+def extract_run_history(row) -> Optional[dict]:
+    """
+    Split the columnar history_json of one run into per-step rows
+
+    Args:
+        row: (rowid, run_id, history_json)
+    """
+    _, run_id, history_json = row
+    if not history_json:
+        return None
+
+    try:
+        columns = json.loads(history_json)
+        length = max((len(values) for values in columns.values()), default=0)
+        steps = (
+            {key: values[i] if i < len(values) else None for key, values in columns.items()}
+            for i in range(length)
+        )
+        return {'run_id': run_id, 'rows': list(history_step_rows(run_id, steps)), 'error': None}
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError) as e:
+        return {'run_id': run_id, 'rows': [], 'error': f"history_json: {e}"}
+
+
+def apply_run_history(conn, results: List[Optional[dict]]) -> int:
+    """Write extract_run_history() results; returns number of runs backfilled."""
+    backfilled = 0
+    for result in results:
+        if result is None:
+            continue
+        if result['error']:
+            print(f"   ⚠ {result['run_id']}: invalid {result['error']}")
+        if result['rows']:
+            conn.executemany(
+                "INSERT OR IGNORE INTO run_history (run_id, step, metrics_json) VALUES (?, ?, ?)",
+                result['rows']
+            )
+            backfilled += 1
+    return backfilled
+
+
+HISTORY_BACKFILL = Backfill(
+    name='run_history',
+    table='training_runs',
+    columns=('run_id', 'history_json'),
+    extract=extract_run_history,
+    apply=apply_run_history,
+)
+
+
+# ============================================================================
+# v4: run_poll_schedule (adaptive W&B polling, see poll_schedule.py)
+# ============================================================================
+
+RUN_POLL_SCHEDULE_SQL = """
+    CREATE TABLE IF NOT EXISTS run_poll_schedule (
+        run_id TEXT PRIMARY KEY,
+        next_poll_at REAL NOT NULL,     -- POSIX seconds
+        interval_seconds REAL NOT NULL,
+        last_polled_at REAL,
+        last_change_at REAL,
+        last_status TEXT,
+        last_step INTEGER,              -- Highest run_history step at the last poll
+        step_rate REAL,                 -- Steps per second, smoothed
+        idle_polls INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (run_id) REFERENCES training_runs(run_id) ON DELETE CASCADE
+    )
+"""
+
+
+def _upgrade_v4(conn) -> None:
+    conn.execute(RUN_POLL_SCHEDULE_SQL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_poll_next ON run_poll_schedule(next_poll_at)")
+
+
+# ============================================================================
+# v5: leases (single active daemon instance, see leases.py)
+# ============================================================================
+
+LEASES_SQL = """
+    CREATE TABLE IF NOT EXISTS leases (
+        name TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,            -- host:pid:nonce of the holder
+        acquired_at REAL NOT NULL,      -- POSIX seconds
+        expires_at REAL NOT NULL
+    )
+"""
+
+
+def _upgrade_v5(conn) -> None:
+    conn.execute(LEASES_SQL)
+
+
+# ============================================================================
+# v6: run_heartbeats (liveness without W&B/EC2, see heartbeats.py)
+# ============================================================================
+
+RUN_HEARTBEATS_SQL = """
+    CREATE TABLE IF NOT EXISTS run_heartbeats (
+        run_id TEXT PRIMARY KEY,
+        beat_at REAL NOT NULL,          -- POSIX seconds of the latest heartbeat
+        step INTEGER,                   -- Training step reported with it
+        extra_json TEXT,
+        FOREIGN KEY (run_id) REFERENCES training_runs(run_id) ON DELETE CASCADE
+    )
+"""
+
+
+def _upgrade_v6(conn) -> None:
+    conn.execute(RUN_HEARTBEATS_SQL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_heartbeats_beat_at ON run_heartbeats(beat_at)")
+
+
+# ============================================================================
+# v7: run_events (append-only change log of training_runs, see events.py)
+# ============================================================================
+
+RUN_EVENTS_SQL = """
+    CREATE TABLE IF NOT EXISTS run_events (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,  -- Never reused, increases in commit order
+        run_id TEXT NOT NULL,
+        event TEXT NOT NULL,            -- insert, status, wandb, blog_post, crash_data, conversation, delete
+        old_status TEXT,
+        new_status TEXT,
+        fields_json TEXT,               -- New values of the columns the event is about
+        created_at REAL NOT NULL        -- POSIX seconds
+    )
+"""
+
+_EVENT_NOW = "(julianday('now') - 2440587.5) * 86400.0"
+
+# (event, columns): one trigger per kind of attachment, recording the new values
+ATTACHMENT_EVENTS = [
+    ('wandb', ('wandb_run_id', 'wandb_url', 'run_name')),
+    ('blog_post', ('blog_post_url',)),
+    ('crash_data', ('error_log_s3_key', 'crash_report_s3_key', 'crash_analysis_s3_key')),
+    ('conversation', ('conversation_s3_key',)),
+]
+
+
+def _attachment_trigger(event: str, columns: Sequence[str]) -> str:
+    changed = ' OR '.join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)
+    fields = ', '.join(f"'{column}', NEW.{column}" for column in columns)
+    return f"""
+    CREATE TRIGGER IF NOT EXISTS run_events_{event}
+    AFTER UPDATE OF {', '.join(columns)} ON training_runs
+    WHEN {changed}
+    BEGIN
+        INSERT INTO run_events (run_id, event, new_status, fields_json, created_at)
+        VALUES (NEW.run_id, '{event}', NEW.status, json_object({fields}), {_EVENT_NOW});
+    END
+    """
+
+
+RUN_EVENTS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS run_events_insert
+    AFTER INSERT ON training_runs
+    BEGIN
+        INSERT INTO run_events (run_id, event, new_status, created_at)
+        VALUES (NEW.run_id, 'insert', NEW.status, {_EVENT_NOW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS run_events_status
+    AFTER UPDATE OF status ON training_runs
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        INSERT INTO run_events (run_id, event, old_status, new_status, created_at)
+        VALUES (NEW.run_id, 'status', OLD.status, NEW.status, {_EVENT_NOW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS run_events_delete
+    AFTER DELETE ON training_runs
+    BEGIN
+        INSERT INTO run_events (run_id, event, old_status, created_at)
+        VALUES (OLD.run_id, 'delete', OLD.status, {_EVENT_NOW});
+    END
+    """,
+] + [_attachment_trigger(event, columns) for event, columns in ATTACHMENT_EVENTS]
+
+
+def _upgrade_v7(conn) -> None:
+    conn.execute(RUN_EVENTS_SQL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_run_events_run ON run_events(run_id, seq)")
+    # Existing runs start the log, so a consumer reading from seq 0 sees every run
+    if conn.execute("SELECT COUNT(*) FROM run_events").fetchone()[0] == 0:
+        conn.execute(f"""
+            INSERT INTO run_events (run_id, event, new_status, created_at)
+            SELECT run_id, 'insert', status, {_EVENT_NOW}
+            FROM training_runs ORDER BY created_at, run_id
+        """)
+    for sql in RUN_EVENTS_TRIGGERS:
+        conn.execute(sql)
+
+
+# ============================================================================
+# v8: journal_applied (idempotent replay of host write journals, see journal.py)
+# ============================================================================
+
+JOURNAL_APPLIED_SQL = """
+    CREATE TABLE IF NOT EXISTS journal_applied (
+        key TEXT PRIMARY KEY,           -- Idempotency key of the journal entry
+        host TEXT,
+        op TEXT NOT NULL,
+        run_id TEXT,
+        ts REAL NOT NULL,               -- POSIX seconds the write was made on the host
+        outcome TEXT NOT NULL,          -- applied, or stale (superseded by a newer write)
+        applied_at REAL NOT NULL
+    ) WITHOUT ROWID
+"""
+
+
+def _upgrade_v8(conn) -> None:
+    conn.execute(JOURNAL_APPLIED_SQL)
+
+
+# ============================================================================
+# v9: epoch-millisecond timestamp columns (indexed time-range queries)
+# ============================================================================
+
+def epoch_ms_sql(expr: str) -> str:
+    """SQL for a timestamp text (ISO, with or without 'Z'/offset) -> UTC epoch milliseconds, NULL if unparseable."""
+    return f"CAST(ROUND((julianday({expr}) - 2440587.5) * 86400000.0) AS INTEGER)"
+
+
+NOW_MS_SQL = epoch_ms_sql("'now'")
+
+# (table, {ms column: text column it is derived from})
+EPOCH_MS_COLUMNS = [
+    ('training_runs', {
+        'created_ms': 'created_at',
+        'started_ms': 'started_at',
+        'ended_ms': 'ended_at',
+        'updated_ms': 'updated_at_db',
+    }),
+    ('run_objectives', {
+        'created_ms': 'created_at',
+        'updated_ms': 'updated_at',
+    }),
+]
+
+EPOCH_MS_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_runs_created_ms ON training_runs(created_ms)",
+    "CREATE INDEX IF NOT EXISTS idx_runs_started_ms ON training_runs(started_ms)",
+    "CREATE INDEX IF NOT EXISTS idx_runs_ended_ms ON training_runs(ended_ms)",
+    "CREATE INDEX IF NOT EXISTS idx_runs_updated_ms ON training_runs(updated_ms)",
+    "CREATE INDEX IF NOT EXISTS idx_obj_updated_ms ON run_objectives(updated_ms)",
+]
+
+# Columns whose writes are changes to the row, as opposed to derived data
+# (extracted hyperparameters, ms columns) that backfills and other
+# maintenance rewrite without touching updated_ms
+RUN_UPDATE_COLUMNS = [
+    'created_at', 'started_at', 'ended_at', 'duration_seconds', 'status',
+    'wandb_run_id', 'wandb_url', 'run_name', 'config_json', 'final_metrics_json', 'history_json',
+    'blog_post_url', 'conversation_s3_key', 'crash_report_s3_key', 'error_log_s3_key', 'crash_analysis_s3_key',
+]
+OBJECTIVE_UPDATE_COLUMNS = [
+    'weight', 'raw_mean', 'normalized_mean', 'raw_std', 'normalized_std', 'created_at', 'updated_at',
+]
+
+# The write API sets the ms columns in its own statements. These triggers
+# cover every other writer (ad-hoc SQL, scripts): a write that leaves
+# updated_ms unset or unchanged gets the ms columns derived from the stored
+# text, and updated_ms stamped with the time written to
+# run_objectives.updated_at, otherwise now. The triggers' own UPDATE changes
+# updated_ms, so it does not fire them again.
+EPOCH_MS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS epoch_ms_runs_insert
+    AFTER INSERT ON training_runs
+    WHEN NEW.updated_ms IS NULL
+    BEGIN
+        UPDATE training_runs
+        SET created_ms = {epoch_ms_sql('NEW.created_at')},
+            started_ms = {epoch_ms_sql('NEW.started_at')},
+            ended_ms = {epoch_ms_sql('NEW.ended_at')},
+            updated_ms = {NOW_MS_SQL}
+        WHERE rowid = NEW.rowid;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS epoch_ms_runs_update
+    AFTER UPDATE OF {', '.join(RUN_UPDATE_COLUMNS)} ON training_runs
+    WHEN NEW.updated_ms IS OLD.updated_ms
+    BEGIN
+        UPDATE training_runs
+        SET created_ms = {epoch_ms_sql('NEW.created_at')},
+            started_ms = {epoch_ms_sql('NEW.started_at')},
+            ended_ms = {epoch_ms_sql('NEW.ended_at')},
+            updated_ms = {NOW_MS_SQL}
+        WHERE rowid = NEW.rowid;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS epoch_ms_objectives_insert
+    AFTER INSERT ON run_objectives
+    WHEN NEW.updated_ms IS NULL
+    BEGIN
+        UPDATE run_objectives
+        SET created_ms = {epoch_ms_sql('NEW.created_at')},
+            updated_ms = COALESCE({epoch_ms_sql('NEW.updated_at')}, {NOW_MS_SQL})
+        WHERE id = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS epoch_ms_objectives_update
+    AFTER UPDATE OF {', '.join(OBJECTIVE_UPDATE_COLUMNS)} ON run_objectives
+    WHEN NEW.updated_ms IS OLD.updated_ms
+    BEGIN
+        UPDATE run_objectives
+        SET created_ms = {epoch_ms_sql('NEW.created_at')},
+            updated_ms = COALESCE(
+                CASE WHEN NEW.updated_at IS NOT OLD.updated_at THEN {epoch_ms_sql('NEW.updated_at')} END,
+                {NOW_MS_SQL}
+            )
+        WHERE id = NEW.id;
+    END
+    """,
+]
+
+
+def _upgrade_v9(conn) -> None:
+    for table, columns in EPOCH_MS_COLUMNS:
+        existing = _columns(conn, table)
+        for ms_column in columns:
+            if ms_column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {ms_column} INTEGER")
+                print(f"   ✓ Added column: {table}.{ms_column}")
+    # Replace the triggers rather than keep bodies from an earlier run of this
+    # upgrade; bump_objective_generation_insert must fire for every insert
+    for trigger in ('bump_objective_generation_insert', 'epoch_ms_runs_insert', 'epoch_ms_runs_update',
+                    'epoch_ms_objectives_insert', 'epoch_ms_objectives_update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for sql in EPOCH_MS_INDEXES + GENERATION_TRIGGERS[:1] + EPOCH_MS_TRIGGERS:
+        conn.execute(sql)
+
+
+def extract_rowid(row) -> int:
+    """Backfill rows that SQL converts: just the rowid."""
+    return row[0]
+
+
+def _epoch_ms_apply(table: str, columns: dict) -> Callable[[sqlite3.Connection, List[int]], int]:
+    assignments = ', '.join(f"{ms} = {epoch_ms_sql(text)}" for ms, text in columns.items())
+
+    def apply(conn, rowids: List[int]) -> int:
+        # Converted by SQLite, exactly like the triggers convert new writes
+        conn.executemany(f"UPDATE {table} SET {assignments} WHERE rowid = ?", [(rowid,) for rowid in rowids])
+        return len(rowids)
+    return apply
+
+
+EPOCH_MS_BACKFILLS = [
+    Backfill(
+        name=f"{table}_epoch_ms",
+        table=table,
+        columns=tuple(columns.values()),
+        extract=extract_rowid,
+        apply=_epoch_ms_apply(table, columns),
+    )
+    for table, columns in EPOCH_MS_COLUMNS
+]
+
+
+MIGRATIONS = [
+    Migration(
+        version=2,
+        description='extracted hyperparameters, objectives_catalog and run_objectives',
+        upgrade=_upgrade_v2,
+        backfills=[OBJECTIVES_BACKFILL],
+    ),
+    Migration(
+        version=3,
+        description='run_history step table',
+        upgrade=_upgrade_v3,
+        backfills=[HISTORY_BACKFILL],
+    ),
+    Migration(
+        version=4,
+        description='run_poll_schedule for adaptive W&B polling',
+        upgrade=_upgrade_v4,
+    ),
+    Migration(
+        version=5,
+        description='leases for the reconciliation daemon',
+        upgrade=_upgrade_v5,
+    ),
+    Migration(
+        version=6,
+        description='run_heartbeats for liveness detection',
+        upgrade=_upgrade_v6,
+    ),
+    Migration(
+        version=7,
+        description='run_events change log',
+        upgrade=_upgrade_v7,
+    ),
+    Migration(
+        version=8,
+        description='journal_applied for host write journals',
+        upgrade=_upgrade_v8,
+    ),
+    Migration(
+        version=9,
+        description='epoch-millisecond timestamp columns',
+        upgrade=_upgrade_v9,
+        backfills=EPOCH_MS_BACKFILLS,
+    ),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+# schema_v2.sql creates a complete version-2 database in one script
+BASE_SCHEMA = ('schema_v2.sql', 2)
+
+
+# ============================================================================
+# Runner
+# ============================================================================
+
+def get_schema_version(conn) -> int:
+    """Read PRAGMA user_version."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _set_schema_version(conn, version: int) -> None:
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def _has_table(conn, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def _read_chunks(conn, backfill: Backfill, last_rowid: int, chunk_size: int) -> Iterator[List[tuple]]:
+    query = f"""
+        SELECT rowid, {', '.join(backfill.columns)}
+        FROM {backfill.table}
+        WHERE rowid > ?
+        ORDER BY rowid
+        LIMIT ?
+    """
+    while True:
+        rows = conn.execute(query, (last_rowid, chunk_size)).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_rowid = rows[-1][0]
+
+
+def map_serial(extract: Callable[[tuple], Any], chunks: Iterable[List[tuple]]) -> Iterator[Tuple[List[tuple], List[Any]]]:
+    """Default chunk mapper: extract every row in this process."""
+    for rows in chunks:
+        yield rows, [extract(row) for row in rows]
+
+
+def run_backfill(
+    conn,
+    backfill: Backfill,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    mapper: ChunkMapper = map_serial,
+    checkpoint_version: Optional[int] = None,
+    verbose: bool = True
+) -> int:
+    """
+    Run a backfill, committing once per chunk
+
+    The mapper turns chunks of rows into (rows, results) pairs, in order; this
+    connection is the only writer. With checkpoint_version, progress is recorded
+    in migration_progress and a later call resumes after the last committed chunk
+    (and does nothing once the backfill completed).
+
+    Returns:
+        Rows processed in this call
+    """
+    last_rowid, rows_done = 0, 0
+
+    if checkpoint_version is not None:
+        conn.execute(PROGRESS_TABLE_SQL)
+        conn.execute("""
+            INSERT OR IGNORE INTO migration_progress (version, step) VALUES (?, ?)
+        """, (checkpoint_version, backfill.name))
+        conn.commit()
+
+        last_rowid, rows_done, completed_at = conn.execute("""
+            SELECT last_rowid, rows_done, completed_at FROM migration_progress
+            WHERE version = ? AND step = ?
+        """, (checkpoint_version, backfill.name)).fetchone()
+
+        if completed_at:
+            return 0
+
+    total = rows_done + conn.execute(
+        f"SELECT COUNT(*) FROM {backfill.table} WHERE rowid > ?", (last_rowid,)
+    ).fetchone()[0]
+    if rows_done and verbose:
+        print(f"   ↻ Resuming {backfill.name} at row {rows_done}/{total}")
+
+    label = f"v{checkpoint_version} {backfill.name}" if checkpoint_version is not None else backfill.name
+    started = time.monotonic()
+    processed = 0
+    changed = 0
+
+    for rows, results in mapper(backfill.extract, _read_chunks(conn, backfill, last_rowid, chunk_size)):
+        changed += backfill.apply(conn, results)
+
+        last_rowid = rows[-1][0]
+        rows_done += len(rows)
+        processed += len(rows)
+        if checkpoint_version is not None:
+            conn.execute("""
+                UPDATE migration_progress
+                SET last_rowid = ?, rows_done = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE version = ? AND step = ?
+            """, (last_rowid, rows_done, checkpoint_version, backfill.name))
+        conn.commit()
+
+        if verbose:
+            elapsed = time.monotonic() - started
+            rate = processed / elapsed if elapsed > 0 else float('inf')
+            pct = 100.0 * rows_done / total if total else 100.0
+            print(f"   [{label}] {rows_done}/{total} rows ({pct:.1f}%), {rate:.0f} rows/s")
+
+    if checkpoint_version is not None:
+        conn.execute("""
+            UPDATE migration_progress
+            SET completed_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+            WHERE version = ? AND step = ?
+        """, (checkpoint_version, backfill.name))
+        conn.commit()
+
+    if verbose:
+        print(f"   ✓ {backfill.name}: {processed} rows processed, {changed} updated")
+    return processed
+
+
+def migrate(
+    db_path: str,
+    target: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    mapper: ChunkMapper = map_serial,
+    verbose: bool = True
+) -> int:
+    """
+    Bring a database up to the target schema version
+
+    A new database is created from schema_v2.sql directly; existing databases run
+    each pending migration's DDL and then its backfills, chunk by chunk. Safe to
+    re-run after an interruption: DDL is idempotent and backfills resume from
+    their checkpoint.
+
+    Args:
+        db_path: SQLite database file
+        target: Version to migrate to (default: latest)
+        chunk_size: Rows per backfill transaction
+        mapper: How backfill rows are parsed (default: in this process; see
+            backfill.ProcessPoolMapper)
+        verbose: Print progress and throughput
+
+    Returns:
+        Schema version after migrating
+    """
+    target = SCHEMA_VERSION if target is None else target
+    conn = sqlite3.connect(db_path)
+
+    try:
+        version = get_schema_version(conn)
+        if version >= target:
+            return version
+
+        if version == 0:
+            if _has_table(conn, 'training_runs'):
+                # Pre-versioning database: v1 tables, possibly partially upgraded
+                version = 1
+            else:
+                schema_file, version = BASE_SCHEMA
+                conn.executescript((SCHEMA_DIR / schema_file).read_text())
+            _set_schema_version(conn, version)
+            conn.commit()
+
+        for migration in MIGRATIONS:
+            if migration.version <= version or migration.version > target:
+                continue
+
+            if verbose:
+                print(f"\nMigrating to v{migration.version}: {migration.description}")
+
+            conn.execute("BEGIN IMMEDIATE")
+            migration.upgrade(conn)
+            conn.commit()
+
+            for backfill in migration.backfills:
+                run_backfill(conn, backfill, chunk_size, mapper, migration.version, verbose)
+
+            _set_schema_version(conn, migration.version)
+            conn.commit()
+            version = migration.version
+
+            if verbose:
+                print(f"   ✓ Schema version {version}")
+
+        get_catalog(db_path).clear()
+        return version
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
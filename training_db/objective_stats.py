@@ -0,0 +1,402 @@
+"""
+Objective Distribution Statistics
+
+SQLite has no stddev/median/percentile aggregates. This module provides them as
+Python aggregate UDFs, plus streaming sketches (t-digest) for quantiles and
+fixed-bin histograms per objective and gradient method.
+
+Sketches are cached in-process and validated against objectives_catalog.generation,
+which triggers bump on every run_objectives write (and on status/gradient_method
+changes of a run). Writes made through update_objective_metric() are folded into
+cached sketches incrementally, once committed, instead of forcing a rebuild.
+"""
+
+import bisect
+import copy
+import math
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .catalog import METRIC_TYPES
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+class TDigest:
+    """
+    Merging t-digest (Dunning & Ertl) for streaming quantile estimates
+
+    Exact while the number of values is below the compression factor; beyond
+    that, centroids near the median absorb more points than those in the tails.
+    """
+
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._means: List[float] = []
+        self._weights: List[float] = []
+        self._buffer: List[float] = []
+
+    def add(self, value: float) -> None:
+        """Add a single observation."""
+        self._buffer.append(value)
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+
+        points = sorted(
+            list(zip(self._means, self._weights)) + [(value, 1) for value in self._buffer]
+        )
+        self._buffer = []
+
+        means = [points[0][0]]
+        weights = [points[0][1]]
+        cumulative = 0.0
+
+        for mean, weight in points[1:]:
+            q = (cumulative + weights[-1] / 2) / self.count
+            limit = 4 * self.count * q * (1 - q) / self.compression
+            if weights[-1] + weight <= limit:
+                total = weights[-1] + weight
+                means[-1] += (mean - means[-1]) * weight / total
+                weights[-1] = total
+            else:
+                cumulative += weights[-1]
+                means.append(mean)
+                weights.append(weight)
+
+        self._means = means
+        self._weights = weights
+
+    def centroids(self) -> List[Tuple[float, float]]:
+        """(mean, weight) pairs in ascending order."""
+        self._flush()
+        return list(zip(self._means, self._weights))
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-th quantile (0 <= q <= 1)."""
+        self._flush()
+        if not self.count:
+            return None
+        if len(self._means) == 1:
+            return self._means[0]
+
+        target = q * self.count
+        cumulative = 0.0
+        previous_center, previous_mean = 0.0, self.min
+
+        for mean, weight in zip(self._means, self._weights):
+            center = cumulative + weight / 2
+            if target <= center:
+                if center == previous_center:
+                    return mean
+                fraction = (target - previous_center) / (center - previous_center)
+                return previous_mean + fraction * (mean - previous_mean)
+            cumulative += weight
+            previous_center, previous_mean = center, mean
+
+        if cumulative == previous_center:
+            return self.max
+        fraction = (target - previous_center) / (cumulative - previous_center)
+        return previous_mean + fraction * (self.max - previous_mean)
+
+
+class ObjectiveSketch:
+    """Exact moments (Welford) plus a t-digest for one set of values."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.digest = TDigest()
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.digest.add(value)
+
+    @property
+    def std(self) -> Optional[float]:
+        """Sample standard deviation."""
+        if self.count < 2:
+            return None
+        return math.sqrt(self._m2 / (self.count - 1))
+
+    def histogram(self, edges: Sequence[float]) -> List[int]:
+        """Counts per bin; bins are [edges[i], edges[i+1]) with the last bin closed."""
+        counts = [0] * (len(edges) - 1)
+        if not counts:
+            return counts
+        for mean, weight in self.digest.centroids():
+            index = min(max(bisect.bisect_right(edges, mean) - 1, 0), len(counts) - 1)
+            counts[index] += int(weight)
+        return counts
+
+    def summary(self, quantiles: Sequence[float], edges: Optional[Sequence[float]]) -> Dict:
+        result = {
+            'count': self.count,
+            'mean': self.mean if self.count else None,
+            'std': self.std,
+            'min': self.digest.min if self.count else None,
+            'max': self.digest.max if self.count else None,
+            'median': self.digest.quantile(0.5),
+            'quantiles': {q: self.digest.quantile(q) for q in quantiles},
+        }
+        if edges is not None:
+            result['histogram'] = {
+                'edges': list(edges),
+                'counts': self.histogram(edges),
+            }
+        return result
+
+
+# ============================================================================
+# SQLite aggregate UDFs
+# ============================================================================
+
+class _StdDevAggregate:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def step(self, value):
+        if value is not None:
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+
+    def finalize(self):
+        if self.count < 2:
+            return None
+        return math.sqrt(self.m2 / (self.count - 1))
+
+
+class _QuantileAggregate:
+    def __init__(self):
+        self.digest = TDigest()
+        self.q = 0.5
+
+    def step(self, value, q=0.5):
+        if value is not None:
+            self.digest.add(value)
+            self.q = q
+
+    def finalize(self):
+        return self.digest.quantile(self.q)
+
+
+def register_functions(conn) -> None:
+    """
+    Register stddev(x), median(x) and quantile(x, q) aggregates on a connection
+
+    Example:
+        register_functions(conn)
+        conn.execute("SELECT stddev(raw_mean), quantile(raw_mean, 0.9) FROM run_objectives")
+    """
+    conn.create_aggregate('stddev', 1, _StdDevAggregate)
+    conn.create_aggregate('median', 1, _QuantileAggregate)
+    conn.create_aggregate('quantile', 2, _QuantileAggregate)
+
+
+# ============================================================================
+# Cached per-objective distributions
+# ============================================================================
+
+class _Distribution:
+    """Sketches for one (objective, metric, status), overall and per gradient method."""
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.overall = ObjectiveSketch()
+        self.by_method: Dict[Optional[str], ObjectiveSketch] = {}
+
+    def add(self, gradient_method: Optional[str], value: float) -> None:
+        self.overall.add(value)
+        sketch = self.by_method.get(gradient_method)
+        if sketch is None:
+            sketch = self.by_method[gradient_method] = ObjectiveSketch()
+        sketch.add(value)
+
+    def with_value(
+        self,
+        generation: int,
+        gradient_method: Optional[str] = None,
+        value: Optional[float] = None
+    ) -> '_Distribution':
+        """Copy stamped with `generation`, with `value` added; sketches it does not touch are shared."""
+        distribution = _Distribution(generation)
+        distribution.overall = self.overall
+        distribution.by_method = dict(self.by_method)
+        if value is not None:
+            distribution.overall = copy.deepcopy(self.overall)
+            sketch = self.by_method.get(gradient_method)
+            sketch = copy.deepcopy(sketch) if sketch is not None else ObjectiveSketch()
+            distribution.by_method[gradient_method] = sketch
+            distribution.overall.add(value)
+            sketch.add(value)
+        return distribution
+
+
+class PendingWrite(NamedTuple):
+    """A run_objectives write recorded by observe_write(), applied after commit."""
+    db_path: str
+    objective_id: int
+    generation: int
+    status: Optional[str]
+    gradient_method: Optional[str]
+    changes: Dict[str, Tuple[Optional[float], Optional[float]]]
+
+
+# (db_path, objective_id) -> {(metric_type, status): _Distribution}
+_cache: Dict[Tuple[str, int], Dict[Tuple[str, str], _Distribution]] = {}
+_cache_lock = threading.Lock()
+
+
+def _generation(conn, objective_id: int) -> int:
+    row = conn.execute(
+        "SELECT generation FROM objectives_catalog WHERE objective_id = ?",
+        (objective_id,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def _build_distribution(conn, objective_id: int, metric_type: str, status: str) -> _Distribution:
+    distribution = _Distribution(_generation(conn, objective_id))
+    cursor = conn.execute(f"""
+        SELECT r.gradient_method, o.{metric_type}
+        FROM run_objectives o
+        JOIN training_runs r ON r.run_id = o.run_id
+        WHERE o.objective_id = ?
+            AND r.status = ?
+            AND o.{metric_type} IS NOT NULL
+    """, (objective_id, status))
+    for gradient_method, value in cursor:
+        distribution.add(gradient_method, value)
+    return distribution
+
+
+def get_distribution(
+    conn,
+    db_path: str,
+    objective_id: int,
+    metric_type: str = 'raw_mean',
+    status: str = 'completed'
+) -> _Distribution:
+    """Get the cached distribution, rebuilding it if the objective changed since."""
+    if metric_type not in METRIC_TYPES:
+        raise ValueError(f"Unknown metric_type: {metric_type}")
+
+    key = (metric_type, status)
+    with _cache_lock:
+        distribution = _cache.get((db_path, objective_id), {}).get(key)
+
+    if distribution is not None and distribution.generation == _generation(conn, objective_id):
+        return distribution
+
+    distribution = _build_distribution(conn, objective_id, metric_type, status)
+    with _cache_lock:
+        _cache.setdefault((db_path, objective_id), {})[key] = distribution
+    return distribution
+
+
+def is_cached(db_path: str, objective_id: int) -> bool:
+    """Whether any distribution for this objective is cached (cheap pre-check for writers)."""
+    return (db_path, objective_id) in _cache
+
+
+def observe_write(
+    conn,
+    db_path: str,
+    run_id: str,
+    objective_id: int,
+    changes: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None
+) -> Optional[PendingWrite]:
+    """
+    Record a single run_objectives write for cached sketches
+
+    Call after the INSERT/UPDATE, on the same connection, and pass the result to
+    apply_writes() once conn.commit() succeeded (or to discard_writes() if the
+    transaction failed). changes maps each metric the statement set to its
+    (old_value, new_value); omit it for writes that set no metric values
+    (e.g. insert_objective).
+
+    Returns:
+        The pending write, or None if nothing is cached for the objective
+    """
+    if not is_cached(db_path, objective_id):
+        return None
+
+    run = conn.execute(
+        "SELECT status, gradient_method FROM training_runs WHERE run_id = ?",
+        (run_id,)
+    ).fetchone()
+    return PendingWrite(
+        db_path, objective_id, _generation(conn, objective_id),
+        run[0] if run else None, run[1] if run else None, changes or {}
+    )
+
+
+def apply_writes(writes: Iterable[Optional[PendingWrite]]) -> None:
+    """
+    Fold committed writes into cached sketches
+
+    Updated sketches are copies swapped in under the cache lock, so a reader
+    holding the previous one never sees a half-applied write. Sketches that
+    cannot absorb a write (a value was overwritten, or another writer got in
+    between) are dropped and rebuilt on the next read.
+    """
+    for write in writes:
+        if write is None:
+            continue
+        with _cache_lock:
+            distributions = _cache.get((write.db_path, write.objective_id))
+            if not distributions:
+                continue
+            for key, distribution in list(distributions.items()):
+                cached_metric, status = key
+                if distribution.generation != write.generation - 1:
+                    del distributions[key]
+                    continue
+
+                change = write.changes.get(cached_metric) if write.status == status else None
+                if change and change[0] is not None:
+                    del distributions[key]
+                    continue
+
+                distributions[key] = distribution.with_value(
+                    write.generation, write.gradient_method, change[1] if change else None
+                )
+
+
+def discard_writes(writes: Iterable[Optional[PendingWrite]]) -> None:
+    """Drop cached sketches of the objectives written by a failed transaction."""
+    with _cache_lock:
+        for write in writes:
+            if write is not None:
+                _cache.pop((write.db_path, write.objective_id), None)
+
+
+def clear_cache() -> None:
+    """Drop all cached sketches."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def histogram_edges(low: float, high: float, bins: int) -> List[float]:
+    """Evenly spaced bin edges covering [low, high]."""
+    if high <= low:
+        high = low + 1.0
+    width = (high - low) / bins
+    return [low + i * width for i in range(bins)] + [high]
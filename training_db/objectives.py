@@ -3,18 +3,36 @@ Training Objectives API
 
 Manages per-objective data in the run_objectives table.
 Enables queries like "find runs where COMT_activity > 0.8".
+
+Objective names are interned in objectives_catalog (see catalog.py); rows in
+run_objectives reference them by integer objective_id.
 """
 
 import sqlite3
-import os
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence
+
+from . import objective_stats
+from .analytics import get_analytics
+from .catalog import METRIC_TYPES, ObjectiveCatalog, get_catalog
+from .core import connection_path, db_path, get_connection
+from .migrations import NOW_MS_SQL, epoch_ms_sql
+from .retry import connect, retry_on_busy
 
 
 def _get_connection():
-    """Get database connection"""
-    db_path = os.environ.get('TRAINING_DB_PATH', '/home/ubuntu/mango/data/training_runs.db')
-    return sqlite3.connect(db_path)
+    """
+    Get a write connection (busy timeout, BEGIN IMMEDIATE writes; see retry.py)
+
+    Reads use core.get_connection() instead, so they borrow from the
+    process-wide pool when one is installed (e.g. the HTTP service's).
+    """
+    return connect(db_path())
+
+
+def _catalog(path: Optional[str] = None) -> ObjectiveCatalog:
+    """Get the objective name <-> ID cache for a database (default: the current one)"""
+    return get_catalog(path or db_path())
 
 
 def insert_objective(
@@ -47,29 +65,46 @@ def insert_objective(
         )
     """
     try:
-        conn = _get_connection()
-        conn.execute("""
+        _insert_objective(run_id, objective_name, objective_alias, uniprot, weight, direction)
+    except sqlite3.IntegrityError as e:
+        # Objective already exists for this run (duplicate insert)
+        pass
+    except Exception as e:
+        # Don't block training
+        print(f"Error inserting objective {objective_name} for {run_id}: {e}")
+
+
+@retry_on_busy
+def _insert_objective(run_id, objective_name, objective_alias, uniprot, weight, direction) -> None:
+    conn = _get_connection()
+    writes = []
+    try:
+        objective_id = _catalog().intern(
+            conn, objective_name, objective_alias, uniprot, direction
+        )
+        conn.commit()  # Catalog entry is shared across runs; keep it even if the insert below fails
+        path = db_path()
+        now = datetime.utcnow()
+        conn.execute(f"""
             INSERT INTO run_objectives (
-                run_id, objective_name, objective_alias, uniprot,
-                weight, direction, created_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                run_id, objective_id, weight, created_at, created_ms, updated_ms
+            ) VALUES (?, ?, ?, ?, {epoch_ms_sql('?')}, {NOW_MS_SQL})
         """, (
             run_id,
-            objective_name,
-            objective_alias,
-            uniprot,
+            objective_id,
             weight,
-            direction,
-            datetime.utcnow()
+            now,
+            now
         ))
+
+        writes.append(objective_stats.observe_write(conn, path, run_id, objective_id))
         conn.commit()
+        objective_stats.apply_writes(writes)
+    except Exception:
+        objective_stats.discard_writes(writes)
+        raise
+    finally:
         conn.close()
-    except sqlite3.IntegrityError as e:
-        # Objective already exists for this run (duplicate insert)
-        pass
-    except Exception as e:
-        # Silent failure - don't block training
-        pass
 
 
 def update_objective_metric(
@@ -107,18 +142,114 @@ def update_objective_metric(
         return
 
     try:
-        column = column_map[metric_type]
-        conn = _get_connection()
-        conn.execute(f"""
+        _update_objective_metric(run_id, objective_name, column_map[metric_type], metric_type, value)
+    except Exception as e:
+        # Don't block training
+        print(f"Error updating {objective_name}.{metric_type} for {run_id}: {e}")
+
+
+@retry_on_busy
+def _update_objective_metric(run_id, objective_name, column, metric_type, value) -> None:
+    conn = _get_connection()
+    writes = []
+    try:
+        objective_id = _catalog().get_id(conn, objective_name)
+        if objective_id is None:
+            return
+
+        # Only pay for the old-value read when a cached sketch needs it
+        path = db_path()
+        track = objective_stats.is_cached(path, objective_id)
+        if track:
+            row = conn.execute(f"""
+                SELECT {column} FROM run_objectives
+                WHERE run_id = ? AND objective_id = ?
+            """, (run_id, objective_id)).fetchone()
+
+        now = datetime.utcnow()
+        cursor = conn.execute(f"""
             UPDATE run_objectives
-            SET {column} = ?, updated_at = ?
-            WHERE run_id = ? AND objective_name = ?
-        """, (value, datetime.utcnow(), run_id, objective_name))
+            SET {column} = ?, updated_at = ?, updated_ms = {epoch_ms_sql('?')}
+            WHERE run_id = ? AND objective_id = ?
+        """, (value, now, now, run_id, objective_id))
+
+        if track and cursor.rowcount:
+            writes.append(objective_stats.observe_write(
+                conn, path, run_id, objective_id,
+                {metric_type: (row[0] if row else None, value)}
+            ))
         conn.commit()
+        objective_stats.apply_writes(writes)
+    except Exception:
+        objective_stats.discard_writes(writes)
+        raise
+    finally:
         conn.close()
-    except Exception as e:
-        # Silent failure
-        pass
+
+
+@retry_on_busy
+def update_objective_metrics(run_id: str, metrics: Dict[str, Dict[str, float]]) -> int:
+    """
+    Update several objectives' metric values of one run in a single transaction
+
+    Args:
+        run_id: Run identifier
+        metrics: {objective_name: {metric_type: value}}; unknown metric types are ignored
+
+    Returns:
+        Number of metric values written
+
+    Example:
+        update_objective_metrics('mgda_test_001', {
+            'COMT_activity': {'raw_mean': 0.856, 'raw_std': 0.04},
+            'QED': {'raw_mean': 0.71},
+        })
+    """
+    conn = _get_connection()
+    path = db_path()
+    catalog = _catalog()
+    writes = []
+    count = 0
+    now = datetime.utcnow()
+
+    try:
+        for objective_name, values in metrics.items():
+            values = {k: v for k, v in values.items() if k in METRIC_TYPES}
+            objective_id = catalog.get_id(conn, objective_name)
+            if objective_id is None or not values:
+                continue
+
+            # Only pay for the old-value read when a cached sketch needs it
+            track = objective_stats.is_cached(path, objective_id)
+            if track:
+                old = conn.execute(f"""
+                    SELECT {', '.join(values)} FROM run_objectives
+                    WHERE run_id = ? AND objective_id = ?
+                """, (run_id, objective_id)).fetchone()
+
+            cursor = conn.execute(f"""
+                UPDATE run_objectives
+                SET {', '.join(f'{column} = ?' for column in values)}, updated_at = ?, updated_ms = {epoch_ms_sql('?')}
+                WHERE run_id = ? AND objective_id = ?
+            """, list(values.values()) + [now, now, run_id, objective_id])
+
+            if cursor.rowcount:
+                count += len(values)
+                if track:
+                    writes.append(objective_stats.observe_write(conn, path, run_id, objective_id, {
+                        column: (old[i] if old else None, value)
+                        for i, (column, value) in enumerate(values.items())
+                    }))
+
+        conn.commit()
+        objective_stats.apply_writes(writes)
+    except Exception:
+        objective_stats.discard_writes(writes)
+        raise
+    finally:
+        conn.close()
+
+    return count
 
 
 def get_run_objectives(run_id: str) -> List[Dict]:
@@ -137,17 +268,16 @@ def get_run_objectives(run_id: str) -> List[Dict]:
             print(f"{obj['objective_name']}: {obj['raw_mean']}")
     """
     try:
-        conn = _get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.execute("""
-            SELECT * FROM run_objectives
-            WHERE run_id = ?
-            ORDER BY objective_name
-        """, (run_id,))
-
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return results
+        with get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT o.*, c.objective_name, c.objective_alias, c.uniprot, c.direction
+                FROM run_objectives o
+                JOIN objectives_catalog c ON o.objective_id = c.objective_id
+                WHERE o.run_id = ?
+                ORDER BY c.objective_name
+            """, (run_id,))
+
+            return [dict(row) for row in cursor.fetchall()]
     except Exception as e:
         return []
 
@@ -193,57 +323,60 @@ def query_runs_by_objectives(
         return []
 
     try:
-        conn = _get_connection()
-        conn.row_factory = sqlite3.Row
-
-        # Build query with JOIN for each objective
-        joins = []
-        where_clauses = []
-        params = []
-
-        for i, (obj_name, constraints) in enumerate(objective_filters.items()):
-            alias = f"o{i}"
-            joins.append(f"""
-                JOIN run_objectives {alias} ON r.run_id = {alias}.run_id
-                    AND {alias}.objective_name = ?
-            """)
-            params.append(obj_name)
-
-            # Add min/max constraints
-            if 'min' in constraints:
-                where_clauses.append(f"{alias}.raw_mean >= ?")
-                params.append(constraints['min'])
-            if 'max' in constraints:
-                where_clauses.append(f"{alias}.raw_mean <= ?")
-                params.append(constraints['max'])
-
-        # Add run-level filters
-        if gradient_method:
-            where_clauses.append("r.gradient_method = ?")
-            params.append(gradient_method)
-        if status:
-            where_clauses.append("r.status = ?")
-            params.append(status)
-        if host:
-            where_clauses.append("r.host = ?")
-            params.append(host)
-
-        # Build final query
-        where_clause = " AND ".join(where_clauses) if where_clauses else "1=1"
-        query = f"""
-            SELECT DISTINCT r.*
-            FROM training_runs r
-            {' '.join(joins)}
-            WHERE {where_clause}
-            ORDER BY r.{order_by}
-            LIMIT ?
-        """
-        params.append(limit)
-
-        cursor = conn.execute(query, params)
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return results
+        with get_connection() as conn:
+            catalog = _catalog(connection_path())
+
+            # Build query with JOIN for each objective
+            joins = []
+            where_clauses = []
+            params = []
+
+            for i, (obj_name, constraints) in enumerate(objective_filters.items()):
+                objective_id = catalog.get_id(conn, obj_name)
+                if objective_id is None:
+                    # Objective never recorded - no run can match
+                    return []
+
+                alias = f"o{i}"
+                joins.append(f"""
+                    JOIN run_objectives {alias} ON r.run_id = {alias}.run_id
+                        AND {alias}.objective_id = ?
+                """)
+                params.append(objective_id)
+
+                # Add min/max constraints
+                if 'min' in constraints:
+                    where_clauses.append(f"{alias}.raw_mean >= ?")
+                    params.append(constraints['min'])
+                if 'max' in constraints:
+                    where_clauses.append(f"{alias}.raw_mean <= ?")
+                    params.append(constraints['max'])
+
+            # Add run-level filters
+            if gradient_method:
+                where_clauses.append("r.gradient_method = ?")
+                params.append(gradient_method)
+            if status:
+                where_clauses.append("r.status = ?")
+                params.append(status)
+            if host:
+                where_clauses.append("r.host = ?")
+                params.append(host)
+
+            # Build final query
+            where_clause = " AND ".join(where_clauses) if where_clauses else "1=1"
+            query = f"""
+                SELECT DISTINCT r.*
+                FROM training_runs r
+                {' '.join(joins)}
+                WHERE {where_clause}
+                ORDER BY r.{order_by}
+                LIMIT ?
+            """
+            params.append(limit)
+
+            cursor = conn.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
     except Exception as e:
         print(f"Error querying by objectives: {e}")
         return []
@@ -263,48 +396,83 @@ def get_objective_statistics(
         status: Filter by status (default: 'completed')
 
     Returns:
-        Dict with count, mean, min, max, std for the objective
+        Dict with count, mean, min, max, std, median for the objective, and
+        avg_std (mean of the per-run raw_std values)
 
     Example:
         stats = get_objective_statistics('COMT_activity', gradient_method='mgda')
         print(f"MGDA COMT: avg={stats['mean']:.3f}, best={stats['max']:.3f}")
     """
     try:
-        conn = _get_connection()
+        return get_analytics().objective_statistics(objective_name, gradient_method, status)
+    except Exception as e:
+        return {'count': 0, 'mean': None, 'min': None, 'max': None, 'avg_std': None,
+                'std': None, 'median': None}
 
-        where_clauses = ["r.status = ?", "o.objective_name = ?"]
-        params = [status, objective_name]
 
-        if gradient_method:
-            where_clauses.append("r.gradient_method = ?")
-            params.append(gradient_method)
+def get_objective_distribution(
+    objective_name: str,
+    metric_type: str = 'raw_mean',
+    status: str = 'completed',
+    quantiles: Sequence[float] = objective_stats.DEFAULT_QUANTILES,
+    bins: int = 10
+) -> Dict:
+    """
+    Get quantiles and fixed-bin histograms for an objective, per gradient method
 
-        where_clause = " AND ".join(where_clauses)
+    Served from a cached t-digest sketch that is only rebuilt when the objective's
+    rows (or the status/gradient_method of one of its runs) changed since.
 
-        cursor = conn.execute(f"""
-            SELECT
-                COUNT(*) as count,
-                AVG(o.raw_mean) as mean,
-                MIN(o.raw_mean) as min,
-                MAX(o.raw_mean) as max,
-                AVG(o.raw_std) as avg_std
-            FROM training_runs r
-            JOIN run_objectives o ON r.run_id = o.run_id
-            WHERE {where_clause}
-        """, params)
-
-        row = cursor.fetchone()
-        conn.close()
+    Args:
+        objective_name: Objective to analyze
+        metric_type: One of: 'raw_mean', 'normalized_mean', 'raw_std', 'normalized_std'
+        status: Filter by status (default: 'completed')
+        quantiles: Quantiles to report (0-1)
+        bins: Number of histogram bins (shared edges across gradient methods)
 
-        return {
-            'count': row[0],
-            'mean': row[1],
-            'min': row[2],
-            'max': row[3],
-            'avg_std': row[4]
-        }
-    except Exception as e:
-        return {'count': 0, 'mean': None, 'min': None, 'max': None, 'avg_std': None}
+    Returns:
+        Dict with 'overall' and 'by_gradient_method' summaries; each summary has
+        count, mean, std, min, max, median, quantiles and histogram
+
+    Example:
+        dist = get_objective_distribution('COMT_activity')
+        for method, summary in dist['by_gradient_method'].items():
+            print(f"{method}: p95={summary['quantiles'][0.95]:.3f}")
+    """
+    if metric_type not in METRIC_TYPES:
+        raise ValueError(f"Unknown metric_type: {metric_type}")
+
+    empty = {'objective_name': objective_name, 'metric_type': metric_type,
+             'overall': None, 'by_gradient_method': {}}
+
+    try:
+        with get_connection() as conn:
+            path = connection_path()
+            objective_id = _catalog(path).get_id(conn, objective_name)
+            if objective_id is None:
+                return empty
+
+            distribution = objective_stats.get_distribution(
+                conn, path, objective_id, metric_type, status
+            )
+    except sqlite3.Error as e:
+        print(f"Error computing distribution for {objective_name}: {e}")
+        return empty
+
+    overall = distribution.overall
+    edges = None
+    if overall.count and bins:
+        edges = objective_stats.histogram_edges(overall.digest.min, overall.digest.max, bins)
+
+    return {
+        'objective_name': objective_name,
+        'metric_type': metric_type,
+        'overall': overall.summary(quantiles, edges),
+        'by_gradient_method': {
+            method: sketch.summary(quantiles, edges)
+            for method, sketch in distribution.by_method.items()
+        },
+    }
 
 
 def compare_gradient_methods(
@@ -327,41 +495,102 @@ def compare_gradient_methods(
             print(f"{r['gradient_method']}: avg={r['avg']:.3f}, best={r['best']:.3f}")
     """
     try:
-        conn = _get_connection()
-        cursor = conn.execute("""
-            SELECT
-                r.gradient_method,
-                COUNT(*) as count,
-                AVG(o.raw_mean) as avg,
-                MAX(o.raw_mean) as best,
-                MIN(o.raw_mean) as worst,
-                AVG(r.duration_seconds / 3600.0) as avg_hours
-            FROM training_runs r
-            JOIN run_objectives o ON r.run_id = o.run_id
-            WHERE r.status = ?
-                AND o.objective_name = ?
-                AND r.gradient_method IS NOT NULL
-            GROUP BY r.gradient_method
-            ORDER BY avg DESC
-        """, (status, objective_name))
-
-        results = []
-        for row in cursor.fetchall():
-            results.append({
-                'gradient_method': row[0],
-                'count': row[1],
-                'avg': row[2],
-                'best': row[3],
-                'worst': row[4],
-                'avg_hours': row[5]
-            })
-
-        conn.close()
-        return results
+        return get_analytics().compare_gradient_methods(objective_name, status)
     except Exception as e:
         return []
 
 
+# training_runs columns top_k_runs() may partition by
+TOP_K_GROUP_COLUMNS = {
+    'gradient_method', 'host', 'status', 'batch_size', 'learning_rate',
+    'beta', 'num_gpus', 'num_objectives', 'num_scaffolds',
+}
+
+
+def top_k_runs(
+    objective_name: str,
+    k: int = 10,
+    group_by: Optional[str] = 'gradient_method',
+    direction: Optional[str] = None,
+    metric_type: str = 'raw_mean',
+    status: Optional[str] = None
+) -> List[Dict]:
+    """
+    Best k runs on an objective, per group
+
+    Ranks inside SQLite (ROW_NUMBER() OVER (PARTITION BY ...)) over the
+    (objective_id, raw_mean) index, so only k rows per group reach Python.
+
+    Args:
+        objective_name: Objective to rank on
+        k: Runs to return per group
+        group_by: training_runs column to partition by (None for a single leaderboard)
+        direction: 'maximize' or 'minimize' (default: the objective's catalog direction)
+        metric_type: One of: 'raw_mean', 'normalized_mean', 'raw_std', 'normalized_std'
+        status: Optionally filter by status
+
+    Returns:
+        List of dicts with run fields, 'value', 'rank' and 'group', ordered by
+        group then rank
+
+    Example:
+        # Best 20 runs on COMT_activity per gradient method
+        for row in top_k_runs('COMT_activity', k=20):
+            print(f"{row['group']} #{row['rank']}: {row['run_id']} = {row['value']:.3f}")
+    """
+    if group_by is not None and group_by not in TOP_K_GROUP_COLUMNS:
+        raise ValueError(f"Cannot group by: {group_by}")
+    if metric_type not in METRIC_TYPES:
+        raise ValueError(f"Unknown metric_type: {metric_type}")
+    if direction not in (None, 'maximize', 'minimize'):
+        raise ValueError(f"Unknown direction: {direction}")
+
+    try:
+        with get_connection() as conn:
+            catalog = _catalog(connection_path())
+            objective_id = catalog.get_id(conn, objective_name)
+            if objective_id is None:
+                return []
+
+            if direction is None:
+                direction = catalog.get_entry(conn, objective_id)['direction'] or 'maximize'
+            order = 'DESC' if direction == 'maximize' else 'ASC'
+
+            where_clauses = ["o.objective_id = ?", f"o.{metric_type} IS NOT NULL"]
+            params = [objective_id]
+            if status:
+                where_clauses.append("r.status = ?")
+                params.append(status)
+
+            group_sql = f"r.{group_by}" if group_by else "NULL"
+            partition_sql = f"PARTITION BY r.{group_by}" if group_by else ""
+
+            cursor = conn.execute(f"""
+                SELECT * FROM (
+                    SELECT
+                        {group_sql} AS "group",
+                        r.run_id, r.run_name, r.wandb_run_id, r.wandb_url,
+                        r.status, r.host, r.gradient_method, r.batch_size,
+                        r.learning_rate, r.created_at, r.duration_seconds,
+                        o.{metric_type} AS value,
+                        ROW_NUMBER() OVER (
+                            {partition_sql}
+                            ORDER BY o.{metric_type} {order}, r.run_id
+                        ) AS rank
+                    FROM run_objectives o
+                    JOIN training_runs r ON r.run_id = o.run_id
+                    WHERE {' AND '.join(where_clauses)}
+                )
+                WHERE rank <= ?
+                ORDER BY "group", rank
+            """, params + [k])
+
+            return [dict(row) for row in cursor]
+    except sqlite3.Error as e:
+        print(f"Error ranking runs on {objective_name}: {e}")
+        return []
+
+
 def delete_run_objectives(run_id: str) -> None:
     """
     Delete all objectives for a run (cleanup utility)
@@ -370,9 +599,16 @@ def delete_run_objectives(run_id: str) -> None:
         run_id: Run identifier
     """
     try:
-        conn = _get_connection()
+        _delete_run_objectives(run_id)
+    except Exception as e:
+        print(f"Error deleting objectives for {run_id}: {e}")
+
+
+@retry_on_busy
+def _delete_run_objectives(run_id: str) -> None:
+    conn = _get_connection()
+    try:
         conn.execute("DELETE FROM run_objectives WHERE run_id = ?", (run_id,))
         conn.commit()
+    finally:
         conn.close()
-    except Exception as e:
-        pass
@@ -0,0 +1,202 @@
+"""
+Adaptive W&B Polling Schedule
+
+Decides which runs the W&B sync polls on a given tick, so API calls go where
+data is changing. run_poll_schedule keeps, per run, when it was last polled,
+when its data last changed, its step rate and when it is next due:
+
+- brand-new 'launched' runs come first and are re-polled every few minutes
+  until W&B knows them (or the sync marks them stale)
+- runs that logged new steps are polled again after roughly
+  TARGET_STEPS_PER_POLL steps' worth of time
+- runs that did not change back off exponentially, up to a cap per status
+
+A change is a new run_history step or a new status, read back from the
+database after the sync, so the sync itself needs no scheduler hooks. Runs
+without a schedule row are due immediately.
+
+Usage:
+    runs = due_runs(limit=100)
+    sync_runs(api, runs, entity, project)
+    record_polls([run['run_id'] for run in runs])
+"""
+
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .core import get_connection
+
+MIN_INTERVAL = 60.0  # Seconds between polls of the busiest runs
+TARGET_STEPS_PER_POLL = 50  # New history steps an active run should gain between polls
+MAX_INTERVALS = {
+    'launched': 300.0,  # Waiting for the W&B run to appear
+    'running': 3600.0,
+}
+DEFAULT_MAX_INTERVAL = 86400.0  # Stopped runs still waiting for their history
+RATE_SMOOTHING = 0.5  # Weight of the latest observation in step_rate
+
+SCHEDULE_COLUMNS = (
+    'run_id', 'next_poll_at', 'interval_seconds', 'last_polled_at', 'last_change_at',
+    'last_status', 'last_step', 'step_rate', 'idle_polls',
+)
+
+
+def due_runs(now: Optional[float] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Runs to poll now, most urgent first
+
+    Candidates are launched and running runs plus stopped runs without history
+    (the query_stale_runs() set, plus new launches) that have a wandb_run_id or
+    run_name to look them up by. Order: launched runs, then runs never polled,
+    then by how overdue they are.
+
+    Args:
+        now: POSIX time (default: time.time())
+        limit: Max runs to return
+
+    Returns:
+        Dicts with run_id, run_name, wandb_run_id, status, created_at (as
+        query_stale_runs(), so they can go straight to sync_runs())
+    """
+    now = time.time() if now is None else now
+    query = """
+        SELECT r.run_id, r.run_name, r.wandb_run_id, r.status, r.created_at
+        FROM training_runs r
+        LEFT JOIN run_poll_schedule s ON s.run_id = r.run_id
+        WHERE (
+            r.status IN ('launched', 'running')
+            OR (r.status = 'not_running' AND NOT EXISTS (
+                SELECT 1 FROM run_history h WHERE h.run_id = r.run_id
+            ))
+        )
+        AND (r.wandb_run_id IS NOT NULL OR r.run_name IS NOT NULL)
+        AND (s.next_poll_at IS NULL OR s.next_poll_at <= ?)
+        ORDER BY
+            r.status = 'launched' DESC,
+            s.run_id IS NOT NULL,
+            s.next_poll_at,
+            r.created_at DESC
+    """
+    params: List[Any] = [now]
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    with get_connection() as conn:
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+
+def plan_next_poll(
+    previous: Optional[Dict[str, Any]],
+    status: str,
+    last_step: Optional[int],
+    now: float
+) -> Dict[str, Any]:
+    """
+    Schedule row after a poll
+
+    Args:
+        previous: The run's schedule row before this poll (None if never polled)
+        status: Run status after the poll
+        last_step: Highest stored history step after the poll
+        now: POSIX time of the poll
+
+    Returns:
+        New schedule row (without run_id)
+    """
+    cap = MAX_INTERVALS.get(status, DEFAULT_MAX_INTERVAL)
+
+    if previous is None:
+        return {
+            'next_poll_at': now + MIN_INTERVAL,
+            'interval_seconds': MIN_INTERVAL,
+            'last_polled_at': now,
+            'last_change_at': now,
+            'last_status': status,
+            'last_step': last_step,
+            'step_rate': None,
+            'idle_polls': 0,
+        }
+
+    new_steps = (last_step if last_step is not None else -1) - (
+        previous['last_step'] if previous['last_step'] is not None else -1
+    )
+    rate = previous['step_rate']
+    elapsed = now - (previous['last_polled_at'] or now)
+    if new_steps > 0 and elapsed > 0:
+        observed = new_steps / elapsed
+        rate = observed if rate is None else RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * rate
+
+    if new_steps > 0 or status != previous['last_status']:
+        interval = TARGET_STEPS_PER_POLL / rate if rate else MIN_INTERVAL
+        idle_polls = 0
+        last_change_at = now
+    else:
+        interval = previous['interval_seconds'] * 2
+        idle_polls = previous['idle_polls'] + 1
+        last_change_at = previous['last_change_at']
+
+    interval = min(max(interval, MIN_INTERVAL), cap)
+    return {
+        'next_poll_at': now + interval,
+        'interval_seconds': interval,
+        'last_polled_at': now,
+        'last_change_at': last_change_at,
+        'last_status': status,
+        'last_step': last_step if last_step is not None else previous['last_step'],
+        'step_rate': rate,
+        'idle_polls': idle_polls,
+    }
+
+
+def record_polls(run_ids: Iterable[str], now: Optional[float] = None) -> int:
+    """
+    Reschedule runs after a sync polled them
+
+    Reads each run's status and last stored history step, compares them with
+    its schedule row and writes the next poll time, in one transaction.
+
+    Returns:
+        Number of runs rescheduled
+    """
+    now = time.time() if now is None else now
+    placeholders = ', '.join('?' for _ in SCHEDULE_COLUMNS)
+    count = 0
+
+    with get_connection() as conn:
+        for run_id in run_ids:
+            run = conn.execute("""
+                SELECT status, (SELECT MAX(step) FROM run_history WHERE run_id = ?) AS last_step
+                FROM training_runs WHERE run_id = ?
+            """, (run_id, run_id)).fetchone()
+            if run is None:
+                continue
+
+            previous = conn.execute(
+                f"SELECT {', '.join(SCHEDULE_COLUMNS)} FROM run_poll_schedule WHERE run_id = ?",
+                (run_id,)
+            ).fetchone()
+
+            row = plan_next_poll(dict(previous) if previous else None, run['status'], run['last_step'], now)
+            conn.execute(
+                f"INSERT OR REPLACE INTO run_poll_schedule ({', '.join(SCHEDULE_COLUMNS)}) "
+                f"VALUES ({placeholders})",
+                [run_id] + [row[column] for column in SCHEDULE_COLUMNS[1:]]
+            )
+            count += 1
+
+    return count
+
+
+def schedule_summary(now: Optional[float] = None) -> Dict[str, int]:
+    """Scheduled runs by state: due now, waiting, and idle (backed off at least once)."""
+    now = time.time() if now is None else now
+    with get_connection() as conn:
+        row = conn.execute("""
+            SELECT
+                COUNT(CASE WHEN next_poll_at <= ? THEN 1 END),
+                COUNT(CASE WHEN next_poll_at > ? THEN 1 END),
+                COUNT(CASE WHEN idle_polls > 0 THEN 1 END)
+            FROM run_poll_schedule
+        """, (now, now)).fetchone()
+    return {'due': row[0], 'waiting': row[1], 'idle': row[2]}
@@ -0,0 +1,221 @@
+"""
+Run Reconcilers
+
+The periodic jobs that keep training_runs in line with the outside world, as
+tasks for the mangodb daemon (daemon.py). Each takes the daemon's
+DaemonContext (shared W&B/EC2 clients, W&B cache, in-memory view of active
+runs) and returns counts for the log line.
+
+- fix_running_runs: attach W&B IDs to running runs that have none yet
+- sync_wandb_runs: poll due runs from W&B (run_sync.py, poll_schedule.py)
+- cleanup_orphaned_runs: mark runs whose EC2 instance is gone as crashed
+  (runs with a recent heartbeat are not checked)
+- merge_host_journals: replay host write journals found in journal_dir()
+
+The scripts in scripts/ run the same tasks once (see daemon.run_once).
+"""
+
+import glob
+import itertools
+import os
+import re
+from datetime import datetime
+from typing import Dict, Sequence, Tuple
+
+from .core import update_run_status, update_runs_status
+from .heartbeats import live_run_ids
+from .journal import journal_dir, merge_journals
+from .poll_schedule import due_runs, record_polls
+from .run_matching import RunMatcher, config_prefix
+from .run_sync import query_stale_runs, sync_runs
+
+RECENT_WANDB_RUNS = 50  # W&B runs searched for running runs without a wandb_run_id
+DEAD_INSTANCE_STATES = ('terminated', 'shutting-down', 'stopped')
+EC2_BATCH_SIZE = 1000  # Max InstanceIds per describe_instances call
+INSTANCE_ID_PATTERN = re.compile(r'i-[0-9a-f]+')
+
+
+def fix_running_runs(ctx) -> Dict[str, int]:
+    """
+    Find W&B runs for database runs that are running but have no wandb_run_id
+
+    Matches against the most recent W&B runs by config prefix, taking the
+    newest running W&B run not yet attached to another database run.
+    """
+    orphans = [
+        run for run in ctx.active.with_status('running')
+        if not run['wandb_run_id']
+    ]
+    if not orphans:
+        return {'checked': 0, 'fixed': 0}
+
+    api = ctx.wandb_api
+    recent = RunMatcher(itertools.islice(
+        api.runs(f"{ctx.entity}/{ctx.project}", order="-created_at"), RECENT_WANDB_RUNS
+    ))
+    attached = {run['wandb_run_id'] for run in ctx.active.all() if run['wandb_run_id']}
+
+    fixed = 0
+    for db_run in orphans:
+        run_id = db_run['run_id']
+        prefix = config_prefix(run_id)
+        if prefix is None:
+            print(f"  {run_id}: ❌ Could not parse run_id")
+            continue
+
+        # Newest first
+        match = next((
+            run for run, _ in recent.candidates(prefix)
+            if run.state == 'running' and run.id not in attached
+        ), None)
+        if match is None:
+            print(f"  {run_id}: ❌ No matches found")
+            continue
+
+        print(f"  {run_id}: ✅ {match.name} (ID: {match.id})")
+        if not ctx.dry_run:
+            update_run_status(
+                run_id=run_id,
+                status='running',
+                wandb_run_id=match.id,
+                wandb_url=match.url,
+                run_name=match.name
+            )
+            ctx.active.update(run_id, 'running', wandb_run_id=match.id, run_name=match.name)
+        attached.add(match.id)
+        fixed += 1
+
+    return {'checked': len(orphans), 'fixed': fixed}
+
+
+def sync_wandb_runs(ctx) -> Dict[str, int]:
+    """
+    Poll the runs that are due on the adaptive schedule (all stale runs with ctx.poll_all)
+
+    Returns:
+        sync_runs() counts plus 'polled'
+    """
+    if ctx.poll_all:
+        runs = query_stale_runs(limit=ctx.limit)
+    else:
+        runs = due_runs(limit=ctx.limit)
+    if not runs:
+        return {'polled': 0}
+
+    stats = sync_runs(
+        ctx.wandb_api, runs, ctx.entity, ctx.project,
+        workers=ctx.workers,
+        rate=ctx.rate,
+        dry_run=ctx.dry_run,
+        verbose=ctx.verbose,
+        mark_stale=ctx.mark_stale,
+        cache=ctx.cache,
+    )
+    if not ctx.dry_run:
+        record_polls([run['run_id'] for run in runs])
+
+    return dict(stats, polled=len(runs))
+
+
+def describe_instance_states(ec2, instance_ids: Sequence[str]) -> Tuple[Dict[str, str], int]:
+    """
+    EC2 state of each instance, EC2_BATCH_SIZE IDs per describe_instances call
+
+    Follows NextToken through paginated responses. IDs that EC2 reports as not
+    found, or that come back in no reservation, map to 'terminated'. A batch
+    that fails with any other AWS error is left out of the result.
+
+    Args:
+        ec2: boto3 EC2 client (or a compatible stand-in)
+        instance_ids: Instance IDs (duplicates are described once)
+
+    Returns:
+        ({instance_id: state name}, number of describe_instances calls)
+    """
+    ids = list(dict.fromkeys(instance_ids))
+    states: Dict[str, str] = {}
+    calls = 0
+
+    for start in range(0, len(ids), EC2_BATCH_SIZE):
+        batch = ids[start:start + EC2_BATCH_SIZE]
+        while batch:
+            batch_states = {}
+            kwargs = {'InstanceIds': batch}
+            try:
+                while True:
+                    calls += 1
+                    response = ec2.describe_instances(**kwargs)
+                    for reservation in response['Reservations']:
+                        for instance in reservation['Instances']:
+                            batch_states[instance['InstanceId']] = instance['State']['Name']
+                    if not response.get('NextToken'):
+                        break
+                    kwargs['NextToken'] = response['NextToken']
+            except ec2.exceptions.ClientError as e:
+                error = e.response.get('Error', {})
+                # One unknown ID fails the whole call: note the ones EC2 names and retry without them
+                missing = set(INSTANCE_ID_PATTERN.findall(error.get('Message', ''))) & set(batch)
+                if error.get('Code') != 'InvalidInstanceID.NotFound' or not missing:
+                    print(f"  AWS error checking {len(batch)} instances: {e}")
+                    break
+                states.update((instance_id, 'terminated') for instance_id in missing)
+                batch = [instance_id for instance_id in batch if instance_id not in missing]
+                continue
+
+            states.update((instance_id, batch_states.get(instance_id, 'terminated')) for instance_id in batch)
+            break
+
+    return states, calls
+
+
+def cleanup_orphaned_runs(ctx) -> Dict[str, int]:
+    """
+    Mark launched/running runs whose EC2 instance is terminated as crashed
+
+    A backup for runs that die before W&B initializes or before they can
+    report their own status. Expanse runs are skipped, and so are runs with a
+    recent heartbeat (heartbeats.py): only runs that never sent one or went
+    quiet are checked. Instance states are looked up in batches
+    (describe_instance_states) and all crash transitions are written in one
+    transaction.
+    """
+    live = live_run_ids()
+    candidates = [
+        run for run in ctx.active.with_status('launched', 'running')
+        # Expanse runs have a different instance_id format
+        if run.get('instance_id') and run.get('host') != 'expanse'
+    ]
+    active_runs = [run for run in candidates if run['run_id'] not in live]
+    alive = len(candidates) - len(active_runs)
+    if not active_runs:
+        return {'checked': 0, 'crashed': 0, 'ec2_calls': 0, 'alive': alive}
+
+    states, calls = describe_instance_states(ctx.ec2, [run['instance_id'] for run in active_runs])
+
+    ended_at = datetime.utcnow()
+    crashed = []
+    for run in active_runs:
+        state = states.get(run['instance_id'])
+        if state in DEAD_INSTANCE_STATES:
+            print(f"  {run['run_id']}: Instance {run['instance_id']} state = {state} → crashed")
+            crashed.append({'run_id': run['run_id'], 'status': 'crashed', 'ended_at': ended_at})
+
+    if crashed and not ctx.dry_run:
+        update_runs_status(crashed)
+        for update in crashed:
+            ctx.active.update(update['run_id'], 'crashed')
+
+    return {'checked': len(states), 'crashed': len(crashed), 'ec2_calls': calls, 'alive': alive}
+
+
+def merge_host_journals(ctx) -> Dict[str, int]:
+    """
+    Replay the host write journals in journal_dir() (journal.py)
+
+    Each file is read from where the previous pass left off (ctx.journal_offsets).
+    """
+    paths = sorted(glob.glob(os.path.join(journal_dir(), '*.jsonl')))
+    if not paths or ctx.dry_run:
+        return {'journals': len(paths)}
+    stats = merge_journals(paths, ctx.journal_offsets)
+    return dict(stats, journals=len(paths))
@@ -0,0 +1,143 @@
+"""
+Lock Contention Handling
+
+During sweep launches many processes write at once, and SQLite allows one
+writer at a time. Two layers keep that from surfacing as random "database is
+locked" errors:
+
+1. Connections from connect() wait up to BUSY_TIMEOUT seconds for a lock
+   (SQLite's busy handler) and open write transactions with BEGIN IMMEDIATE.
+   Taking the write lock up front means a transaction never has to upgrade
+   a read lock while another writer waits. That upgrade deadlock fails at
+   once with SQLITE_BUSY, whatever the busy timeout.
+2. Write functions decorated with @retry_on_busy rerun the whole transaction
+   when it still fails with SQLITE_BUSY/SQLITE_LOCKED, after a jittered
+   exponential backoff (full jitter, so waiting writers spread out instead of
+   retrying in lockstep).
+
+Configuration (environment):
+    TRAINING_DB_BUSY_TIMEOUT       Seconds to wait on a lock per attempt (default 5)
+    TRAINING_DB_RETRY_ATTEMPTS     Attempts per write, first included (default 6; 1 disables retries)
+    TRAINING_DB_RETRY_BASE_DELAY   First backoff ceiling in seconds (default 0.05)
+    TRAINING_DB_RETRY_MAX_DELAY    Backoff ceiling in seconds (default 2)
+
+Usage:
+    from training_db.retry import connect, retry_on_busy
+
+    @retry_on_busy
+    def record(run_id):
+        with connect(db_path()) as conn:
+            conn.execute("UPDATE ...")
+"""
+
+import functools
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, NamedTuple, Optional, Set
+
+BUSY_TIMEOUT = float(os.environ.get('TRAINING_DB_BUSY_TIMEOUT', 5))
+ISOLATION_LEVEL = 'IMMEDIATE'  # sqlite3 opens implicit write transactions with BEGIN IMMEDIATE
+
+BUSY_ERROR_CODES = {5, 6}  # SQLITE_BUSY, SQLITE_LOCKED (extended codes are masked to these)
+BUSY_MESSAGES = ('database is locked', 'database is busy', 'database table is locked')
+
+
+class RetryPolicy(NamedTuple):
+    """How often and how long to retry a write that hit a locked database"""
+    attempts: int = 6
+    base_delay: float = 0.05
+    max_delay: float = 2.0
+
+    def delays(self, rng=random) -> Iterator[float]:
+        """Sleep before each retry: uniform in [0, min(max_delay, base_delay * 2^n)]."""
+        for n in range(self.attempts - 1):
+            yield rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** n))
+
+
+DEFAULT_POLICY = RetryPolicy(
+    attempts=max(1, int(os.environ.get('TRAINING_DB_RETRY_ATTEMPTS', 6))),
+    base_delay=float(os.environ.get('TRAINING_DB_RETRY_BASE_DELAY', 0.05)),
+    max_delay=float(os.environ.get('TRAINING_DB_RETRY_MAX_DELAY', 2.0)),
+)
+
+_stats = {'retries': 0, 'exhausted': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def retry_stats() -> Dict[str, int]:
+    """Retries and writes given up on in this process so far."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def is_busy(error: BaseException) -> bool:
+    """Whether an exception is SQLite reporting a lock held by another connection."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, 'sqlite_errorcode', None)  # Python 3.11+
+    if code is not None:
+        return code & 0xff in BUSY_ERROR_CODES
+    return any(message in str(error) for message in BUSY_MESSAGES)
+
+
+_created_dirs: Set[str] = set()
+
+
+def connect(path: str, **kwargs) -> sqlite3.Connection:
+    """
+    sqlite3.connect() with the busy timeout and BEGIN IMMEDIATE write transactions
+
+    Creates the database's directory on the first connection to it (nothing is
+    created at import time).
+    """
+    if path not in _created_dirs:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        _created_dirs.add(path)
+    kwargs.setdefault('timeout', BUSY_TIMEOUT)
+    kwargs.setdefault('isolation_level', ISOLATION_LEVEL)
+    return sqlite3.connect(path, **kwargs)
+
+
+def retry_on_busy(func: Optional[Callable] = None, *, policy: Optional[RetryPolicy] = None):
+    """
+    Decorator: rerun a write function while it fails because the database is locked
+
+    The function must be safe to run again after a failed attempt, i.e. do
+    all of its writes in one transaction that the failure rolled back.
+    Other exceptions, and the last busy error once attempts run out, propagate.
+
+    Example:
+        @retry_on_busy
+        def insert_run(...): ...
+
+        @retry_on_busy(policy=RetryPolicy(attempts=3))
+        def acquire_lease(...): ...
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            delays = (policy or DEFAULT_POLICY).delays()
+            while True:
+                try:
+                    return func(*args, **kwargs)
+                except sqlite3.OperationalError as e:
+                    if not is_busy(e):
+                        raise
+                    delay = next(delays, None)
+                    if delay is None:
+                        _count('exhausted')
+                        raise
+                    _count('retries')
+                    time.sleep(delay)
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
@@ -0,0 +1,123 @@
+"""
+W&B Run Resolution Index
+
+Resolves database runs that have no wandb_run_id yet (only a run_name) against
+one listing of the W&B project instead of one display-name search per run.
+
+The index holds (id, name, created_at) of every run in the project, sorted by
+creation time and keyed by display name. It is persisted in the W&B cache with
+a cursor, so each sync cycle only lists runs created since the previous one.
+
+Usage:
+    index = RunIndex(entity, project)
+    index.refresh(api)                      # One paged listing (incremental)
+    entry = index.lookup_name('perindopril_mpo_20251117_0102')
+"""
+
+import bisect
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .wandb_cache import WandbCache, get_cache
+
+
+class RunIndex:
+    """In-memory index of a W&B project's runs by display name and creation time."""
+
+    def __init__(self, entity: str, project: str, cache: Optional[WandbCache] = None):
+        self.entity = entity
+        self.project = project
+        self.cache = cache or get_cache()
+        self.cursor: Optional[str] = None  # created_at of the newest indexed run
+        self._entries: List[Dict[str, Any]] = []  # Sorted by created_at
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_name: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+        stored = self.cache.get(self.path, 'run_index')
+        if stored:
+            self.cursor = stored['cursor']
+            for entry in stored['entries']:
+                self._add(entry)
+
+    @property
+    def path(self) -> str:
+        return f"{self.entity}/{self.project}"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add(self, entry: Dict[str, Any]) -> bool:
+        existing = self._by_id.get(entry['id'])
+        if existing is not None:
+            if existing['name'] == entry['name']:
+                return False
+            # Renamed in W&B: re-key the entry
+            self._by_name[existing['name']].remove(existing)
+            existing['name'] = entry['name']
+            self._by_name.setdefault(entry['name'], []).append(existing)
+            return False
+
+        if not self._entries or entry['created_at'] >= self._entries[-1]['created_at']:
+            self._entries.append(entry)  # Listings arrive in creation order
+        else:
+            keys = [e['created_at'] for e in self._entries]
+            self._entries.insert(bisect.bisect_right(keys, entry['created_at']), entry)
+        self._by_id[entry['id']] = entry
+        self._by_name.setdefault(entry['name'], []).append(entry)
+        return True
+
+    def refresh(self, api, call: Optional[Callable] = None, full: bool = False) -> int:
+        """
+        List runs created since the cursor (all runs on first use) into the index
+
+        Args:
+            api: wandb.Api() (or a compatible fake)
+            call: Wrapper for the API call, e.g. partial(call_with_backoff, limiter=...)
+            full: Re-list the whole project (picks up renames of older runs)
+
+        Returns:
+            Number of runs added
+        """
+        # >= so runs created in the same second as the cursor are not missed;
+        # already indexed IDs are skipped.
+        filters = {'createdAt': {'$gte': self.cursor}} if self.cursor and not full else None
+        listing = lambda: [
+            {
+                'id': run.id,
+                'name': run.name,
+                'created_at': run.created_at if isinstance(run.created_at, str)
+                else run.created_at.isoformat() + 'Z',
+            }
+            for run in api.runs(self.path, filters=filters, order='+created_at')
+        ]
+        runs = call(listing) if call else listing()
+
+        with self._lock:
+            added = sum(self._add(entry) for entry in runs)
+            if self._entries:
+                self.cursor = self._entries[-1]['created_at']
+            self.cache.put(self.path, 'run_index', {
+                'cursor': self.cursor,
+                'entries': self._entries,
+            })
+
+        return added
+
+    def lookup_name(self, run_name: str) -> Optional[Dict[str, Any]]:
+        """Most recently created run with this display name, or None."""
+        matches = self._by_name.get(run_name)
+        return matches[-1] if matches else None
+
+    def lookup_id(self, wandb_run_id: str) -> Optional[Dict[str, Any]]:
+        """Index entry of a W&B run ID, or None."""
+        return self._by_id.get(wandb_run_id)
+
+    def resolve(self, db_runs: List[Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Resolve database runs by run_name in one pass
+
+        Returns:
+            {run_id: index entry (id, name, created_at) or None}
+        """
+        return {db_run['run_id']: self.lookup_name(db_run['run_name']) for db_run in db_runs}
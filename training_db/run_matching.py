@@ -0,0 +1,143 @@
+"""
+Database <-> W&B Run Matching
+
+Matches database runs (run_id "{config}_{instance_id}") to W&B runs whose name
+starts with the same config prefix and that were created close in time.
+
+RunMatcher parses every W&B timestamp once, keeps runs sorted by creation time
+and indexes them by every '_'-separated prefix of their name. A lookup is then
+a dict access plus a bisect into the time window, instead of a scan over all
+W&B runs with a substring test and timestamp parse per pair.
+
+Usage:
+    matcher = RunMatcher(api.runs(f"{entity}/{project}"))
+    wandb_run = matcher.match(db_run['run_id'], db_run['created_at'])
+"""
+
+import bisect
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_WINDOW_SECONDS = 1800  # 30 minutes between DB insert and W&B run creation
+
+
+def parse_timestamp(value) -> float:
+    """ISO string (with or without 'Z') or datetime -> POSIX seconds; naive means UTC."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def config_prefix(run_id: str) -> Optional[str]:
+    """
+    Config part of a database run_id
+
+    Example:
+        config_prefix('perindopril_mpo_bs96_i-0418b390d1e718838')  # 'perindopril_mpo_bs96'
+    """
+    parts = run_id.rsplit('_', 1)
+    return parts[0] if len(parts) == 2 else None
+
+
+def name_prefixes(name: str) -> List[str]:
+    """Every '_'-boundary prefix of a name: 'a_b_c' -> ['a', 'a_b', 'a_b_c']."""
+    prefixes = []
+    end = name.find('_')
+    while end != -1:
+        prefixes.append(name[:end])
+        end = name.find('_', end + 1)
+    prefixes.append(name)
+    return prefixes
+
+
+def _field(run, name: str):
+    return run[name] if isinstance(run, dict) else getattr(run, name)
+
+
+class RunMatcher:
+    """
+    Immutable index of W&B runs by name prefix and creation time
+
+    Runs may be W&B run objects or dicts with 'name' and 'created_at' (such as
+    RunIndex entries).
+    """
+
+    def __init__(self, runs: Iterable[Any]):
+        parsed = sorted(
+            ((parse_timestamp(_field(run, 'created_at')), run) for run in runs),
+            key=lambda pair: pair[0]
+        )
+        self._times = [created for created, _ in parsed]
+        self._runs = [run for _, run in parsed]
+
+        # prefix -> positions into _runs and their creation times, both ascending
+        self._by_prefix: Dict[str, Tuple[List[int], List[float]]] = {}
+        for position, (run, created) in enumerate(zip(self._runs, self._times)):
+            for prefix in name_prefixes(_field(run, 'name')):
+                positions, times = self._by_prefix.setdefault(prefix, ([], []))
+                positions.append(position)
+                times.append(created)
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def candidates(
+        self,
+        prefix: str,
+        created_at=None,
+        window: float = DEFAULT_WINDOW_SECONDS
+    ) -> List[Tuple[Any, Optional[float]]]:
+        """
+        W&B runs whose name starts with `prefix` (at a '_' boundary)
+
+        Args:
+            prefix: Config prefix, e.g. from config_prefix(run_id)
+            created_at: If given, only runs created within `window` seconds of it
+            window: Time window in seconds
+
+        Returns:
+            (run, seconds from created_at) pairs, closest first; without
+            created_at, (run, None) pairs, newest first
+        """
+        positions, times = self._by_prefix.get(prefix, ([], []))
+
+        if created_at is None:
+            return [(self._runs[p], None) for p in reversed(positions)]
+
+        target = parse_timestamp(created_at)
+        lo = bisect.bisect_left(times, target - window)
+        hi = bisect.bisect_right(times, target + window)
+
+        matches = [
+            (self._runs[p], abs(self._times[p] - target))
+            for p in positions[lo:hi]
+        ]
+        matches.sort(key=lambda pair: pair[1])
+        return matches
+
+    def match(
+        self,
+        run_id: str,
+        created_at,
+        window: float = DEFAULT_WINDOW_SECONDS,
+        predicate: Optional[Callable[[Any], bool]] = None
+    ) -> Optional[Any]:
+        """
+        Best W&B run for a database run: same config prefix, closest in time
+
+        Args:
+            run_id: Database run_id ("{config}_{instance_id}")
+            created_at: Database created_at
+            window: Max seconds between the two creation times
+            predicate: Optional extra filter on candidates (e.g. state == 'running')
+        """
+        prefix = config_prefix(run_id)
+        if prefix is None:
+            return None
+
+        for run, _ in self.candidates(prefix, created_at, window):
+            if predicate is None or predicate(run):
+                return run
+        return None
@@ -0,0 +1,517 @@
+"""
+Concurrent W&B Run Sync
+
+Refreshes status, metrics and history of many runs from W&B at once. API calls
+go through a bounded thread pool, a shared token bucket caps the request rate,
+and failed calls are retried with exponential backoff. Database writes from all
+workers are funneled through one BatchedWriter thread that applies them in
+batched transactions, so SQLite only ever sees one writer. Responses of runs
+that have not changed since the last poll are served from the on-disk cache in
+wandb_cache.py.
+
+History is streamed into run_history (see history_store.py): workers hand
+scan_history() pages to the writer in batches of HISTORY_BATCH_STEPS steps as
+they arrive, and only steps after the last stored one are fetched. The writer
+queue is bounded, so memory stays flat however long the runs are.
+
+The W&B API object is passed in: anything with wandb.Api's run()/runs() methods
+works, including the local fake used by test_run_sync.py.
+
+Usage:
+    import wandb
+    from training_db.run_sync import query_stale_runs, sync_runs
+
+    stats = sync_runs(wandb.Api(), query_stale_runs(), entity, project, workers=8, rate=5.0)
+"""
+
+import queue
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .core import get_connection, update_runs_status
+from .history_store import batched, last_stored_step, write_steps
+from .run_index import RunIndex
+from .wandb_cache import WandbCache, get_cache, get_run_snapshot
+from .wandb_client import DEFAULT_PAGE_SIZE
+
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 5.0  # W&B API requests per second, shared by all workers
+BACKOFF_BASE_DELAY = 1.0  # Seconds before the first retry; doubles per attempt
+BACKOFF_MAX_DELAY = 30.0
+HISTORY_BATCH_STEPS = 500  # History steps per writer item (and per transaction)
+HISTORY_PAGE_STEPS = DEFAULT_PAGE_SIZE  # scan_history() rows per W&B request
+
+
+# ============================================================================
+# Rate limiting, backoff and batched writes
+# ============================================================================
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    Allows bursts of up to `capacity` calls, refilled at `rate` tokens per
+    second. A rate of None (or <= 0) disables limiting.
+    """
+
+    def __init__(self, rate: Optional[float], capacity: Optional[float] = None):
+        self.rate = rate if rate and rate > 0 else None
+        self.capacity = capacity or max(1.0, self.rate or 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then take it."""
+        if self.rate is None:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def paced_pages(
+    rows: Iterable[Dict[str, Any]],
+    page_size: int,
+    limiter: Optional[TokenBucket]
+) -> Iterator[Dict[str, Any]]:
+    """
+    Pass scan_history() rows through, taking a token before each page after the first
+
+    scan_history() requests the next page when its iterator runs past the
+    current one, so the token is taken before pulling the first row of every
+    page. The first page is paid for by the call_with_backoff() attempt that
+    started the scan.
+    """
+    rows = iter(rows)
+    count = 0
+    while True:
+        if count and count % page_size == 0 and limiter is not None:
+            limiter.acquire()
+        try:
+            row = next(rows)
+        except StopIteration:
+            return
+        count += 1
+        yield row
+
+
+def call_with_backoff(
+    fn: Callable,
+    *args,
+    limiter: Optional[TokenBucket] = None,
+    retries: int = 4,
+    base_delay: Optional[float] = None,
+    max_delay: Optional[float] = None,
+    **kwargs
+) -> Any:
+    """
+    Call fn(*args, **kwargs), retrying errors with exponential backoff
+
+    Each attempt takes a token from `limiter` first. Delays double from
+    base_delay up to max_delay (defaults: BACKOFF_BASE_DELAY, BACKOFF_MAX_DELAY),
+    with jitter so workers that failed together do not retry together. The last
+    error is re-raised after `retries` retries.
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            if attempt == retries:
+                raise
+            delay = min(
+                max_delay if max_delay is not None else BACKOFF_MAX_DELAY,
+                (base_delay if base_delay is not None else BACKOFF_BASE_DELAY) * 2 ** attempt
+            )
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+class BatchedWriter:
+    """
+    Single writer thread for run status updates and history steps
+
+    Workers call submit(); updates are applied through update_runs_status() in
+    one transaction per batch of up to `batch_size` updates, or whatever has
+    queued after `flush_interval` seconds. History steps from submit_history()
+    are written to run_history as they arrive, one transaction per submission.
+    At most `max_pending` items are queued; submitters block beyond that. Use as
+    a context manager (or call close()) to flush the remainder.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        apply: Callable[[List[Dict[str, Any]]], int] = update_runs_status,
+        max_pending: Optional[int] = None
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.apply = apply
+        self.written = 0
+        self.steps_written = 0
+        self.errors: List[str] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending or 4 * batch_size)
+        self._thread = threading.Thread(target=self._run, name='BatchedWriter', daemon=True)
+        self._thread.start()
+
+    def submit(self, run_id: str, status: str, **fields) -> None:
+        """Queue an update_run_status(run_id, status, **fields) write."""
+        self._queue.put({'run_id': run_id, 'status': status, **fields})
+
+    def submit_history(self, run_id: str, steps: List[Dict[str, Any]], first_step: int = 0) -> None:
+        """Queue history steps of one run for run_history (see history_store.write_steps)."""
+        self._queue.put((run_id, steps, first_step))
+
+    def _write_history(self, run_id: str, steps: List[Dict[str, Any]], first_step: int) -> None:
+        try:
+            with get_connection() as conn:
+                self.steps_written += write_steps(conn, run_id, steps, first_step)
+        except Exception as e:
+            self.errors.append(f"{len(steps)} history steps of {run_id} lost: {e}")
+            print(f"  ERROR writing {len(steps)} history steps of {run_id}: {e}", file=sys.stderr)
+
+    def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        try:
+            self.written += self.apply(batch)
+        except Exception as e:
+            self.errors.append(f"{len(batch)} updates lost: {e}")
+            print(f"  ERROR writing batch of {len(batch)} updates: {e}", file=sys.stderr)
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is self._STOP:
+                self._flush(batch)
+                return
+            if isinstance(item, tuple):
+                self._write_history(*item)
+            elif item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def close(self) -> None:
+        """Flush queued updates and stop the writer thread."""
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ============================================================================
+# W&B -> database mapping
+# ============================================================================
+
+def query_stale_runs(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Query runs that need status/history updates.
+
+    Returns runs that either:
+    1. Are currently running (need latest data)
+    2. Don't have history yet (need backfill)
+    """
+    with get_connection() as conn:
+        query = """
+            SELECT run_id, run_name, wandb_run_id, status, created_at
+            FROM training_runs
+            WHERE
+                status = 'running'  -- Update running runs
+                OR (status = 'not_running' AND NOT EXISTS (  -- Need backfill
+                    SELECT 1 FROM run_history h WHERE h.run_id = training_runs.run_id
+                ))
+            ORDER BY created_at DESC
+        """
+        params = []
+
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+
+def map_wandb_state_to_db_status(wandb_state: str) -> str:
+    """
+    Map W&B run state to database status.
+
+    Simple binary model: either 'running' or 'not_running'.
+    For experiments of indeterminate time that are manually stopped when
+    asymptotes are reached, 'crashed/failed/finished' distinctions are meaningless.
+    """
+    if wandb_state == 'running':
+        return 'running'
+    # Everything else (finished, failed, crashed, killed, preempted) is just 'not_running'
+    return 'not_running'
+
+
+def extract_wandb_data(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a run snapshot (see wandb_cache.snapshot_run) to database fields."""
+    summary = snapshot['summary']
+    runtime_seconds = summary.get("_runtime", 0)
+
+    data = {
+        'wandb_run_id': snapshot['id'],
+        'wandb_url': snapshot['url'],
+        'status': map_wandb_state_to_db_status(snapshot['state']),
+        'duration_seconds': int(runtime_seconds) if runtime_seconds else None,
+    }
+
+    if snapshot['created_at']:
+        data['started_at'] = snapshot['created_at']
+
+    # For non-running runs, use current time as ended_at
+    if snapshot['state'] != 'running':
+        data['ended_at'] = datetime.utcnow().isoformat() + 'Z'
+
+    # Extract final metrics
+    if snapshot['state'] == 'finished' and summary:
+        # Remove W&B internal keys
+        final_metrics = {k: v for k, v in summary.items() if not k.startswith('_')}
+        if final_metrics:
+            data['final_metrics_json'] = final_metrics
+
+    return data
+
+
+def stream_history(
+    api,
+    run_path: str,
+    run_id: str,
+    snapshot: Dict[str, Any],
+    writer: BatchedWriter,
+    call: Callable = call_with_backoff,
+    limiter: Optional[TokenBucket] = None
+) -> int:
+    """
+    Stream the steps a run logged after the last stored one to the writer
+
+    scan_history() is consumed page by page and handed over in batches of
+    HISTORY_BATCH_STEPS; nothing is fetched when the snapshot's last step is
+    already stored. A retried scan resumes after the last submitted step.
+    Every page request after the first takes a token from `limiter` (the
+    first is paid for by the `call` attempt), so long histories are rate
+    limited like any other request.
+
+    Returns:
+        Number of steps submitted
+    """
+    stored = last_stored_step(run_id)
+    next_step = 0 if stored is None else stored + 1
+    if snapshot.get('last_step') is not None and snapshot['last_step'] < next_step:
+        return 0
+
+    run = snapshot.get('_run')
+    if run is None:
+        run = call(api.run, run_path)
+
+    submitted = 0
+
+    def scan():
+        nonlocal next_step, submitted
+        rows = run.scan_history(page_size=HISTORY_PAGE_STEPS, min_step=next_step)
+        for steps in batched(paced_pages(rows, HISTORY_PAGE_STEPS, limiter), HISTORY_BATCH_STEPS):
+            writer.submit_history(run_id, steps, next_step)
+            next_step = steps[-1].get('_step', next_step + len(steps) - 1) + 1
+            submitted += len(steps)
+
+    call(scan)
+    return submitted
+
+
+def fetch_run(
+    api,
+    db_run: Dict[str, Any],
+    entity: str,
+    project: str,
+    limiter: Optional[TokenBucket] = None,
+    cache: Optional[WandbCache] = None,
+    writer: Optional[BatchedWriter] = None
+) -> Dict[str, Any]:
+    """
+    Fetch W&B data for one database run (runs in a worker thread)
+
+    Runs without a wandb_run_id must have been resolved by name first (see
+    sync_runs). Snapshots come from `cache` when the run has not changed since
+    they were stored (see wandb_cache.py). New history steps are streamed to
+    `writer`; without a writer (dry run) history is not fetched.
+
+    Returns:
+        Database fields from extract_wandb_data(), plus history_steps
+    """
+    cache = cache or get_cache()
+    call = partial(call_with_backoff, limiter=limiter)
+
+    run_path = f"{entity}/{project}/{db_run['wandb_run_id']}"
+    snapshot = get_run_snapshot(api, run_path, cache, call=call)
+    data = extract_wandb_data(snapshot)
+
+    # Stream history (time-series metrics)
+    # Fetch for ALL runs (running or not) - training data is always valid and valuable
+    # Runs are manually killed when asymptotes are reached, so there's no "completion" signal
+    if writer is not None:
+        try:
+            data['history_steps'] = stream_history(
+                api, run_path, db_run['run_id'], snapshot, writer, call, limiter
+            )
+        except Exception as e:
+            data['history_error'] = str(e)
+    return data
+
+
+def launch_age_hours(created_at: str) -> float:
+    """Hours since a run was created."""
+    created_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+    return (datetime.now(created_dt.tzinfo) - created_dt).total_seconds() / 3600
+
+
+def is_stale_launch(created_at: str, max_age_hours: float = 2) -> bool:
+    """Whether a run was created long enough ago that it should be visible in W&B."""
+    return launch_age_hours(created_at) > max_age_hours
+
+
+# ============================================================================
+# Sync loop
+# ============================================================================
+
+def sync_runs(
+    api,
+    stale_runs: List[Dict[str, Any]],
+    entity: str,
+    project: str,
+    workers: int = DEFAULT_WORKERS,
+    rate: Optional[float] = DEFAULT_RATE,
+    dry_run: bool = False,
+    verbose: bool = False,
+    mark_stale: bool = True,
+    batch_size: int = 50,
+    cache: Optional[WandbCache] = None
+) -> Dict[str, int]:
+    """
+    Refresh runs from W&B concurrently
+
+    Args:
+        api: wandb.Api() (or a compatible fake)
+        stale_runs: Rows from query_stale_runs()
+        entity: W&B entity
+        project: W&B project
+        workers: Concurrent W&B fetches
+        rate: Max W&B requests per second across all workers (None = unlimited)
+        dry_run: Fetch and report, but write nothing
+        verbose: Print every update
+        mark_stale: Mark runs >2h old that W&B does not know as 'not_running'
+        batch_size: Updates per write transaction
+        cache: W&B response cache (default: get_cache(); WandbCache(':memory:') to bypass)
+
+    Returns:
+        Counts: updated, not_found, marked_stale, errors
+    """
+    limiter = TokenBucket(rate)
+    cache = cache or get_cache()
+    stats = {'updated': 0, 'not_found': 0, 'marked_stale': 0, 'errors': 0}
+
+    # Runs known only by name: resolve all of them against one (incremental)
+    # listing of the project instead of one W&B search per run
+    by_name = [r for r in stale_runs if not r['wandb_run_id'] and r['run_name']]
+    resolved = {}
+    if by_name:
+        index = RunIndex(entity, project, cache)
+        index.refresh(api, call=partial(call_with_backoff, limiter=limiter))
+        resolved = index.resolve(by_name)
+
+    to_fetch = []
+    with BatchedWriter(batch_size=batch_size) as writer:
+        for db_run in stale_runs:
+            run_id = db_run['run_id']
+            if db_run['wandb_run_id']:
+                to_fetch.append(db_run)
+            elif not db_run['run_name']:
+                print(f"{run_id}: ERROR no wandb_run_id or run_name")
+                stats['errors'] += 1
+            elif resolved.get(run_id):
+                to_fetch.append(dict(db_run, wandb_run_id=resolved[run_id]['id']))
+            else:
+                print(f"{run_id}: W&B run not found for name: {db_run['run_name']}")
+                stats['not_found'] += 1
+                if mark_stale and is_stale_launch(db_run['created_at']):
+                    stats['marked_stale'] += 1
+                    age_hours = launch_age_hours(db_run['created_at'])
+                    if dry_run:
+                        print(f"  [DRY RUN] Would mark as 'not_running' (created {age_hours:.1f}h ago, never started)")
+                    else:
+                        writer.submit(run_id, 'not_running')
+                        print(f"  Marked as 'not_running' (created {age_hours:.1f}h ago, never started in W&B)")
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(
+                    fetch_run, api, db_run, entity, project, limiter, cache,
+                    None if dry_run else writer
+                ): db_run
+                for db_run in to_fetch
+            }
+
+            for idx, future in enumerate(as_completed(futures), 1):
+                db_run = futures[future]
+                run_id = db_run['run_id']
+                prefix = f"[{idx}/{len(to_fetch)}] {run_id}"
+
+                try:
+                    data = future.result()
+                except Exception as e:
+                    print(f"{prefix}: ERROR {e}", file=sys.stderr)
+                    stats['errors'] += 1
+                    continue
+
+                history_error = data.pop('history_error', None)
+                if history_error:
+                    print(f"  Warning: Could not fetch history for {run_id}: {history_error}")
+                steps = data.pop('history_steps', 0)
+                status = data.pop('status')
+                stats['updated'] += 1
+
+                if dry_run:
+                    print(f"{prefix}: [DRY RUN] Would update status={status}, "
+                          f"wandb_run_id={data.get('wandb_run_id')}, duration={data.get('duration_seconds')}s")
+                    continue
+
+                writer.submit(run_id, status, **data)
+                if verbose:
+                    print(f"{prefix}: {status}, {data.get('duration_seconds')}s, {steps} new history steps")
+
+    stats['errors'] += len(writer.errors)
+    return stats
@@ -95,6 +95,22 @@ CREATE INDEX IF NOT EXISTS idx_learning_rate ON training_runs(learning_rate);
 CREATE INDEX IF NOT EXISTS idx_num_objectives ON training_runs(num_objectives);
 CREATE INDEX IF NOT EXISTS idx_chain_of_custody ON training_runs(chain_of_custody_id);
 
+-- ============================================================================
+-- NEW TABLE: objectives_catalog
+-- ============================================================================
+-- One row per distinct objective. run_objectives references objectives by
+-- objective_id instead of repeating name/alias/uniprot strings on every row.
+
+CREATE TABLE IF NOT EXISTS objectives_catalog (
+  objective_id INTEGER PRIMARY KEY,
+  objective_name TEXT NOT NULL UNIQUE,  -- e.g., "DRD5_activity", "COMT_activity", "QED"
+  objective_alias TEXT,                 -- e.g., "DRD5_activity_maximize" (how it appears in W&B)
+  uniprot TEXT,                         -- e.g., "P21918" (for protein targets)
+  direction TEXT,                       -- 'maximize' or 'minimize'
+  generation INTEGER NOT NULL DEFAULT 0,  -- Bumped on every change to this objective's rows (cache validation)
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- ============================================================================
 -- NEW TABLE: run_objectives
 -- ============================================================================
@@ -106,13 +122,10 @@ CREATE TABLE IF NOT EXISTS run_objectives (
   run_id TEXT NOT NULL,
 
   -- ========== Objective Identification ==========
-  objective_name TEXT NOT NULL,  -- e.g., "DRD5_activity", "COMT_activity", "QED"
-  objective_alias TEXT,          -- e.g., "DRD5_activity_maximize" (how it appears in W&B)
-  uniprot TEXT,                  -- e.g., "P21918" (for protein targets)
+  objective_id INTEGER NOT NULL,  -- objectives_catalog.objective_id
 
   -- ========== Objective Configuration (from config YAML) ==========
   weight REAL,
-  direction TEXT,  -- 'maximize' or 'minimize'
 
   -- ========== Final Values (from W&B summary) ==========
   -- These come from: objectives/{objective_alias}/{metric_type}
@@ -125,16 +138,59 @@ CREATE TABLE IF NOT EXISTS run_objectives (
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
 
-  FOREIGN KEY (run_id) REFERENCES training_runs(run_id) ON DELETE CASCADE
+  FOREIGN KEY (run_id) REFERENCES training_runs(run_id) ON DELETE CASCADE,
+  FOREIGN KEY (objective_id) REFERENCES objectives_catalog(objective_id)
 );
 
 -- Indexes for objective queries
-CREATE INDEX IF NOT EXISTS idx_obj_run_id ON run_objectives(run_id);
-CREATE INDEX IF NOT EXISTS idx_obj_name ON run_objectives(objective_name);
+-- (run_id lookups use the leading column of idx_obj_run_objective)
+-- (objective_id, raw_mean) serves per-objective filters and index-ordered top-k scans
+CREATE INDEX IF NOT EXISTS idx_obj_objective_raw_mean ON run_objectives(objective_id, raw_mean);
 CREATE INDEX IF NOT EXISTS idx_obj_raw_mean ON run_objectives(raw_mean);
 CREATE INDEX IF NOT EXISTS idx_obj_normalized_mean ON run_objectives(normalized_mean);
-CREATE INDEX IF NOT EXISTS idx_obj_direction ON run_objectives(direction);
-CREATE UNIQUE INDEX IF NOT EXISTS idx_obj_run_name ON run_objectives(run_id, objective_name);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_obj_run_objective ON run_objectives(run_id, objective_id);
+
+-- Bump objectives_catalog.generation whenever an objective's values (or the
+-- status/gradient_method of one of its runs) change, so cached statistics
+-- sketches can tell whether they are still current
+CREATE TRIGGER IF NOT EXISTS bump_objective_generation_insert
+AFTER INSERT ON run_objectives
+BEGIN
+  UPDATE objectives_catalog SET generation = generation + 1
+  WHERE objective_id = NEW.objective_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS bump_objective_generation_update
+AFTER UPDATE ON run_objectives
+BEGIN
+  UPDATE objectives_catalog SET generation = generation + 1
+  WHERE objective_id IN (OLD.objective_id, NEW.objective_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS bump_objective_generation_delete
+AFTER DELETE ON run_objectives
+BEGIN
+  UPDATE objectives_catalog SET generation = generation + 1
+  WHERE objective_id = OLD.objective_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS bump_objective_generation_run
+AFTER UPDATE OF status, gradient_method ON training_runs
+WHEN OLD.status IS NOT NEW.status OR OLD.gradient_method IS NOT NEW.gradient_method
+BEGIN
+  UPDATE objectives_catalog SET generation = generation + 1
+  WHERE objective_id IN (SELECT objective_id FROM run_objectives WHERE run_id = NEW.run_id);
+END;
+
+-- Name-resolved view for ad-hoc SQL (same columns as the pre-catalog table)
+CREATE VIEW IF NOT EXISTS run_objectives_named AS
+SELECT
+  o.id, o.run_id, o.objective_id,
+  c.objective_name, c.objective_alias, c.uniprot, c.direction,
+  o.weight, o.raw_mean, o.normalized_mean, o.raw_std, o.normalized_std,
+  o.created_at, o.updated_at
+FROM run_objectives o
+JOIN objectives_catalog c ON o.objective_id = c.objective_id;
 
 -- ============================================================================
 -- FUTURE TABLE: run_scaffolds (Phase 3)
@@ -170,7 +226,7 @@ CREATE UNIQUE INDEX IF NOT EXISTS idx_scaffold_run_scaffold ON run_scaffolds(run
 -- ============================================================================
 --
 -- To upgrade from v1 to v2:
--- 1. Create run_objectives table (new)
+-- 1. Create objectives_catalog and run_objectives tables (new)
 -- 2. Add new columns to training_runs (ALTER TABLE)
 -- 3. Backfill objectives from existing runs' config_json
 -- 4. Backfill objective values from existing runs' final_metrics_json
@@ -193,8 +249,8 @@ CREATE UNIQUE INDEX IF NOT EXISTS idx_scaffold_run_scaffold ON run_scaffolds(run
 -- ALTER TABLE training_runs ADD COLUMN final_learning_rate REAL;
 -- ALTER TABLE training_runs ADD COLUMN total_training_steps INTEGER;
 --
--- -- Create objectives table
--- [run the CREATE TABLE run_objectives statement above]
+-- -- Create objectives tables
+-- [run the CREATE TABLE objectives_catalog / run_objectives statements above]
 --
 -- -- Backfill will be done by Python script (see migration.py)
 
@@ -206,7 +262,7 @@ CREATE UNIQUE INDEX IF NOT EXISTS idx_scaffold_run_scaffold ON run_scaffolds(run
 /*
 SELECT DISTINCT r.*
 FROM training_runs r
-JOIN run_objectives o ON r.run_id = o.run_id
+JOIN run_objectives_named o ON r.run_id = o.run_id
 WHERE r.gradient_method = 'mgda'
   AND r.status = 'completed'
   AND o.objective_name = 'COMT_activity'
@@ -223,7 +279,7 @@ SELECT
   MAX(o.raw_mean) as best_drd5,
   AVG(r.duration_seconds / 3600.0) as avg_hours
 FROM training_runs r
-JOIN run_objectives o ON r.run_id = o.run_id
+JOIN run_objectives_named o ON r.run_id = o.run_id
 WHERE o.objective_name = 'DRD5_activity'
   AND r.status = 'completed'
   AND r.gradient_method IS NOT NULL
@@ -238,9 +294,9 @@ SELECT r.run_id, r.run_name, r.gradient_method,
        o2.raw_mean as drd5,
        o3.raw_mean as qed
 FROM training_runs r
-JOIN run_objectives o1 ON r.run_id = o1.run_id AND o1.objective_name = 'COMT_activity'
-JOIN run_objectives o2 ON r.run_id = o2.run_id AND o2.objective_name = 'DRD5_activity'
-JOIN run_objectives o3 ON r.run_id = o3.run_id AND o3.objective_name = 'QED'
+JOIN run_objectives_named o1 ON r.run_id = o1.run_id AND o1.objective_name = 'COMT_activity'
+JOIN run_objectives_named o2 ON r.run_id = o2.run_id AND o2.objective_name = 'DRD5_activity'
+JOIN run_objectives_named o3 ON r.run_id = o3.run_id AND o3.objective_name = 'QED'
 WHERE r.status = 'completed'
   AND o1.raw_mean > 0.75
   AND o2.raw_mean > 0.70
@@ -279,7 +335,7 @@ ORDER BY crash_rate_pct DESC;
 SELECT r.run_id, r.run_name, r.gradient_method, r.duration_seconds / 3600.0 as hours,
        AVG(o.raw_mean) as avg_objective_score
 FROM training_runs r
-JOIN run_objectives o ON r.run_id = o.run_id
+JOIN run_objectives_named o ON r.run_id = o.run_id
 WHERE r.status = 'completed'
   AND r.blog_post_url IS NULL
   AND r.duration_seconds > 7200  -- > 2 hours
@@ -0,0 +1,303 @@
+"""
+Read-only HTTP Query Service
+
+Serves the read API (query_runs, get_run, get_run_objectives, get_stats and the
+objective statistics) as JSON over HTTP, so dashboards, notebooks and the blog
+workflow can share one process with warm connections instead of each opening
+the SQLite file. Standard library only; nothing is written.
+
+Every response carries an ETag made of the database's write generation: a
+counter bumped whenever another connection commits (PRAGMA data_version on a
+dedicated connection). A request with a matching If-None-Match gets a bodyless
+304, and identical requests within one generation are answered from an
+in-memory response cache without touching SQLite.
+
+Endpoints (GET):
+    /health
+    /stats
+    /runs?status=running&gradient_method=mgda&created_after=2025-01-06&order_by=created_ms DESC&limit=100
+    /runs/<run_id>
+    /runs/<run_id>/objectives
+    /objectives/<name>/statistics?gradient_method=mgda&status=completed
+    /objectives/<name>/distribution?metric_type=raw_mean&status=completed&bins=10
+    /objectives/<name>/top?k=10&group_by=gradient_method&metric_type=raw_mean
+    /objectives/<name>/compare?status=completed
+
+Usage:
+    mangodb-server --port 8765          # Local only (127.0.0.1) by default
+    curl 'localhost:8765/runs?status=running&limit=5'
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .core import TIME_FILTERS, ConnectionPool, db_path, get_run, get_stats, query_runs, set_connection_pool
+from .objectives import (
+    compare_gradient_methods,
+    get_objective_distribution,
+    get_objective_statistics,
+    get_run_objectives,
+    top_k_runs,
+)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_POOL_SIZE = 8
+RESPONSE_CACHE_SIZE = 256  # Responses kept for the current generation
+
+ORDER_BY_PATTERN = re.compile(r'^\w+(\s+(ASC|DESC))?$', re.IGNORECASE)
+
+
+# ============================================================================
+# Write generation
+# ============================================================================
+
+class WriteGeneration:
+    """
+    Counts commits made to the database by other connections
+
+    PRAGMA data_version on one dedicated connection changes whenever any other
+    connection (in any process) commits, in rollback-journal and WAL mode alike.
+    ETags also carry a per-process nonce, so they stay unique across restarts.
+    """
+
+    def __init__(self, path: str):
+        uri = Path(path).resolve().as_uri() + '?mode=ro'
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._data_version: Optional[int] = None
+        self._generation = 0
+        self.nonce = uuid.uuid4().hex[:8]
+
+    def current(self) -> int:
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._data_version is not None and data_version != self._data_version:
+                self._generation += 1
+            self._data_version = data_version
+            return self._generation
+
+    def etag(self, generation: int) -> str:
+        return f'"{self.nonce}-{generation}"'
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ============================================================================
+# Routes
+# ============================================================================
+
+def _param(params: Dict[str, List[str]], name: str, default: Any = None) -> Any:
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _int_param(params: Dict[str, List[str]], name: str, default: int) -> int:
+    value = _param(params, name)
+    try:
+        return default if value is None else int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}")
+
+
+def _flag(value: str) -> bool:
+    return value.lower() in ('1', 'true', 'yes')
+
+
+RUN_FILTERS: Dict[str, Callable[[str], Any]] = {
+    'status': str,
+    'host': str,
+    'gradient_method': str,
+    'min_duration_hours': float,
+    **{name: str for name in TIME_FILTERS},
+    'has_blog_post': _flag,
+    'has_crash_analysis': _flag,
+}
+
+
+def _runs(params):
+    filters = {name: convert(_param(params, name)) for name, convert in RUN_FILTERS.items() if name in params}
+    order_by = _param(params, 'order_by', 'created_ms DESC')
+    if not ORDER_BY_PATTERN.match(order_by):
+        raise ValueError(f"order_by must be '<column> [ASC|DESC]', got {order_by!r}")
+    return query_runs(filters, order_by, _int_param(params, 'limit', 100))
+
+
+def _distribution(params, name):
+    return get_objective_distribution(
+        name,
+        metric_type=_param(params, 'metric_type', 'raw_mean'),
+        status=_param(params, 'status', 'completed'),
+        bins=_int_param(params, 'bins', 10),
+    )
+
+
+def _top(params, name):
+    return top_k_runs(
+        name,
+        k=_int_param(params, 'k', 10),
+        group_by=_param(params, 'group_by', 'gradient_method') or None,
+        metric_type=_param(params, 'metric_type', 'raw_mean'),
+        status=_param(params, 'status'),
+    )
+
+
+# (path pattern, handler(params, *path groups)); a None result is a 404
+ROUTES: List[Tuple[re.Pattern, Callable[..., Any]]] = [(re.compile(pattern), handler) for pattern, handler in [
+    (r'/health', lambda params: {'status': 'ok'}),
+    (r'/stats', lambda params: get_stats()),
+    (r'/runs', _runs),
+    (r'/runs/([^/]+)', lambda params, run_id: get_run(run_id)),
+    (r'/runs/([^/]+)/objectives', lambda params, run_id: get_run_objectives(run_id)),
+    (r'/objectives/([^/]+)/statistics', lambda params, name: get_objective_statistics(
+        name, _param(params, 'gradient_method'), _param(params, 'status', 'completed')
+    )),
+    (r'/objectives/([^/]+)/distribution', _distribution),
+    (r'/objectives/([^/]+)/top', _top),
+    (r'/objectives/([^/]+)/compare', lambda params, name: compare_gradient_methods(
+        name, _param(params, 'status', 'completed')
+    )),
+]]
+
+
+def route(target: str) -> Tuple[int, Any]:
+    """
+    Answer one request target (path and query string)
+
+    Returns:
+        (HTTP status, JSON-serializable body)
+    """
+    url = urlsplit(target)
+    params = parse_qs(url.query)
+    for pattern, handler in ROUTES:
+        match = pattern.fullmatch(url.path.rstrip('/') or '/')
+        if match is None:
+            continue
+        try:
+            result = handler(params, *(unquote(group) for group in match.groups()))
+        except (ValueError, sqlite3.OperationalError) as e:
+            return 400, {'error': str(e)}
+        if result is None:
+            return 404, {'error': f"Not found: {url.path}"}
+        return 200, result
+    return 404, {'error': f"Unknown endpoint: {url.path}"}
+
+
+# ============================================================================
+# Server
+# ============================================================================
+
+class QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+    wbufsize = -1  # Headers and body in one send; split writes stall on delayed ACKs
+    server: 'QueryServer'
+
+    def do_GET(self):
+        generation = self.server.generation.current()
+        etag = self.server.generation.etag(generation)
+
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match and (if_none_match.strip() == '*' or etag in (
+            tag.strip() for tag in if_none_match.split(',')
+        )):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        status, body = self.server.respond(self.path, generation)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 200:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')  # Cache, but revalidate
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class QueryServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server over a read-only connection pool
+
+    Installs its pool with set_connection_pool(), so run it in its own process
+    (mangodb-server); writes from the same process would fail.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = (DEFAULT_HOST, DEFAULT_PORT),
+        pool_size: int = DEFAULT_POOL_SIZE,
+        path: Optional[str] = None,
+        verbose: bool = False
+    ):
+        super().__init__(address, QueryHandler)
+        self.verbose = verbose
+        self.pool = ConnectionPool(pool_size, path, read_only=True)
+        self.generation = WriteGeneration(path or db_path())
+        self._responses: 'OrderedDict[str, Tuple[int, int, bytes]]' = OrderedDict()
+        self._responses_lock = threading.Lock()
+        set_connection_pool(self.pool)
+
+    def respond(self, target: str, generation: int) -> Tuple[int, bytes]:
+        """Encoded response for a request target, from the cache when this generation has it."""
+        with self._responses_lock:
+            cached = self._responses.get(target)
+            if cached is not None and cached[0] == generation:
+                self._responses.move_to_end(target)
+                return cached[1], cached[2]
+
+        status, result = route(target)
+        body = json.dumps(result, default=str).encode()
+        if status == 200:
+            with self._responses_lock:
+                self._responses[target] = (generation, status, body)
+                self._responses.move_to_end(target)
+                while len(self._responses) > RESPONSE_CACHE_SIZE:
+                    self._responses.popitem(last=False)
+        return status, body
+
+    def server_close(self):
+        super().server_close()
+        set_connection_pool(None)
+        self.pool.close()
+        self.generation.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read-only HTTP query service for the training database')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Address to bind (default: localhost only)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE, help='Database connections')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    server = QueryServer((args.host, args.port), args.pool_size, verbose=args.verbose)
+    print(f"Serving {db_path()} read-only on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
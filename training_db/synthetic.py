@@ -0,0 +1,178 @@
+"""
+Synthetic Training Databases
+
+Fills a database with realistic-looking runs for benchmarks and load tests:
+configs shaped like the training YAML that insert_run() receives, per-run
+objective results in run_objectives and, optionally, per-step history in
+run_history. Rows go in with batched executemany() through the same INSERT
+builders the API uses, so a 100k-run database takes seconds rather than the
+minutes one insert_run() call per run would.
+
+Generation is deterministic for a given seed, and repeated calls extend the
+database (run numbering continues from `first`).
+
+Usage:
+    from training_db.synthetic import generate_database
+
+    generate_database(10_000, objectives_per_run=3, history_steps=100)
+"""
+
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from .catalog import get_catalog
+from .core import _run_insert, db_path, get_connection
+from .migrations import history_step_rows
+
+GRADIENT_METHODS = ['mgda', 'pcgrad', 'imtlg', 'cagrad', 'linear']
+OBJECTIVE_NAMES = [
+    'COMT_activity', 'DRD5_activity', 'KCNH2_activity', 'CYP3A4_activity',
+    'HTR2A_activity', 'QED', 'SA_score', 'logP', 'TPSA', 'MW',
+]
+MINIMIZED = {'KCNH2_activity', 'CYP3A4_activity', 'SA_score'}
+STATUSES = [('completed', 0.6), ('running', 0.15), ('crashed', 0.15), ('not_running', 0.1)]
+HOSTS = [f"ip-172-31-{n}-{n * 7 % 255}" for n in range(16)]
+SMILES_FRAGMENTS = ['c1ccccc1', 'C(=O)N', 'CC(C)', 'N1CCNCC1', 'c1ccncc1', 'OC', 'C#N', 'S(=O)(=O)', 'F', 'Cl']
+
+DEFAULT_START = datetime(2025, 1, 1)
+
+
+def synthetic_config(
+    rng: random.Random,
+    objectives: Sequence[str],
+    config_bytes: int = 2048
+) -> Dict[str, Any]:
+    """
+    A training config dict like the YAML insert_run() is given
+
+    Scaffold SMILES are added until the JSON encoding is about config_bytes
+    long (real configs range from ~1 KB to tens of KB with large scaffold sets).
+    """
+    config = {
+        'training': {
+            'batch_size': rng.choice([8, 16, 32, 64]),
+            'learning_rate': rng.choice([1e-6, 5e-6, 1e-5, 5e-5]),
+            'num_processes': rng.choice([1, 4, 8]),
+            'gradient_accumulation_steps': rng.choice([1, 2, 4]),
+            'max_steps': rng.choice([1000, 2000, 5000]),
+            'max_grad_norm': 1.0,
+            'mixed_precision': 'bf16',
+            'gradient_checkpointing': rng.random() < 0.5,
+            'bf16': True,
+        },
+        'reward': {
+            'gradient_method': rng.choice(GRADIENT_METHODS),
+            'beta': rng.choice([0.0, 0.01, 0.04, 0.1]),
+            'enable_moving_targets': rng.random() < 0.3,
+        },
+        'grouping': {'return_groups': rng.random() < 0.5, 'n_clusters': rng.choice([4, 8, 16])},
+        'objectives': [
+            {
+                'name': name,
+                'alias': f"{name}_{'minimize' if name in MINIMIZED else 'maximize'}",
+                'direction': 'minimize' if name in MINIMIZED else 'maximize',
+                'weight': rng.choice([0.5, 1.0, 2.0]),
+            }
+            for name in objectives
+        ],
+        'generation': {'scaffolds': []},
+    }
+
+    size = len(json.dumps(config))
+    scaffolds = config['generation']['scaffolds']
+    while size < config_bytes:
+        smiles = ''.join(rng.choice(SMILES_FRAGMENTS) for _ in range(8))
+        scaffolds.append(smiles)
+        size += len(smiles) + 4
+    return config
+
+
+def synthetic_history(rng: random.Random, objectives: Sequence[str], steps: int) -> List[Dict[str, Any]]:
+    """Per-step history rows (loss plus objectives/<name>/raw_mean), like a GRPO run logs."""
+    rates = {name: rng.uniform(0.002, 0.02) for name in objectives}
+    return [
+        dict(
+            {'_step': step, 'loss': 1.0 / (step + 1) ** 0.5, 'reward/mean': rng.random()},
+            **{f"objectives/{name}/raw_mean": 1 - (1 - rate) ** step + rng.gauss(0, 0.01)
+               for name, rate in rates.items()}
+        )
+        for step in range(steps)
+    ]
+
+
+def generate_database(
+    runs: int,
+    objectives_per_run: int = 3,
+    history_steps: int = 0,
+    config_bytes: int = 2048,
+    seed: int = 0,
+    first: int = 0,
+    batch_size: int = 1000,
+    start: Optional[datetime] = None
+) -> Dict[str, int]:
+    """
+    Insert synthetic runs into the training database
+
+    Args:
+        runs: Runs to insert
+        objectives_per_run: Objectives per run (drawn from OBJECTIVE_NAMES)
+        history_steps: run_history steps per run (0: none)
+        config_bytes: Approximate config_json size per run
+        seed: Random seed (combined with `first`, so extending is deterministic too)
+        first: Number of the first run, to extend an existing synthetic database
+        batch_size: Runs per write transaction
+        start: created_at of run 0 (runs are 7 minutes apart)
+
+    Returns:
+        Dict with runs, objectives and history_steps written
+    """
+    rng = random.Random(seed * 1_000_003 + first)
+    start = start or DEFAULT_START
+    catalog = get_catalog(db_path())
+    written = {'runs': 0, 'objectives': 0, 'history_steps': 0}
+
+    for batch_start in range(first, first + runs, batch_size):
+        run_rows, objective_rows, history_rows = [], [], []
+        for n in range(batch_start, min(batch_start + batch_size, first + runs)):
+            objectives = rng.sample(OBJECTIVE_NAMES, min(objectives_per_run, len(OBJECTIVE_NAMES)))
+            config = synthetic_config(rng, objectives, config_bytes)
+            run_id = f"syn_{n:07d}_i-{n:017x}"
+            status = rng.choices([s for s, _ in STATUSES], [w for _, w in STATUSES])[0]
+            sql, params = _run_insert(
+                run_id, f"syn{n:07d}", config,
+                run_name=f"syn_{n:07d}", host=rng.choice(HOSTS), instance_id=f"i-{n:017x}",
+                created_at=(start + timedelta(minutes=7 * n)).isoformat() + 'Z', status=status,
+            )
+            run_rows.append(params)
+
+            for objective in config['objectives']:
+                mean, std = rng.random(), rng.uniform(0.01, 0.2)
+                objective_rows.append((
+                    run_id, objective['name'], objective['alias'], objective['direction'], objective['weight'],
+                    mean, rng.gauss(0, 1), std, std * 5,
+                ))
+            if history_steps:
+                history_rows.extend(history_step_rows(run_id, synthetic_history(rng, objectives, history_steps)))
+
+        with get_connection() as conn:
+            conn.executemany(sql, run_rows)
+            ids = {}
+            for run_id, name, alias, direction, *_ in objective_rows:
+                if name not in ids:
+                    ids[name] = catalog.intern(conn, name, alias, direction=direction)
+            conn.executemany("""
+                INSERT INTO run_objectives (
+                    run_id, objective_id, weight, raw_mean, normalized_mean, raw_std, normalized_std
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [(row[0], ids[row[1]]) + row[4:] for row in objective_rows])
+            conn.executemany(
+                "INSERT INTO run_history (run_id, step, metrics_json) VALUES (?, ?, ?)", history_rows
+            )
+
+        written['runs'] += len(run_rows)
+        written['objectives'] += len(objective_rows)
+        written['history_steps'] += len(history_rows)
+
+    return written
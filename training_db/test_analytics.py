@@ -0,0 +1,136 @@
+"""
+Test script for the analytics backends
+
+Checks the SQLite backend's aggregates on a throwaway database, and that the
+DuckDB backend returns the same answers over the SQLite file and over a
+Parquet snapshot.
+
+The DuckDB part needs the analytics extra (pip install mangodb[analytics]) and
+DuckDB's sqlite extension; it is skipped when duckdb is not installed, unless
+TRAINING_DB_TEST_DUCKDB=1 is set, which makes it required.
+"""
+
+import os
+import sys
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp()
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'test_analytics.db')
+sys.path.insert(0, '/home/ubuntu/mangodb')
+
+from training_db import (
+    compare_gradient_methods, get_objective_statistics, init_db, insert_objective,
+    insert_run, update_objective_metric,
+)
+from training_db.analytics import AnalyticsBackend, SQLiteAnalytics, backend_from_spec, get_analytics
+from training_db.core import get_connection
+from training_db.history_store import history_curve, summarize_history, write_steps
+
+print("=" * 80)
+print("TESTING ANALYTICS BACKENDS")
+print("=" * 80)
+
+init_db()
+for n, (method, value) in enumerate([('mgda', 0.9), ('mgda', 0.7), ('pcgrad', 0.6)]):
+    run_id = f"an_{n}_i-{n:04x}"
+    insert_run(run_id, None, {'reward': {'gradient_method': method}}, status='completed')
+    insert_objective(run_id, 'COMT_activity', weight=1.0, direction='maximize')
+    update_objective_metric(run_id, 'COMT_activity', 'raw_mean', value)
+    with get_connection() as conn:
+        write_steps(conn, run_id, [
+            {'loss': 1.0 / (step + 1) + n, 'reward/mean': step, 'note': 'text', 'done': step == 199}
+            for step in range(200)
+        ])
+
+runs = ["an_0_i-0000", "an_1_i-0001", "an_2_i-0002"]
+
+
+def check(backend):
+    methods = backend.compare_gradient_methods('COMT_activity')
+    assert [(m['gradient_method'], m['count']) for m in methods] == [('mgda', 2), ('pcgrad', 1)], methods
+    assert abs(methods[0]['avg'] - 0.8) < 1e-9 and methods[0]['best'] == 0.9
+
+    stats = backend.objective_statistics('COMT_activity')
+    assert stats['count'] == 3 and abs(stats['std'] - 0.15275) < 1e-4 and stats['median'] == 0.7, stats
+    assert backend.objective_statistics('COMT_activity', gradient_method='pcgrad')['count'] == 1
+
+    summary = backend.history_summary(['loss', 'reward/mean', 'note', 'done'], run_ids=runs[:2])
+    assert set(summary) == set(runs[:2])
+    loss = summary["an_1_i-0001"]['loss']
+    assert loss['count'] == 200 and loss['max'] == 2.0 and abs(loss['last'] - 1.005) < 1e-9, loss
+    assert summary["an_0_i-0000"]['reward/mean']['last'] == 199
+    assert 'note' not in summary["an_0_i-0000"] and 'done' not in summary["an_0_i-0000"]
+
+    curve = backend.history_curve('reward/mean', bucket_steps=50)
+    assert [point['step'] for point in curve] == [0, 50, 100, 150]
+    assert curve[1] == {'step': 50, 'runs': 3, 'mean': 74.5, 'min': 50, 'max': 99}, curve[1]
+    assert backend.history_summary(['loss'], run_ids=[]) == {}
+
+
+# Test 1: SQLite backend
+print("\n1. SQLite backend...")
+check(SQLiteAnalytics())
+check(SQLiteAnalytics(os.environ['TRAINING_DB_PATH']))
+print("   ✓ Comparisons, statistics and history aggregates")
+
+# Test 2: Public API goes through the process-wide backend
+print("\n2. Public API...")
+assert get_analytics().name == 'sqlite'
+assert compare_gradient_methods('COMT_activity')[0]['gradient_method'] == 'mgda'
+assert get_objective_statistics('COMT_activity')['count'] == 3
+assert summarize_history(['loss'])["an_2_i-0002"]['loss']['min'] == 2.005
+assert history_curve('loss', runs[:1], bucket_steps=100)[0]['runs'] == 1
+try:
+    backend_from_spec('postgres')
+    raise AssertionError("unknown backend accepted")
+except ValueError:
+    pass
+
+
+class Incomplete(AnalyticsBackend):
+    def compare_gradient_methods(self, objective_name, status='completed'):
+        return []
+
+
+try:
+    Incomplete()
+    raise AssertionError("backend without all queries instantiated")
+except TypeError:
+    pass
+print("   ✓ objectives and history_store delegate to the configured backend")
+
+# Test 3: DuckDB backend
+print("\n3. DuckDB backend...")
+try:
+    import duckdb  # noqa: F401
+except ImportError:
+    if os.environ.get('TRAINING_DB_TEST_DUCKDB') == '1':
+        raise
+    duckdb = None
+    print("   - duckdb not installed, skipped (set TRAINING_DB_TEST_DUCKDB=1 to require it)")
+
+if duckdb is not None:
+    from training_db.analytics import DuckDBAnalytics, snapshot_parquet
+
+    live = backend_from_spec('duckdb')  # Attaches the SQLite file TRAINING_DB_PATH names
+    assert isinstance(live, DuckDBAnalytics) and live.path == os.environ['TRAINING_DB_PATH']
+    check(live)
+    snapshot = os.path.join(TEST_DIR, 'snapshot')
+    written = snapshot_parquet(snapshot)
+    assert written['history_values.parquet'] == 3 * 200 * 2, written
+    assert written['run_objectives.parquet'] == 3, written
+    frozen = backend_from_spec(f'duckdb:{snapshot}')
+    check(frozen)
+
+    # The attached file is read live; the snapshot keeps what it copied
+    with get_connection() as conn:
+        write_steps(conn, "an_2_i-0002", [{'loss': 0.5}], first_step=200)
+    assert live.history_summary(['loss'], run_ids=runs[2:])["an_2_i-0002"]['loss']['count'] == 201
+    assert frozen.history_summary(['loss'], run_ids=runs[2:])["an_2_i-0002"]['loss']['count'] == 200
+    live.close()
+    frozen.close()
+    print("   ✓ Same answers over the attached SQLite file and a Parquet snapshot")
+
+print("\n" + "=" * 80)
+print("ALL TESTS PASSED ✓")
+print("=" * 80)
@@ -0,0 +1,120 @@
+"""
+Test script for the parallel JSON backfill
+
+Checks that ProcessPoolMapper yields the same (rows, results) pairs in the
+same order as map_serial, and that hyperparameter and objectives backfills run
+by worker processes leave a database identical to the serial path.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp()
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'test_backfill.db')
+sys.path.insert(0, '/home/ubuntu/mangodb')
+
+from training_db import init_db, insert_run
+from training_db.backfill import HYPERPARAMETERS, ProcessPoolMapper, extract_run_hyperparameters, run_parallel_backfill
+from training_db.core import extract_hyperparameters, get_connection
+from training_db.migrations import OBJECTIVES_BACKFILL, map_serial
+
+RUNS = 200
+CHUNK_SIZE = 7  # Not a divisor of RUNS: the last chunk is short
+METHODS = ('mgda', 'pcgrad', 'cagrad', 'aligned_mtl')
+
+
+def config(n):
+    return {
+        'training': {'batch_size': 4 << (n % 4), 'learning_rate': 1e-5 * (1 + n % 5), 'max_steps': 1000 + n,
+                     'bf16': n % 2 == 0, 'gradient_checkpointing': n % 3 == 0},
+        'reward': {'gradient_method': METHODS[n % 4], 'beta': 0.1 * (n % 3)},
+        'grouping': {'n_clusters': n % 6},
+        'objectives': [
+            {'name': 'COMT_activity', 'alias': 'COMT_activity_maximize', 'weight': 1.0},
+            {'name': 'SA_score', 'alias': 'SA_score_minimize', 'weight': 0.5},
+        ],
+    }
+
+
+def table(path, name, columns='*'):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT {columns} FROM {name} ORDER BY rowid").fetchall()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    print("=" * 80)
+    print("TESTING PARALLEL BACKFILL")
+    print("=" * 80)
+
+    init_db()
+    for n in range(RUNS):
+        insert_run(f"bf_{n:03d}_i-{n:04x}", None, config(n), status='completed')
+    with get_connection() as conn:
+        conn.execute("UPDATE training_runs SET config_json = 'not json' WHERE run_id = 'bf_013_i-000d'")
+        conn.execute("UPDATE training_runs SET config_json = NULL WHERE run_id = 'bf_014_i-000e'")
+        conn.execute("""
+            UPDATE training_runs SET final_metrics_json = ?
+        """, (json.dumps({'objectives/COMT_activity_maximize/raw_mean': 0.5}),))
+        conn.execute("DELETE FROM run_objectives")
+    expected_runs = table(os.environ['TRAINING_DB_PATH'], 'training_runs')
+
+    # Test 1: Mapper
+    print("\n1. ProcessPoolMapper...")
+    with get_connection() as conn:
+        chunks = [
+            conn.execute("SELECT rowid, run_id, config_json FROM training_runs WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                         (start, CHUNK_SIZE)).fetchall()
+            for start in range(0, RUNS, CHUNK_SIZE)
+        ]
+    chunks = [[tuple(row) for row in chunk] for chunk in chunks]
+    serial = list(map_serial(extract_run_hyperparameters, chunks))
+    for workers, max_in_flight in ((4, None), (3, 1), (1, 2)):
+        parallel = list(ProcessPoolMapper(workers, max_in_flight)(extract_run_hyperparameters, iter(chunks)))
+        assert parallel == serial, (workers, max_in_flight)
+    results = [result for _, chunk_results in serial for result in chunk_results]
+    assert len(results) == RUNS and results.count(None) == 2  # Invalid and missing config_json
+    assert results[20] == ('bf_020_i-0014', extract_hyperparameters(config(20)))
+    assert list(ProcessPoolMapper(2)(extract_run_hyperparameters, iter([]))) == []
+    print(f"   ✓ {len(chunks)} chunks: same results, same order as map_serial")
+
+    # Test 2: Hyperparameter backfill
+    print("\n2. Hyperparameters, serial vs 4 workers...")
+    columns = list(extract_hyperparameters({}))
+    with get_connection() as conn:
+        conn.execute(f"UPDATE training_runs SET {', '.join(f'{column} = NULL' for column in columns)}")
+    serial_path = os.path.join(TEST_DIR, 'serial.db')
+    parallel_path = os.path.join(TEST_DIR, 'parallel.db')
+    shutil.copy(os.environ['TRAINING_DB_PATH'], serial_path)
+    shutil.copy(os.environ['TRAINING_DB_PATH'], parallel_path)
+
+    assert run_parallel_backfill(HYPERPARAMETERS, 1, CHUNK_SIZE, serial_path, verbose=False) == RUNS
+    assert run_parallel_backfill(HYPERPARAMETERS, 4, CHUNK_SIZE, parallel_path, verbose=False) == RUNS
+    assert table(parallel_path, 'training_runs') == table(serial_path, 'training_runs')
+    restored = {row[0]: row for row in table(serial_path, 'training_runs')}
+    for row in expected_runs:
+        if row[0] not in ('bf_013_i-000d', 'bf_014_i-000e'):
+            assert restored[row[0]] == row, row[0]  # Same columns insert_run() wrote
+    print(f"   ✓ {RUNS} runs re-extracted identically; matches what insert_run() wrote")
+
+    # Test 3: Objectives backfill
+    print("\n3. Objectives, serial vs 4 workers...")
+    assert run_parallel_backfill(OBJECTIVES_BACKFILL, 1, CHUNK_SIZE, serial_path, verbose=False) == RUNS
+    assert run_parallel_backfill(OBJECTIVES_BACKFILL, 4, CHUNK_SIZE, parallel_path, verbose=False) == RUNS
+    for name, columns in (
+        ('objectives_catalog', 'objective_id, objective_name, objective_alias, uniprot, direction'),
+        ('run_objectives', 'run_id, objective_id, weight, raw_mean, normalized_mean, raw_std, normalized_std'),
+    ):  # Leaves out the write times
+        assert table(parallel_path, name, columns) == table(serial_path, name, columns), name
+    assert len(table(serial_path, 'run_objectives')) == 2 * (RUNS - 2)
+    print("   ✓ Catalog and run_objectives identical")
+
+    print("\n" + "=" * 80)
+    print("ALL TESTS PASSED ✓")
+    print("=" * 80)
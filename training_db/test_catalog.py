@@ -0,0 +1,100 @@
+"""
+Test script for the objectives catalog
+
+Checks W&B alias and metric-key parsing, that interning is idempotent and only
+fills in missing attributes, and that clear() drops entries cached from a
+transaction that was rolled back (journal replay relies on this).
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp()
+sys.path.insert(0, '/home/ubuntu/mangodb')
+
+from training_db.catalog import ObjectiveCatalog, get_catalog, parse_metric_key, parse_objective_alias
+from training_db.migrations import migrate
+
+DB_PATH = os.path.join(TEST_DIR, 'test_catalog.db')
+
+print("=" * 80)
+print("TESTING OBJECTIVES CATALOG")
+print("=" * 80)
+
+# Test 1: Alias and key parsing
+print("\n1. Parsing...")
+assert parse_objective_alias('COMT_activity_maximize') == ('COMT_activity', 'maximize')
+assert parse_objective_alias('SA_score_minimize') == ('SA_score', 'minimize')
+assert parse_objective_alias('QED') == ('QED', None)
+assert parse_objective_alias('maximize') == ('maximize', None)  # No '_' separator
+assert parse_objective_alias('_minimize') == ('', 'minimize')
+assert parse_objective_alias('x_maximize_minimize') == ('x_maximize', 'minimize')  # Last suffix only
+assert parse_objective_alias('COMT_activity_Maximize') == ('COMT_activity_Maximize', None)
+assert parse_objective_alias('') == ('', None)
+
+assert parse_metric_key('objectives/COMT_activity_maximize/raw_mean') == (
+    'COMT_activity', 'COMT_activity_maximize', 'maximize', 'raw_mean'
+)
+assert parse_metric_key('objectives/QED/normalized_std') == ('QED', 'QED', None, 'normalized_std')
+for key in ('objectives/QED/median', 'objective/QED/raw_mean', 'objectives/QED',
+            'objectives/QED/raw_mean/extra', 'train/loss'):
+    assert parse_metric_key(key) is None, key
+print("   ✓ Direction suffixes split off; non-objective keys rejected")
+
+# Test 2: Interning
+print("\n2. Interning...")
+migrate(DB_PATH, verbose=False)
+conn = sqlite3.connect(DB_PATH)
+catalog = ObjectiveCatalog()
+
+comt = catalog.intern(conn, 'COMT_activity')
+assert catalog.intern(conn, 'COMT_activity') == comt
+assert catalog.intern(conn, 'COMT_activity', 'COMT_activity_maximize', 'P21964') == comt
+assert catalog.get_entry(conn, comt) == {
+    'objective_id': comt, 'objective_name': 'COMT_activity', 'objective_alias': 'COMT_activity_maximize',
+    'uniprot': 'P21964', 'direction': 'maximize',  # Parsed from the alias
+}
+# Recorded attributes are never overwritten
+assert catalog.intern(conn, 'COMT_activity', 'COMT_activity_minimize', 'Q00000', 'minimize') == comt
+assert catalog.get_entry(conn, comt)['direction'] == 'maximize'
+assert catalog.get_entry(conn, comt)['uniprot'] == 'P21964'
+
+qed = catalog.intern(conn, 'QED')
+assert qed != comt
+conn.commit()
+assert conn.execute("SELECT COUNT(*) FROM objectives_catalog").fetchone()[0] == 2
+
+entry = catalog.get_entry(conn, comt)
+entry['direction'] = 'minimize'
+assert catalog.get_entry(conn, comt)['direction'] == 'maximize'  # Copies, not the cache
+
+fresh = ObjectiveCatalog()  # Another process: resolves from the table
+assert fresh.get_id(conn, 'COMT_activity') == comt
+assert fresh.get_entry(conn, qed)['objective_name'] == 'QED'
+assert fresh.get_id(conn, 'missing') is None and fresh.get_entry(conn, 999) is None
+assert get_catalog(DB_PATH) is get_catalog(DB_PATH)
+assert get_catalog(DB_PATH) is not get_catalog(os.path.join(TEST_DIR, 'other.db'))
+print("   ✓ One ID per name; missing attributes filled, recorded ones kept")
+
+# Test 3: Rollback
+print("\n3. clear() after rollback...")
+drd5 = catalog.intern(conn, 'DRD5_activity', 'DRD5_activity_maximize')
+assert catalog.get_id(conn, 'DRD5_activity') == drd5
+conn.rollback()
+assert conn.execute("SELECT 1 FROM objectives_catalog WHERE objective_name = 'DRD5_activity'").fetchone() is None
+assert catalog.get_id(conn, 'DRD5_activity') == drd5  # Stale: the cache outlived the transaction
+
+catalog.clear()
+assert catalog.get_id(conn, 'DRD5_activity') is None
+assert catalog.get_id(conn, 'COMT_activity') == comt  # Committed entries reload
+drd5 = catalog.intern(conn, 'DRD5_activity', 'DRD5_activity_maximize')
+conn.commit()
+assert conn.execute("SELECT objective_id FROM objectives_catalog WHERE objective_name = 'DRD5_activity'").fetchone()[0] == drd5
+conn.close()
+print("   ✓ Rolled-back entries gone after clear(); committed ones reload from the table")
+
+print("\n" + "=" * 80)
+print("ALL TESTS PASSED ✓")
+print("=" * 80)
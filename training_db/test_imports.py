@@ -0,0 +1,64 @@
+"""
+Test script for import-time behaviour
+
+Imports training_db in a fresh interpreter and checks that it loads only the
+SQLite API: no yaml, wandb or asyncio, and no directories created. Then
+checks that the lazily imported names still resolve.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp()
+DB_DIR = os.path.join(TEST_DIR, 'not_created_at_import')
+os.environ['TRAINING_DB_PATH'] = os.path.join(DB_DIR, 'test_imports.db')
+sys.path.insert(0, '/home/ubuntu/mangodb')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fresh(code):
+    """Run code in a new interpreter; returns its stdout."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    return subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True).stdout
+
+
+print("=" * 80)
+print("TESTING IMPORTS")
+print("=" * 80)
+
+# Test 1: Plain import stays light
+print("\n1. import training_db...")
+loaded = fresh("import sys, training_db; print(' '.join(sys.modules))").split()
+for heavy in ('yaml', 'wandb', 'asyncio', 'training_db.events', 'training_db.wandb_sync'):
+    assert heavy not in loaded, heavy
+assert not os.path.exists(DB_DIR)
+print("   ✓ No yaml, wandb or asyncio; nothing created on disk")
+
+# Test 2: Lazy names
+print("\n2. Lazy names...")
+import training_db
+from training_db import changes_since, init_db, parse_config_objectives
+
+assert 'changes_since' in dir(training_db) and 'sync_run_complete' in training_db.__all__
+assert training_db.watch_runs.__module__ == 'training_db.events'
+assert parse_config_objectives('/nonexistent/config.yaml') == []
+try:
+    training_db.not_a_function
+    raise AssertionError("unknown attribute resolved")
+except AttributeError:
+    pass
+print("   ✓ Event log and W&B helpers import on first use")
+
+# Test 3: First connection creates the directory
+print("\n3. First connection...")
+init_db()
+assert os.path.exists(os.environ['TRAINING_DB_PATH'])
+assert changes_since(0) == []
+print("   ✓ Database directory created by init_db()")
+
+print("\n" + "=" * 80)
+print("ALL TESTS PASSED ✓")
+print("=" * 80)
@@ -0,0 +1,134 @@
+"""
+Test script for the host write journal
+
+Writes through JournalWriter with the database unavailable, then checks that
+merging replays every write once, in order, and skips writes the database
+already superseded.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+TEST_DIR = tempfile.mkdtemp()
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'test_journal.db')
+os.environ['TRAINING_DB_JOURNAL_DIR'] = os.path.join(TEST_DIR, 'journal')
+sys.path.insert(0, '/home/ubuntu/mangodb')
+
+from training_db import get_run, get_run_objectives, init_db, update_objective_metric, update_run_status
+from training_db.journal import JournalWriter, append_entries, journal_path, merge_journals, read_journal
+
+print("=" * 80)
+print("TESTING HOST WRITE JOURNAL")
+print("=" * 80)
+
+init_db()
+
+# Test 1: Writes go to the journal only
+print("\n1. Recording offline...")
+path = journal_path(host='trainer-1')
+assert path == os.path.join(TEST_DIR, 'journal', 'trainer-1.jsonl')
+os.environ['TRAINING_DB_JOURNAL_DIR'] = os.path.join(TEST_DIR, 'elsewhere')  # Read at call time
+assert journal_path(host='trainer-1') == os.path.join(TEST_DIR, 'elsewhere', 'trainer-1.jsonl')
+os.environ['TRAINING_DB_JOURNAL_DIR'] = os.path.join(TEST_DIR, 'journal')
+journal = JournalWriter(path, forward=False)
+journal.insert_run("jr_a_i-0aaa", None, {'reward': {'gradient_method': 'mgda'}}, status='launched')
+journal.insert_objective("jr_a_i-0aaa", 'COMT_activity', weight=2.0, direction='maximize')
+journal.update_run_status("jr_a_i-0aaa", 'running', wandb_run_id='wjr1')
+journal.update_objective_metric("jr_a_i-0aaa", 'COMT_activity', 'raw_mean', 0.5)
+journal.update_objective_metrics("jr_a_i-0aaa", {'COMT_activity': {'raw_mean': 0.7, 'raw_std': 0.1}})
+journal.close()
+
+entries, offset, corrupt = read_journal(path)
+assert len(entries) == 5 and corrupt == 0 and offset == os.path.getsize(path)
+assert len({entry['key'] for entry in entries}) == 5
+assert get_run("jr_a_i-0aaa") is None
+print("   ✓ 5 writes journaled with distinct keys; database untouched")
+
+# Test 2: Merge, then merge again
+print("\n2. Merging...")
+stats = merge_journals([path])
+assert stats['applied'] == 5 and stats['failed'] == 0, stats
+run = get_run("jr_a_i-0aaa")
+assert run['status'] == 'running' and run['wandb_run_id'] == 'wjr1' and run['gradient_method'] == 'mgda'
+objective = get_run_objectives("jr_a_i-0aaa")[0]
+assert (objective['raw_mean'], objective['raw_std'], objective['weight']) == (0.7, 0.1, 2.0)
+assert merge_journals([path])['duplicate'] == 5
+print("   ✓ Replayed in order; a second merge applies nothing")
+
+# Test 3: Newer writes in the database win
+print("\n3. Conflicts...")
+journal = JournalWriter(path, forward=False)
+journal.update_run_status("jr_a_i-0aaa", 'not_running')
+journal.update_objective_metric("jr_a_i-0aaa", 'COMT_activity', 'raw_mean', 0.1)
+journal.close()
+time.sleep(0.01)
+update_run_status("jr_a_i-0aaa", 'crashed')
+update_objective_metric("jr_a_i-0aaa", 'COMT_activity', 'raw_mean', 0.9)
+
+offsets = {}
+stats = merge_journals([path], offsets)
+assert stats['stale'] == 2 and stats['duplicate'] == 5, stats
+assert get_run("jr_a_i-0aaa")['status'] == 'crashed'
+assert get_run_objectives("jr_a_i-0aaa")[0]['raw_mean'] == 0.9
+assert offsets[path] == os.path.getsize(path)
+assert merge_journals([path], offsets)['read'] == 0  # Nothing after the offset
+print("   ✓ Journal writes older than the database's are skipped as stale")
+
+# Test 4: Writes for unknown runs wait for their insert
+print("\n4. Out-of-order hosts...")
+other = journal_path(host='trainer-2')
+late = JournalWriter(other, forward=False)
+late.update_run_status("jr_b_i-0bbb", 'running')
+late.close()
+assert merge_journals([other])['missing'] == 1
+
+launcher = JournalWriter(journal_path(host='launcher'), forward=False)
+launcher.insert_run("jr_b_i-0bbb", None, {}, status='launched')
+launcher.close()
+merge_journals([launcher.path])
+stats = merge_journals([other])
+assert stats['applied'] == 1 and get_run("jr_b_i-0bbb")['status'] == 'running'
+print("   ✓ Missing runs are retried on the next merge")
+
+# Test 5: Torn line from a writer that died mid-append
+print("\n5. Torn lines...")
+with open(other, 'a') as f:
+    f.write('{"key": "torn", "ts": ')
+append_entries(other, [{'key': 'after', 'ts': time.time(), 'host': 'trainer-2', 'op': 'attach_conversation',
+                        'args': {'run_id': 'jr_b_i-0bbb', 'conversation_s3_key': 'conv/b.json'}}])
+entries, _, corrupt = read_journal(other)
+assert corrupt == 1 and entries[-1]['key'] == 'after'
+assert merge_journals([other])['applied'] == 1
+assert get_run("jr_b_i-0bbb")['conversation_s3_key'] == 'conv/b.json'
+print("   ✓ Only the torn line is lost")
+
+# Test 6: Trainers never wait on a locked database
+print("\n6. Forwarding past a locked database...")
+locker = sqlite3.connect(os.environ['TRAINING_DB_PATH'])
+locker.execute("BEGIN EXCLUSIVE")
+writer = JournalWriter(journal_path(host='trainer-3'), flush_interval=0.1)
+start = time.perf_counter()
+for step in range(200):
+    writer.update_run_status("jr_b_i-0bbb", 'running', duration_seconds=step)
+elapsed = time.perf_counter() - start
+time.sleep(0.5)
+locker.rollback()
+locker.close()
+
+deadline = time.time() + 30
+while time.time() < deadline and get_run("jr_b_i-0bbb")['duration_seconds'] != 199:
+    time.sleep(0.2)
+writer.close()
+assert elapsed < 0.5, elapsed
+assert get_run("jr_b_i-0bbb")['duration_seconds'] == 199
+with open(writer.path) as f:
+    assert len([json.loads(line) for line in f]) == 200
+print(f"   ✓ 200 writes recorded in {elapsed * 1000:.1f}ms while locked; forwarded once unlocked")
+
+print("\n" + "=" * 80)
+print("ALL TESTS PASSED ✓")
+print("=" * 80)
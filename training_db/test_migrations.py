@@ -0,0 +1,163 @@
+"""
+Test script for the migration engine
+
+Upgrades a pre-versioning (v1) database through init_db(), interrupts a
+chunked backfill partway and checks that the next init_db() resumes from the
+migration_progress checkpoint instead of starting over.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp()
+sys.path.insert(0, '/home/ubuntu/mangodb')
+
+from training_db import get_run, get_run_objectives, init_db
+from training_db.migrations import (
+    OBJECTIVES_BACKFILL, SCHEMA_DIR, SCHEMA_VERSION, get_schema_version, map_serial, migrate,
+)
+
+RUNS = 50
+CHUNK_SIZE = 5
+
+
+def make_v1_db(path):
+    """A database as the original schema.sql created it, with RUNS legacy runs."""
+    conn = sqlite3.connect(path)
+    conn.executescript((SCHEMA_DIR / 'schema.sql').read_text())
+    conn.executemany("""
+        INSERT INTO training_runs (run_id, created_at, status, gradient_method, config_json, final_metrics_json)
+        VALUES (?, ?, 'completed', 'mgda', ?, ?)
+    """, [(
+        f"legacy_{n:03d}_i-{n:04x}",
+        f"2025-01-06T{n % 24:02d}:00:00Z",
+        json.dumps({
+            'training': {'batch_size': 8, 'max_steps': 1000 + n},
+            'objectives': [
+                {'name': 'COMT_activity', 'alias': 'COMT_activity_maximize', 'weight': 1.0,
+                 'params': {'uniprot': 'P21964'}},
+                {'name': 'SA_score', 'alias': 'SA_score_minimize', 'weight': 0.5},
+            ],
+        }),
+        json.dumps({'objectives/COMT_activity_maximize/raw_mean': n / RUNS, 'train/loss': 0.1}),
+    ) for n in range(RUNS)])
+    conn.commit()
+    conn.close()
+
+
+def progress(path, version, step):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("""
+            SELECT last_rowid, rows_done, completed_at FROM migration_progress
+            WHERE version = ? AND step = ?
+        """, (version, step)).fetchone()
+    finally:
+        conn.close()
+
+
+print("=" * 80)
+print("TESTING MIGRATIONS")
+print("=" * 80)
+
+# Test 1: Legacy database through init_db()
+print("\n1. v1 upgrade via init_db()...")
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'v1.db')
+make_v1_db(os.environ['TRAINING_DB_PATH'])
+init_db()
+conn = sqlite3.connect(os.environ['TRAINING_DB_PATH'])
+assert get_schema_version(conn) == SCHEMA_VERSION
+assert conn.execute("SELECT COUNT(*) FROM run_objectives").fetchone()[0] == 2 * RUNS
+assert conn.execute("SELECT COUNT(*) FROM objectives_catalog").fetchone()[0] == 2
+conn.close()
+run = get_run("legacy_007_i-0007")
+assert run['created_ms'] == 1736121600000 + 7 * 3600000
+objectives = {o['objective_name']: o for o in get_run_objectives("legacy_007_i-0007")}
+assert objectives['COMT_activity']['raw_mean'] == 7 / RUNS
+assert objectives['COMT_activity']['uniprot'] == 'P21964'
+assert objectives['SA_score']['direction'] == 'minimize' and objectives['SA_score']['raw_mean'] is None
+rows_done, completed_at = progress(os.environ['TRAINING_DB_PATH'], 2, OBJECTIVES_BACKFILL.name)[1:]
+assert rows_done == RUNS and completed_at is not None
+init_db()  # Current: nothing to do
+print(f"   ✓ {RUNS} legacy runs migrated to v{SCHEMA_VERSION}, objectives extracted")
+
+
+# Test 2: Interrupted backfill
+print("\n2. Resume after interruption...")
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after(chunks):
+    """Mapper that dies (like a killed process) after `chunks` chunks."""
+    def mapper(extract, rows_chunks):
+        for n, pair in enumerate(map_serial(extract, rows_chunks)):
+            if n == chunks:
+                raise Interrupted()
+            yield pair
+    return mapper
+
+
+extracted = []
+
+
+def counting(extract, rows_chunks):
+    for rows, results in map_serial(extract, rows_chunks):
+        extracted.append((extract.__name__, len(rows)))
+        yield rows, results
+
+
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'interrupted.db')
+make_v1_db(os.environ['TRAINING_DB_PATH'])
+try:
+    migrate(os.environ['TRAINING_DB_PATH'], chunk_size=CHUNK_SIZE, mapper=interrupt_after(2), verbose=False)
+    raise AssertionError("backfill was not interrupted")
+except Interrupted:
+    pass
+
+conn = sqlite3.connect(os.environ['TRAINING_DB_PATH'])
+assert get_schema_version(conn) == 1  # v2 not recorded until its backfill completes
+assert conn.execute("SELECT COUNT(DISTINCT run_id) FROM run_objectives").fetchone()[0] == 2 * CHUNK_SIZE
+conn.close()
+last_rowid, rows_done, completed_at = progress(os.environ['TRAINING_DB_PATH'], 2, OBJECTIVES_BACKFILL.name)
+assert (last_rowid, rows_done, completed_at) == (2 * CHUNK_SIZE, 2 * CHUNK_SIZE, None)
+
+# Resume with the same engine init_db() uses, counting the rows extracted
+assert migrate(os.environ['TRAINING_DB_PATH'], chunk_size=CHUNK_SIZE, mapper=counting, verbose=False) == SCHEMA_VERSION
+resumed = sum(n for name, n in extracted if name == OBJECTIVES_BACKFILL.extract.__name__)
+assert resumed == RUNS - 2 * CHUNK_SIZE, resumed
+last_rowid, rows_done, completed_at = progress(os.environ['TRAINING_DB_PATH'], 2, OBJECTIVES_BACKFILL.name)
+assert rows_done == RUNS and completed_at is not None
+
+conn = sqlite3.connect(os.environ['TRAINING_DB_PATH'])
+assert conn.execute("SELECT COUNT(*) FROM run_objectives").fetchone()[0] == 2 * RUNS  # No duplicates
+assert conn.execute("SELECT COUNT(*) FROM run_objectives WHERE raw_mean IS NOT NULL").fetchone()[0] == RUNS
+conn.close()
+print(f"   ✓ Stopped after {2 * CHUNK_SIZE} rows; resumed at the checkpoint for the other {resumed}")
+
+# Interrupted again, then init_db() finishes it
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'interrupted_twice.db')
+make_v1_db(os.environ['TRAINING_DB_PATH'])
+for chunks in (1, 3):
+    try:
+        migrate(os.environ['TRAINING_DB_PATH'], chunk_size=CHUNK_SIZE, mapper=interrupt_after(chunks), verbose=False)
+        raise AssertionError("backfill was not interrupted")
+    except Interrupted:
+        pass
+assert progress(os.environ['TRAINING_DB_PATH'], 2, OBJECTIVES_BACKFILL.name)[1] == 4 * CHUNK_SIZE
+init_db()
+conn = sqlite3.connect(os.environ['TRAINING_DB_PATH'])
+assert get_schema_version(conn) == SCHEMA_VERSION
+assert conn.execute("SELECT COUNT(*) FROM run_objectives").fetchone()[0] == 2 * RUNS
+conn.close()
+assert progress(os.environ['TRAINING_DB_PATH'], 2, OBJECTIVES_BACKFILL.name)[1] == RUNS
+print("   ✓ init_db() completes a backfill interrupted twice")
+
+print("\n" + "=" * 80)
+print("ALL TESTS PASSED ✓")
+print("=" * 80)
@@ -4,9 +4,14 @@ Test script for objectives API
 Demonstrates querying runs by objective values.
 """
 
+import sqlite3
 import sys
 sys.path.insert(0, '/home/ubuntu/mangodb')
 
+from training_db import objective_stats
+from training_db import objectives as objectives_api
+from training_db.catalog import get_catalog
+from training_db.core import db_path, get_connection
 from training_db import (
     insert_run,
     insert_objective,
@@ -14,7 +19,9 @@ from training_db import (
     get_run_objectives,
     query_runs_by_objectives,
     get_objective_statistics,
+    get_objective_distribution,
     compare_gradient_methods,
+    top_k_runs,
 )
 
 print("="*80)
@@ -132,6 +139,100 @@ if comparison:
 else:
     print("   No data available for comparison")
 
+# Test 7: Distribution statistics (quantiles + histograms)
+print("\n7. Getting objective distribution...")
+dist = get_objective_distribution('COMT_activity', bins=5)
+if dist['overall'] and dist['overall']['count']:
+    overall = dist['overall']
+    print(f"   Runs: {overall['count']}, median: {overall['median']:.3f}, std: {overall['std']}")
+    print(f"   Histogram: {overall['histogram']['counts']}")
+    for method, summary in dist['by_gradient_method'].items():
+        print(f"   {method}: p25={summary['quantiles'][0.25]:.3f}, p75={summary['quantiles'][0.75]:.3f}")
+else:
+    print("   No data available for distribution")
+
+# Test 7b: Cached sketches only take committed writes
+print("\n7b. Cached distribution after committed and failed writes...")
+for n in range(3):
+    run_id = f"test_sketch_{n}"
+    insert_run(run_id=run_id, wandb_run_id=None, config_dict={'reward': {'gradient_method': 'mgda'}},
+               status='completed')
+    insert_objective(run_id=run_id, objective_name='SKETCH_test_activity', weight=1.0)
+update_objective_metric("test_sketch_0", 'SKETCH_test_activity', 'raw_mean', 0.2)
+update_objective_metric("test_sketch_1", 'SKETCH_test_activity', 'raw_mean', 0.4)
+assert get_objective_distribution('SKETCH_test_activity')['overall']['count'] == 2
+
+with get_connection() as conn:
+    key = (db_path(), get_catalog(db_path()).get_id(conn, 'SKETCH_test_activity'))
+before = objective_stats._cache[key][('raw_mean', 'completed')]
+update_objective_metric("test_sketch_2", 'SKETCH_test_activity', 'raw_mean', 0.6)
+after = objective_stats._cache[key][('raw_mean', 'completed')]
+assert after is not before and before.overall.count == 2  # Swapped in, not changed in place
+assert after.overall.count == 3
+dist = get_objective_distribution('SKETCH_test_activity')
+assert objective_stats._cache[key][('raw_mean', 'completed')] is after  # Folded in, no rebuild
+assert (dist['overall']['count'], dist['overall']['max']) == (3, 0.6)
+
+
+class FailingCommit:
+    """Write connection whose commit fails (the transaction is rolled back on close)."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def commit(self):
+        raise sqlite3.OperationalError("disk I/O error")
+
+
+get_write_connection = objectives_api._get_connection
+objectives_api._get_connection = lambda: FailingCommit(get_write_connection())
+update_objective_metric("test_sketch_0", 'SKETCH_test_activity', 'raw_mean', 0.9)
+objectives_api._get_connection = get_write_connection
+assert key not in objective_stats._cache  # Dropped, not stamped with an uncommitted write
+dist = get_objective_distribution('SKETCH_test_activity')
+assert (dist['overall']['count'], dist['overall']['max']) == (3, 0.6)
+print("   ✓ Committed write folded into a copy; failed commit left no trace")
+
+# Test 8: Top-k leaderboard per gradient method
+print("\n8. Top 3 runs per gradient method...")
+# Own objective, so runs already in the database do not change the ranking
+leaderboard = {
+    'mgda': [0.10, 0.95, 0.50, 0.70, 0.30],
+    'pcgrad': [0.20, 0.60, 0.90, 0.40],
+}
+for method, values in leaderboard.items():
+    for n, value in enumerate(values):
+        run_id = f"test_topk_{method}_{n}"
+        insert_run(run_id=run_id, wandb_run_id=None, config_dict={'reward': {'gradient_method': method}})
+        insert_objective(run_id=run_id, objective_name='TOPK_test_activity', weight=1.0, direction='maximize')
+        update_objective_metric(run_id, 'TOPK_test_activity', 'raw_mean', value)
+
+top = top_k_runs('TOPK_test_activity', k=3)
+for row in top:
+    print(f"   {row['group']} #{row['rank']}: {row['run_id']} = {row['value']:.3f}")
+assert [row['group'] for row in top] == ['mgda'] * 3 + ['pcgrad'] * 3
+for method, values in leaderboard.items():
+    rows = [row for row in top if row['group'] == method]
+    assert [row['rank'] for row in rows] == [1, 2, 3]
+    assert [row['value'] for row in rows] == sorted(values, reverse=True)[:3]
+    assert all(row['gradient_method'] == method for row in rows)
+
+# direction='minimize' reverses the order within each group
+bottom = top_k_runs('TOPK_test_activity', k=3, direction='minimize')
+for method, values in leaderboard.items():
+    assert [row['value'] for row in bottom if row['group'] == method] == sorted(values)[:3]
+
+# k larger than a group returns the whole group; group_by=None is one leaderboard
+assert len([row for row in top_k_runs('TOPK_test_activity', k=10) if row['group'] == 'pcgrad']) == 4
+overall = top_k_runs('TOPK_test_activity', k=4, group_by=None)
+assert [row['group'] for row in overall] == [None] * 4
+assert [row['value'] for row in overall] == [0.95, 0.90, 0.70, 0.60]
+assert [row['run_id'] for row in overall][:2] == ['test_topk_mgda_1', 'test_topk_pcgrad_2']
+print("   ✓ k per group, best first; minimize reverses; one leaderboard without group_by")
+
 print("\n" + "="*80)
 print("ALL TESTS PASSED ✓")
 print("="*80)
@@ -0,0 +1,113 @@
+"""
+Test script for SQLITE_BUSY handling
+
+Checks the retry decorator and backoff, that writes wait out a lock held by
+another connection instead of failing, and that concurrent writer processes
+lose nothing.
+"""
+
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+TEST_DIR = tempfile.mkdtemp()
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'test_retry.db')
+os.environ['TRAINING_DB_BUSY_TIMEOUT'] = '0.05'  # Make lock waits fall through to the retry layer
+sys.path.insert(0, '/home/ubuntu/mangodb')
+
+from training_db import get_run, init_db, insert_objective, insert_run, update_run_status
+from training_db import retry
+from training_db.core import get_connection
+from training_db.retry import RetryPolicy, is_busy, retry_on_busy, retry_stats
+
+
+def write_runs(number):
+    """Writer process for test 4, with the default lock wait."""
+    retry.BUSY_TIMEOUT = 5.0
+    for n in range(20):
+        run_id = f"rt_w{number}_{n:02d}_i-{number:02x}{n:04x}"
+        insert_run(run_id, None, {}, status='launched')
+        insert_objective(run_id, 'COMT_activity', weight=1.0, direction='maximize')
+        update_run_status(run_id, 'completed')
+    return retry_stats()
+
+
+if __name__ == '__main__':
+    print("=" * 80)
+    print("TESTING SQLITE_BUSY RETRIES")
+    print("=" * 80)
+
+    init_db()
+
+    # Test 1: Backoff and error classification
+    print("\n1. Backoff...")
+    policy = RetryPolicy(attempts=8, base_delay=0.01, max_delay=0.1)
+    delays = list(policy.delays())
+    assert len(delays) == 7 and all(0 <= d <= min(0.1, 0.01 * 2 ** n) for n, d in enumerate(delays))
+    assert is_busy(sqlite3.OperationalError('database is locked'))
+    assert not is_busy(sqlite3.OperationalError('no such table: x'))
+    assert not is_busy(sqlite3.IntegrityError('UNIQUE constraint failed'))
+    print("   ✓ Jittered delays stay under the exponential ceiling")
+
+    # Test 2: Decorator
+    print("\n2. Retry decorator...")
+    calls = []
+
+    @retry_on_busy(policy=RetryPolicy(attempts=3, base_delay=0.001))
+    def flaky(fail_times):
+        calls.append(1)
+        if len(calls) <= fail_times:
+            raise sqlite3.OperationalError('database is locked')
+        return 'ok'
+
+    before = retry_stats()
+    assert flaky(2) == 'ok' and len(calls) == 3
+    calls.clear()
+    try:
+        flaky(5)
+        raise AssertionError("gave up without raising")
+    except sqlite3.OperationalError:
+        pass
+    assert len(calls) == 3
+    after = retry_stats()
+    assert after['retries'] - before['retries'] == 4 and after['exhausted'] - before['exhausted'] == 1
+    print("   ✓ Busy errors retried; the last one raised once attempts run out")
+
+    # Test 3: A write waits out another connection's lock
+    print("\n3. Locked database...")
+    insert_run("rt_a_i-0aaa", None, {}, status='launched')
+    locker = sqlite3.connect(os.environ['TRAINING_DB_PATH'], check_same_thread=False)
+    locker.execute("BEGIN EXCLUSIVE")
+    threading.Timer(0.3, locker.rollback).start()
+    before = retry_stats()['retries']
+    start = time.perf_counter()
+    update_run_status("rt_a_i-0aaa", 'running')
+    assert get_run("rt_a_i-0aaa")['status'] == 'running'
+    assert retry_stats()['retries'] > before and time.perf_counter() - start >= 0.25
+    locker.close()
+    print("   ✓ update_run_status retried until the lock was released")
+
+    # Test 4: Concurrent writer processes
+    print("\n4. Concurrent writers...")
+    inherited = retry_stats()  # Forked writers start from this process's counts
+    with multiprocessing.get_context('fork').Pool(8) as pool:
+        stats = pool.map(write_runs, range(8))
+    with get_connection() as conn:
+        completed = conn.execute(
+            "SELECT COUNT(*) FROM training_runs WHERE run_id LIKE 'rt_w%' AND status = 'completed'"
+        ).fetchone()[0]
+    assert completed == 160, completed
+    with get_connection() as conn:
+        objectives = conn.execute("SELECT COUNT(*) FROM run_objectives WHERE run_id LIKE 'rt_w%'").fetchone()[0]
+    assert objectives == 160, objectives
+    assert all(s['exhausted'] == inherited['exhausted'] for s in stats)
+    retries = sum(s['retries'] - inherited['retries'] for s in stats)
+    print(f"   ✓ 8 processes x 20 runs landed ({retries} retries)")
+
+    print("\n" + "=" * 80)
+    print("ALL TESTS PASSED ✓")
+    print("=" * 80)
@@ -0,0 +1,313 @@
+"""
+Test script for concurrent W&B sync
+
+Runs sync_runs() against FakeWandbApi (with injected latency and transient
+errors) on a throwaway database.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from functools import partial
+
+TEST_DIR = tempfile.mkdtemp()
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'test_run_sync.db')
+os.environ['WANDB_CACHE_PATH'] = os.path.join(TEST_DIR, 'wandb_cache.db')
+sys.path.insert(0, '/home/ubuntu/mangodb')
+
+from training_db import init_db, insert_run, get_run
+from training_db import run_sync, wandb_cache
+from training_db.core import get_connection
+from training_db.history_store import load_history
+from training_db.run_sync import TokenBucket, query_stale_runs, sync_runs
+from training_db.wandb_cache import WandbCache, get_cache
+from training_db.wandb_client import FakeWandbApi
+
+
+def fake_run(run_id, name, state, steps=3, created_at='2025-01-01T00:00:00Z'):
+    return {
+        'id': run_id,
+        'name': name,
+        'state': state,
+        'created_at': created_at,
+        'summary': {'_runtime': 120, 'loss': 0.5},
+        'history': [{'_step': i, 'loss': 1.0 / (i + 1)} for i in range(steps)],
+    }
+
+
+print("=" * 80)
+print("TESTING CONCURRENT W&B SYNC")
+print("=" * 80)
+
+init_db()
+
+# Test 1: Token bucket rate
+print("\n1. Token bucket...")
+bucket = TokenBucket(rate=50, capacity=1)
+start = time.monotonic()
+for _ in range(11):
+    bucket.acquire()
+elapsed = time.monotonic() - start
+assert elapsed >= 0.18, elapsed
+print(f"   ✓ 11 tokens at 50/s took {elapsed:.2f}s")
+
+# Test 2: Sync against fake API
+print("\n2. Syncing 20 runs against fake API...")
+api = FakeWandbApi(latency=0.05, fail_first=True)
+old = (datetime.utcnow() - timedelta(hours=5)).isoformat() + 'Z'
+for i in range(20):
+    insert_run(f"sync_run_{i:03d}", wandb_run_id=f"w{i:03d}", config_dict={}, run_name=f"name_{i}")
+    api.add_run(**fake_run(f"w{i:03d}", f"name_{i}", 'running' if i % 2 else 'finished'))
+
+# Found by name only, and one never started
+insert_run("sync_by_name", wandb_run_id=None, config_dict={}, run_name="by_name")
+api.add_run(**fake_run("wbyname", "by_name", 'finished'))
+insert_run("sync_missing", wandb_run_id=None, config_dict={}, run_name="never_started")
+
+with get_connection() as conn:
+    conn.execute("UPDATE training_runs SET created_at = ? WHERE run_id = 'sync_missing'", (old,))
+
+stale = query_stale_runs()
+assert len(stale) == 22, len(stale)
+
+run_sync.BACKOFF_BASE_DELAY = 0.01  # Fake errors are transient; retry fast
+
+start = time.monotonic()
+stats = sync_runs(api, stale, 'fake', 'project', workers=8, rate=None, batch_size=5)
+elapsed = time.monotonic() - start
+print(f"   Stats: {stats} in {elapsed:.2f}s, max concurrent calls: {api.max_in_flight}")
+
+assert stats['updated'] == 21, stats
+assert stats['marked_stale'] == 1, stats
+assert stats['errors'] == 0, stats
+assert api.max_in_flight > 1
+print("   ✓ All runs synced concurrently despite transient errors")
+
+# Test 2b: Name resolution lists the project once, then incrementally
+print("\n2b. Resolving runs by name...")
+from training_db.run_index import RunIndex
+index = RunIndex('fake', 'project')
+assert len(index) == 21 and index.lookup_name('by_name')['id'] == 'wbyname'
+late = api.add_run(**fake_run('wlate', 'late_name', 'running', created_at='2025-01-02T00:00:00Z'))
+calls = api.calls
+assert index.refresh(api, call=run_sync.call_with_backoff) == 1 and index.lookup_name('late_name')['id'] == 'wlate'
+assert index.cursor == late.created_at
+assert api.calls == calls + 2  # One listing (plus the fake's transient failure)
+print(f"   ✓ Index of {len(index)} runs persisted; incremental refresh added 1 run")
+
+# Test 3: Writes landed
+print("\n3. Checking database...")
+assert get_run('sync_run_001')['status'] == 'running'
+assert get_run('sync_run_002')['status'] == 'not_running'
+assert get_run('sync_run_002')['final_metrics_json'] is not None
+assert get_run('sync_by_name')['wandb_run_id'] == 'wbyname'
+assert get_run('sync_missing')['status'] == 'not_running'
+history = load_history('sync_run_003')
+assert history['_step'] == [0, 1, 2] and history['loss'] == [1.0, 0.5, 1.0 / 3], history
+print("   ✓ Status, metrics, history steps and W&B IDs written")
+
+# Test 4: Dry run writes nothing
+print("\n4. Dry run...")
+insert_run("sync_dry", wandb_run_id="wdry", config_dict={})
+api.add_run(**fake_run("wdry", "dry", 'finished'))
+stats = sync_runs(api, [r for r in query_stale_runs() if r['run_id'] == 'sync_dry'],
+                  'fake', 'project', rate=None, dry_run=True)
+assert stats['updated'] == 1 and get_run('sync_dry')['status'] == 'running'
+print("   ✓ Dry run left the database untouched")
+
+# Test 5: Unchanged runs are served from the W&B cache
+print("\n5. Re-syncing from cache...")
+api.latency = 0
+ids = [f"w{i:03d}" for i in range(20)]
+for run_id in ids:
+    api.get(run_id).state = 'finished'
+cache = get_cache()
+cache.clear()
+stale = [r for r in query_stale_runs() if r['wandb_run_id'] in ids]
+sync_runs(api, stale, 'fake', 'project', rate=None)  # Warm the cache
+
+calls = api.calls
+stats = sync_runs(api, stale, 'fake', 'project', rate=None)
+assert stats['updated'] == len(stale), stats
+# Finished runs that were already fetched cost no calls at all
+assert api.calls == calls, api.calls - calls
+print(f"   ✓ {len(stale)} unchanged runs re-synced with 0 API calls, cache: {cache.stats()}")
+
+# Test 6: Only steps logged since the last sync are fetched
+print("\n6. Changed run...")
+wandb_cache.DEFAULT_SNAPSHOT_TTL = 0  # Re-check running runs on every sync
+changed = api.get(stale[0]['wandb_run_id'])
+changed.state = 'running'
+cache.invalidate(f'fake/project/{changed.id}')
+stale = stale[:1]
+sync_runs(api, stale, 'fake', 'project', rate=None)
+
+calls = api.calls
+sync_runs(api, stale, 'fake', 'project', rate=None)
+assert api.calls == calls + 1, api.calls - calls  # Snapshot re-fetched, history already stored
+
+changed.log({'loss': 0.1})
+calls = api.calls
+sync_runs(api, stale, 'fake', 'project', rate=None)
+assert api.calls == calls + 2, api.calls - calls  # Snapshot + one page of new steps
+assert load_history(stale[0]['run_id'], keys=['loss'])['loss'][-1] == 0.1
+print("   ✓ Only the new step fetched after the run logged one")
+
+# Test 6b: Every history page takes a rate-limit token
+print("\n6b. History pages rate limited...")
+
+
+class CountingBucket(TokenBucket):
+    def __init__(self):
+        super().__init__(rate=None)
+        self.taken = 0
+
+    def acquire(self):
+        self.taken += 1
+
+
+run_sync.HISTORY_PAGE_STEPS = 100
+paged_api = FakeWandbApi()
+paged = paged_api.add_run(**fake_run('wpaged', 'paged', 'running', steps=250))
+insert_run("sync_paged", wandb_run_id='wpaged', config_dict={}, run_name="paged")
+counter = CountingBucket()
+with run_sync.BatchedWriter() as writer:
+    submitted = run_sync.stream_history(
+        paged_api, 'fake/project/wpaged', 'sync_paged', {'_run': paged}, writer,
+        partial(run_sync.call_with_backoff, limiter=counter), counter
+    )
+assert submitted == 250 and paged_api.calls == 3, (submitted, paged_api.calls)
+assert counter.taken == paged_api.calls  # One token per page request
+assert load_history('sync_paged')['_step'] == list(range(250))
+run_sync.HISTORY_PAGE_STEPS = run_sync.DEFAULT_PAGE_SIZE
+print(f"   ✓ {paged_api.calls} pages, {counter.taken} tokens")
+
+# Test 6c: Resumed runs are noticed once the finished-run TTL passes
+print("\n6c. Resumed run...")
+resumed_id = ids[5]
+api.get(resumed_id).state = 'running'  # Resumed in W&B after its snapshot was cached
+with get_connection() as conn:
+    resumed = [dict(row) for row in conn.execute("""
+        SELECT run_id, run_name, wandb_run_id, status, created_at FROM training_runs WHERE wandb_run_id = ?
+    """, (resumed_id,))]
+sync_runs(api, resumed, 'fake', 'project', rate=None)
+assert get_run(resumed[0]['run_id'])['status'] == 'not_running'  # Finished snapshot still trusted
+wandb_cache.DEFAULT_FINISHED_SNAPSHOT_TTL = 0
+sync_runs(api, resumed, 'fake', 'project', rate=None)
+assert get_run(resumed[0]['run_id'])['status'] == 'running'
+wandb_cache.DEFAULT_FINISHED_SNAPSHOT_TTL = 6 * 3600.0
+print("   ✓ Finished snapshot re-fetched after its TTL; resumed run marked running")
+
+# Test 7: LRU eviction
+print("\n7. Size-bounded eviction...")
+history = [{'_step': step, 'value': step} for step in range(40)]
+small = WandbCache(os.path.join(TEST_DIR, 'small_cache.db'))
+small.put("probe", 'history', history)
+entry_size = small.stats()['bytes']
+small.clear()
+small.max_bytes = int(5.5 * entry_size)
+
+for i in range(5):
+    small.put(f"run_{i}", 'history', history, version='v')
+small.get("run_0", 'history')  # Touch: run_1 is now least recently used
+small.put("run_5", 'history', history, version='v')
+
+assert small.stats()['bytes'] <= small.max_bytes
+assert small.get("run_0", 'history') is not None
+assert small.get("run_1", 'history') is None
+assert small.get("run_5", 'history', version='v') is not None
+assert small.get("run_5", 'history', version='other') is None
+print(f"   ✓ Cache stayed within budget: {small.stats()}")
+
+# Test 7b: WANDB_CACHE_PATH is read when a cache is opened, not at import
+print("\n7b. Cache path...")
+moved = os.path.join(TEST_DIR, 'moved_cache.db')
+os.environ['WANDB_CACHE_PATH'] = moved
+assert WandbCache().path == moved and get_cache().path == moved and get_cache() is not cache
+os.environ['WANDB_CACHE_PATH'] = os.path.join(TEST_DIR, 'wandb_cache.db')
+assert get_cache() is cache
+print("   ✓ Cache opened at the path set after import")
+
+# Test 8: Matching DB runs to W&B runs by config prefix and time
+print("\n8. Run matching...")
+from training_db.run_matching import RunMatcher
+matcher = RunMatcher([
+    {'name': 'perindopril_mpo_20250101_0000', 'created_at': '2025-01-01T00:00:00Z'},
+    {'name': 'perindopril_mpo_20250101_0020', 'created_at': '2025-01-01T00:20:00Z'},
+    {'name': 'perindopril_mpo_bs96_20250101_0010', 'created_at': '2025-01-01T00:10:00Z'},
+    {'name': 'perindopril_mpox_20250101_0012', 'created_at': '2025-01-01T00:12:00Z'},
+])
+match = matcher.match('perindopril_mpo_i-07eec3b992edddacf', '2025-01-01T00:13:00Z')
+assert match['name'] == 'perindopril_mpo_bs96_20250101_0010', match  # Prefix at '_' boundary, closest
+assert matcher.match('perindopril_mpo_i-0abc', '2025-01-01T03:00:00Z') is None
+assert [r['name'] for r, _ in matcher.candidates('perindopril_mpox')] == ['perindopril_mpox_20250101_0012']
+print("   ✓ Closest run within the time window, prefixes matched on '_' boundaries")
+
+# Test 9: Objective metrics come from the summary, missing ones from the history tail
+print("\n9. Summary-first metric sync...")
+from training_db import insert_objective, get_run_objectives, wandb_sync
+
+metrics_api = FakeWandbApi()
+wandb_sync.get_api = lambda: metrics_api
+history = [
+    {'_step': i, 'objectives/COMT_activity_maximize/raw_mean': i / 2000,
+     'objectives/QED_maximize/raw_mean': i / 4000}
+    for i in range(2000)
+]
+metrics_api.add_run('wmetrics', 'metrics_run', summary={
+    'objectives/COMT_activity_maximize/raw_mean': 0.9,
+    'objectives/COMT_activity_maximize/normalized_mean': 0.8,
+    'objectives/COMT_activity_maximize/raw_std': 0.05,
+    'objectives/COMT_activity_maximize/normalized_std': 0.04,
+}, history=history)
+insert_run("sync_metrics", wandb_run_id='wmetrics', config_dict={}, run_name="metrics_run")
+insert_objective("sync_metrics", "COMT_activity", "COMT_activity_maximize")
+
+calls = metrics_api.calls
+assert wandb_sync.sync_run_metrics_from_wandb("sync_metrics", "wmetrics") == 4
+assert metrics_api.calls == calls + 1  # Run lookup only, no history pages
+comt = get_run_objectives("sync_metrics")[0]
+assert (comt['raw_mean'], comt['normalized_mean'], comt['raw_std'], comt['normalized_std']) == (0.9, 0.8, 0.05, 0.04)
+
+insert_objective("sync_metrics", "QED", "QED_maximize")  # Not in the summary
+wandb_cache.get_cache().invalidate(wandb_sync._run_path('wmetrics'))
+calls = metrics_api.calls
+assert wandb_sync.sync_run_metrics_from_wandb("sync_metrics", "wmetrics") == 5
+assert metrics_api.calls == calls + 2  # Run lookup plus one page of tail
+tail = wandb_cache.get_run_tail(metrics_api, wandb_sync._run_path('wmetrics'), wandb_sync.SUMMARY_TAIL_STEPS)
+assert len(tail) == wandb_sync.SUMMARY_TAIL_STEPS and tail[-1]['_step'] == 1999
+qed = [obj for obj in get_run_objectives("sync_metrics") if obj['objective_name'] == 'QED'][0]
+assert qed['raw_mean'] == 1999 / 4000
+print(f"   ✓ 4 metric types from the summary; missing objective read from a {len(tail)}-step tail")
+
+# Test 10: Adaptive polling schedule
+print("\n10. Poll schedule...")
+from training_db import poll_schedule
+from training_db.poll_schedule import MIN_INTERVAL, due_runs, plan_next_poll, record_polls
+
+now = time.time()
+insert_run("sched_new", wandb_run_id=None, config_dict={}, run_name="sched_new", status='launched')
+due = [r['run_id'] for r in due_runs(now=now)]
+assert due[0] == 'sched_new' and 'sync_metrics' in due, due[:3]  # Launches first
+
+record_polls(due, now=now)
+assert due_runs(now=now) == []  # Nothing due until MIN_INTERVAL has passed
+assert [r['run_id'] for r in due_runs(now=now + MIN_INTERVAL)][0] == 'sched_new'
+
+# Idle runs back off exponentially up to their cap; active runs follow their step rate
+row = plan_next_poll(None, 'running', 10, now)
+for i in range(10):
+    row = plan_next_poll(row, 'running', 10, now + 60 * (i + 1))
+assert row['interval_seconds'] == poll_schedule.MAX_INTERVALS['running'] and row['idle_polls'] == 10
+active = plan_next_poll(row, 'running', 110, row['last_polled_at'] + 1000)  # 0.1 steps/s
+assert active['idle_polls'] == 0 and active['interval_seconds'] == poll_schedule.TARGET_STEPS_PER_POLL / 0.1
+stopped = plan_next_poll(active, 'not_running', 110, active['last_polled_at'] + 500)
+assert stopped['last_change_at'] == stopped['last_polled_at'] and stopped['idle_polls'] == 0  # Status change
+print(f"   ✓ Launches first, idle runs backed off to {row['interval_seconds']:.0f}s, "
+      f"active run polled every {active['interval_seconds']:.0f}s")
+
+print("\n" + "=" * 80)
+print("ALL TESTS PASSED ✓")
+print("=" * 80)
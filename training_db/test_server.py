@@ -0,0 +1,106 @@
+"""
+Test script for the read-only HTTP query service
+
+Starts training_db.server on a throwaway database and checks JSON responses,
+ETag revalidation and that nothing can be written through its connections.
+Objective endpoints must read through the server's pool, even when it serves
+another file than TRAINING_DB_PATH.
+"""
+
+import http.client
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+
+TEST_DIR = tempfile.mkdtemp()
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'test_server.db')
+sys.path.insert(0, '/home/ubuntu/mangodb')
+
+from training_db import init_db, insert_run, insert_objective, update_objective_metric, update_run_status
+from training_db.core import get_connection
+from training_db.server import QueryServer
+
+print("=" * 80)
+print("TESTING HTTP QUERY SERVICE")
+print("=" * 80)
+
+init_db()
+insert_run("srv_a_i-0aaa", wandb_run_id=None, config_dict={'reward': {'gradient_method': 'mgda'}})
+insert_objective("srv_a_i-0aaa", 'COMT_activity', weight=1.0, direction='maximize')
+update_run_status("srv_a_i-0aaa", 'completed')
+update_objective_metric("srv_a_i-0aaa", 'COMT_activity', 'raw_mean', 0.8)
+
+server = QueryServer(('127.0.0.1', 0), pool_size=2)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+client = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=10)
+
+
+def get(path, etag=None):
+    client.request('GET', path, headers={'If-None-Match': etag} if etag else {})
+    response = client.getresponse()
+    body = response.read()
+    return response.status, response.getheader('ETag'), json.loads(body) if body else None
+
+
+# Test 1: Endpoints
+print("\n1. Endpoints...")
+status, etag, run = get('/runs/srv_a_i-0aaa')
+assert status == 200 and run['gradient_method'] == 'mgda' and etag
+assert get('/runs?status=completed&limit=5')[2][0]['run_id'] == 'srv_a_i-0aaa'
+assert get('/runs/srv_a_i-0aaa/objectives')[2][0]['raw_mean'] == 0.8
+assert get('/objectives/COMT_activity/statistics')[2]['count'] == 1
+assert get('/stats')[2]['completed'] == 1
+assert get('/runs/missing')[0] == 404
+assert get('/nothing')[0] == 404
+assert get('/runs?order_by=1;DROP%20TABLE%20training_runs')[0] == 400
+assert get('/runs?limit=ten')[0] == 400
+print("   ✓ JSON for runs, objectives and stats; 404/400 on bad requests")
+
+# Test 2: ETags follow the write generation
+print("\n2. ETags...")
+assert get('/runs/srv_a_i-0aaa', etag) == (304, etag, None)
+assert get('/stats', etag)[0] == 304  # One generation for the whole database
+writer = sqlite3.connect(os.environ['TRAINING_DB_PATH'])  # Another process, in effect
+with writer:
+    writer.execute("UPDATE training_runs SET status = 'crashed' WHERE run_id = 'srv_a_i-0aaa'")
+status, new_etag, run = get('/runs/srv_a_i-0aaa', etag)
+assert status == 200 and new_etag != etag and run['status'] == 'crashed'
+assert get('/runs/srv_a_i-0aaa', new_etag)[0] == 304
+print("   ✓ 304 while unchanged; a commit elsewhere changes the ETag")
+
+# Test 3: Read-only connections
+print("\n3. Read-only...")
+try:
+    with get_connection() as conn:  # Borrowed from the server's pool
+        conn.execute("DELETE FROM training_runs")
+    raise AssertionError("write through the server pool succeeded")
+except sqlite3.OperationalError as e:
+    assert 'readonly' in str(e)
+server.shutdown()
+server.server_close()
+print("   ✓ Writes through the server's pool fail")
+
+# Test 4: Objective reads use the pool
+print("\n4. Objective endpoints on the pool...")
+served = os.path.join(TEST_DIR, 'served.db')
+shutil.copy(os.environ['TRAINING_DB_PATH'], served)
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'elsewhere.db')
+init_db()  # Empty database the environment now points at
+server = QueryServer(('127.0.0.1', 0), pool_size=2, path=served)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+client = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=10)
+assert get('/runs/srv_a_i-0aaa/objectives')[2][0]['raw_mean'] == 0.8
+assert [row['run_id'] for row in get('/objectives/COMT_activity/top')[2]] == ['srv_a_i-0aaa']
+assert get('/objectives/COMT_activity/distribution?status=crashed')[2]['overall']['count'] == 1
+assert len(server.pool._all) <= 2
+server.shutdown()
+server.server_close()
+print("   ✓ Run objectives, top-k and distributions answered from the served file")
+
+print("\n" + "=" * 80)
+print("ALL TESTS PASSED ✓")
+print("=" * 80)
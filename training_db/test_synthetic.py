@@ -0,0 +1,117 @@
+"""
+Test script for the synthetic database generator
+
+Checks that generate_database() writes the requested row counts, is
+deterministic and extends cleanly, and that what it writes reads back through
+the public API like runs recorded by insert_run().
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp()
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'test_synthetic.db')
+sys.path.insert(0, '/home/ubuntu/mangodb')
+
+from training_db import (
+    get_objective_statistics, get_run, get_run_objectives, get_stats, init_db, query_runs,
+    query_runs_between, query_runs_by_objectives, top_k_runs,
+)
+from training_db.core import get_connection
+from training_db.history_store import load_history
+from training_db.synthetic import OBJECTIVE_NAMES, generate_database
+
+RUNS = 120
+OBJECTIVES = 3
+STEPS = 5
+
+
+def run_id(n):
+    return f"syn_{n:07d}_i-{n:017x}"
+
+
+def count(table):
+    with get_connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+print("=" * 80)
+print("TESTING SYNTHETIC DATABASES")
+print("=" * 80)
+
+init_db()
+
+# Test 1: Row counts
+print("\n1. Row counts...")
+written = generate_database(RUNS, objectives_per_run=OBJECTIVES, history_steps=STEPS, config_bytes=1024, batch_size=50)
+assert written == {'runs': RUNS, 'objectives': RUNS * OBJECTIVES, 'history_steps': RUNS * STEPS}, written
+assert (count('training_runs'), count('run_objectives'), count('run_history')) == (
+    RUNS, RUNS * OBJECTIVES, RUNS * STEPS
+)
+assert count('objectives_catalog') <= len(OBJECTIVE_NAMES)
+with get_connection() as conn:
+    sizes = [row[0] for row in conn.execute("SELECT LENGTH(config_json) FROM training_runs")]
+assert all(900 <= size < 1200 for size in sizes), (min(sizes), max(sizes))  # About config_bytes
+
+extended = generate_database(30, objectives_per_run=1, first=RUNS)
+assert extended == {'runs': 30, 'objectives': 30, 'history_steps': 0}
+assert count('training_runs') == RUNS + 30 and get_run(run_id(RUNS + 29)) is not None
+print(f"   ✓ {RUNS} runs, {RUNS * OBJECTIVES} objectives, {RUNS * STEPS} history steps; extended by 30")
+
+# Test 2: Deterministic
+print("\n2. Same seed, same database...")
+columns = "run_id, run_name, host, created_at, status, config_json, gradient_method, batch_size"
+with get_connection() as conn:
+    first = conn.execute(f"SELECT {columns} FROM training_runs WHERE rowid <= ? ORDER BY rowid", (RUNS,)).fetchall()
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'again.db')
+init_db()
+generate_database(RUNS, objectives_per_run=OBJECTIVES, history_steps=STEPS, config_bytes=1024, batch_size=50)
+with get_connection() as conn:
+    again = conn.execute(f"SELECT {columns} FROM training_runs ORDER BY rowid").fetchall()
+assert [tuple(row) for row in again] == [tuple(row) for row in first]
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'test_synthetic.db')
+print("   ✓ Runs regenerated identically")
+
+# Test 3: Read API
+print("\n3. Read API...")
+run = get_run(run_id(7))
+config = json.loads(run['config_json'])
+assert run['gradient_method'] == config['reward']['gradient_method']
+assert run['batch_size'] == config['training']['batch_size']
+assert run['created_at'] == '2025-01-01T00:49:00Z' and run['created_ms'] is not None
+
+objectives = get_run_objectives(run_id(7))
+assert sorted(o['objective_name'] for o in objectives) == sorted(o['name'] for o in config['objectives'])
+assert all(o['direction'] == c['direction'] for o, c in zip(
+    sorted(objectives, key=lambda o: o['objective_name']),
+    sorted(config['objectives'], key=lambda c: c['name'])
+))
+
+stats = get_stats()
+assert stats['total_runs'] == RUNS + 30
+assert len(query_runs({'status': 'completed'}, limit=1000)) == stats['completed'] > 0
+assert len(query_runs_between('2025-01-01', '2025-01-01T01:00:00Z')) == 9  # 7 minutes apart
+
+name = objectives[0]['objective_name']
+with get_connection() as conn:
+    recorded = conn.execute("""
+        SELECT COUNT(*) FROM run_objectives o
+        JOIN objectives_catalog c ON c.objective_id = o.objective_id
+        JOIN training_runs r ON r.run_id = o.run_id
+        WHERE c.objective_name = ? AND r.status = 'completed'
+    """, (name,)).fetchone()[0]
+assert get_objective_statistics(name)['count'] == recorded > 0
+top = top_k_runs(name, k=3, group_by=None)
+assert len(top) == 3 and [row['rank'] for row in top] == [1, 2, 3]
+assert all(run['run_id'].startswith('syn_') for run in query_runs_by_objectives({name: {'min': 0.5}}))
+
+history = load_history(run_id(7))
+assert history['_step'] == list(range(STEPS))
+assert len(history[f"objectives/{config['objectives'][0]['name']}/raw_mean"]) == STEPS
+print("   ✓ Runs, objectives, statistics, top-k and history read back")
+
+print("\n" + "=" * 80)
+print("ALL TESTS PASSED ✓")
+print("=" * 80)
@@ -0,0 +1,175 @@
+"""
+Test script for epoch-millisecond timestamp columns
+
+Checks that the *_ms columns are derived from every timestamp format writers
+store, that the v9 migration backfills existing rows, and that time-range
+queries and duration rollups run on the indexes instead of comparing strings.
+Also upgrades a pre-versioning (v1) database and checks that backfills do not
+count as updates.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+
+TEST_DIR = tempfile.mkdtemp()
+os.environ['TRAINING_DB_PATH'] = os.path.join(TEST_DIR, 'test_timestamps.db')
+sys.path.insert(0, '/home/ubuntu/mangodb')
+
+from training_db import (
+    get_run, init_db, insert_objective, insert_run, query_runs, query_runs_between,
+    summarize_durations, update_objective_metric, update_run_status,
+)
+from training_db.backfill import HYPERPARAMETERS, run_parallel_backfill
+from training_db.core import get_connection, to_epoch_ms
+from training_db.migrations import SCHEMA_DIR, SCHEMA_VERSION, get_schema_version, migrate
+
+JAN_6 = 1736121600000  # 2025-01-06T00:00:00Z in epoch ms
+HOUR = 3600000
+
+print("=" * 80)
+print("TESTING EPOCH-MILLISECOND TIMESTAMPS")
+print("=" * 80)
+
+# Test 1: Conversion
+print("\n1. to_epoch_ms()...")
+assert to_epoch_ms('2025-01-06T00:00:00Z') == JAN_6
+assert to_epoch_ms('2025-01-06 01:00:00') == JAN_6 + HOUR
+assert to_epoch_ms(datetime(2025, 1, 6, 0, 0, 0, 250000)) == JAN_6 + 250
+assert to_epoch_ms(JAN_6) == to_epoch_ms(str(JAN_6)) == JAN_6
+assert to_epoch_ms(None) is None
+print("   ✓ datetimes, ISO strings and epoch ms agree")
+
+# Test 2: Columns follow every writer's format
+print("\n2. Derived columns...")
+init_db()
+insert_run("ts_a_i-0001", None, {}, created_at='2025-01-06T00:00:00.500000Z', status='running')
+insert_run("ts_b_i-0002", None, {}, created_at='2025-01-06 12:00:00', status='running')
+with get_connection() as conn:
+    conn.execute("""
+        INSERT INTO training_runs (run_id, created_at, status, config_json)
+        VALUES ('ts_c_i-0003', '2025-01-07T02:00:00+02:00', 'running', '{}')
+    """)
+assert get_run("ts_a_i-0001")['created_ms'] == JAN_6 + 500
+assert get_run("ts_b_i-0002")['created_ms'] == JAN_6 + 12 * HOUR
+assert get_run("ts_c_i-0003")['created_ms'] == JAN_6 + 24 * HOUR
+assert get_run("ts_a_i-0001")['updated_ms'] is not None
+
+update_run_status("ts_a_i-0001", 'completed',
+                  started_at=datetime(2025, 1, 6, 1), ended_at=datetime(2025, 1, 6, 4))
+update_run_status("ts_b_i-0002", 'completed',
+                  started_at='2025-01-06T13:00:00Z', ended_at='2025-01-06 14:30:00')
+run = get_run("ts_a_i-0001")
+assert (run['started_ms'], run['ended_ms']) == (JAN_6 + HOUR, JAN_6 + 4 * HOUR)
+
+insert_objective("ts_a_i-0001", 'COMT_activity', weight=1.0, direction='maximize')
+insert_objective("ts_b_i-0002", 'COMT_activity', weight=1.0, direction='maximize')
+with get_connection() as conn:
+    generation = conn.execute(
+        "SELECT generation FROM objectives_catalog WHERE objective_name = 'COMT_activity'"
+    ).fetchone()[0]
+assert generation == 2  # Every insert invalidates cached objective statistics
+with get_connection() as conn:
+    conn.execute("UPDATE run_objectives SET updated_at = '2025-01-08T00:00:00Z' WHERE run_id = 'ts_a_i-0001'")
+    stamped = conn.execute("SELECT created_ms, updated_ms FROM run_objectives WHERE run_id = 'ts_a_i-0001'").fetchone()
+assert stamped[0] is not None and stamped[1] == JAN_6 + 48 * HOUR
+update_objective_metric("ts_a_i-0001", 'COMT_activity', 'raw_mean', 0.5)
+with get_connection() as conn:
+    updated = conn.execute("SELECT updated_ms FROM run_objectives WHERE run_id = 'ts_a_i-0001'").fetchone()[0]
+assert updated > JAN_6 + 48 * HOUR
+print("   ✓ created/started/ended/updated ms match the stored text")
+
+# Test 3: Time-range queries
+print("\n3. Time-range queries...")
+# '2025-01-06 12:00:00' sorts before '2025-01-06T06...' as text; as epoch ms it is after
+assert [r['run_id'] for r in query_runs({'created_after': '2025-01-06T06:00:00Z'})] == ["ts_c_i-0003", "ts_b_i-0002"]
+between = query_runs_between('2025-01-06', JAN_6 + 24 * HOUR)
+assert [r['run_id'] for r in between] == ["ts_a_i-0001", "ts_b_i-0002"]
+assert [r['run_id'] for r in query_runs_between(datetime(2025, 1, 6, 3), field='ended')] == ["ts_a_i-0001", "ts_b_i-0002"]
+assert query_runs_between('2025-01-06', field='started', filters={'status': 'running'}) == []
+try:
+    query_runs_between(field='deleted')
+    raise AssertionError("unknown field accepted")
+except ValueError:
+    pass
+with get_connection() as conn:
+    plan = ' '.join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM training_runs WHERE created_ms >= ? AND created_ms < ? ORDER BY created_ms",
+        (JAN_6, JAN_6 + HOUR)
+    ))
+assert 'idx_runs_created_ms' in plan and 'TEMP B-TREE' not in plan, plan
+print("   ✓ Ranges compare epoch ms on idx_runs_*_ms")
+
+# Test 4: Duration rollups
+print("\n4. Duration rollups...")
+rollup = summarize_durations(group_by='status')
+completed = next(row for row in rollup if row['group'] == 'completed')
+assert completed['runs'] == 2 and completed['timed'] == 2
+assert completed['total_hours'] == 4.5 and completed['min_hours'] == 1.5 and completed['max_hours'] == 3.0
+running = next(row for row in rollup if row['group'] == 'running')
+assert running['timed'] == 0 and running['total_hours'] is None
+assert summarize_durations('status', {'ended_after': datetime(2025, 1, 6, 10)})[0]['total_hours'] == 1.5
+print("   ✓ ended_ms - started_ms summed per group in SQL")
+
+# Test 5: Backfill of a version-8 database
+print("\n5. v9 backfill...")
+old_path = os.path.join(TEST_DIR, 'v8.db')
+migrate(old_path, target=8, verbose=False)
+conn = sqlite3.connect(old_path)
+conn.executemany(
+    "INSERT INTO training_runs (run_id, created_at, started_at, ended_at, status, config_json) VALUES (?, ?, ?, ?, ?, '{}')",
+    [(f"old_{n}_i-{n:04x}", f"2025-01-06T{n:02d}:00:00Z", f"2025-01-06 {n:02d}:30:00", None, 'completed')
+     for n in range(10)]
+)
+conn.commit()
+conn.close()
+assert migrate(old_path, chunk_size=3, verbose=False) == 9
+conn = sqlite3.connect(old_path)
+assert get_schema_version(conn) == 9
+rows = conn.execute("SELECT created_ms, started_ms, ended_ms, updated_ms FROM training_runs ORDER BY rowid").fetchall()
+conn.close()
+assert [row[0] for row in rows] == [JAN_6 + n * HOUR for n in range(10)]
+assert [row[1] for row in rows] == [JAN_6 + n * HOUR + HOUR // 2 for n in range(10)]
+assert all(row[2] is None and row[3] is not None for row in rows)
+print("   ✓ Existing rows backfilled in chunks")
+
+# Test 6: Maintenance writes keep updated_ms
+print("\n6. Backfills are not updates...")
+with get_connection() as conn:
+    conn.execute("UPDATE training_runs SET updated_ms = 1, config_json = '{\"training\": {\"batch_size\": 8}}'")
+assert run_parallel_backfill(HYPERPARAMETERS, workers=1, verbose=False) == 3
+assert all(run['updated_ms'] == 1 for run in query_runs())
+assert get_run("ts_a_i-0001")['batch_size'] == 8
+with get_connection() as conn:
+    conn.execute("UPDATE training_runs SET run_name = 'renamed' WHERE run_id = 'ts_a_i-0001'")
+assert get_run("ts_a_i-0001")['updated_ms'] > JAN_6
+print("   ✓ Hyperparameter backfill leaves updated_ms alone; user-facing writes stamp it")
+
+# Test 7: Upgrade of a pre-versioning database
+print("\n7. v1 upgrade...")
+v1_path = os.path.join(TEST_DIR, 'v1.db')
+conn = sqlite3.connect(v1_path)
+conn.executescript((SCHEMA_DIR / 'schema.sql').read_text())
+conn.execute("""
+    INSERT INTO training_runs (run_id, created_at, started_at, status, config_json)
+    VALUES ('v1_run_i-0001', '2025-01-06T00:00:00Z', '2025-01-06T01:00:00Z', 'running', '{}')
+""")
+conn.commit()
+conn.close()
+assert migrate(v1_path, verbose=False) == SCHEMA_VERSION
+conn = sqlite3.connect(v1_path)
+assert conn.execute("SELECT created_ms, started_ms FROM training_runs").fetchone() == (JAN_6, JAN_6 + HOUR)
+objective_id = conn.execute(
+    "INSERT INTO objectives_catalog (objective_name) VALUES ('COMT_activity')"
+).lastrowid
+conn.execute("INSERT INTO run_objectives (run_id, objective_id, updated_ms) VALUES ('v1_run_i-0001', ?, 0)",
+             (objective_id,))
+assert conn.execute("SELECT generation FROM objectives_catalog").fetchone()[0] == 1
+conn.close()
+print(f"   ✓ Legacy database migrated to v{SCHEMA_VERSION}; generation bumps on every insert")
+
+print("\n" + "=" * 80)
+print("ALL TESTS PASSED ✓")
+print("=" * 80)
@@ -0,0 +1,366 @@
+"""
+On-disk W&B Response Cache
+
+Keeps W&B run metadata, summaries and full histories in a local SQLite file so
+unchanged runs are served without network calls:
+
+- snapshots (state, URLs, summary) of running runs are re-fetched after a short
+  TTL; runs that are no longer running rarely change and are trusted for hours,
+  so a resumed run is still noticed
+- histories are keyed by the run's W&B update time and last history step, so
+  scan_history() only runs again when the run has logged something new
+- history tails (the last few steps, see get_run_tail) are cached the same way
+
+The file is bounded to max_bytes; least recently used entries are evicted first.
+
+Usage:
+    from training_db.wandb_cache import get_cache, get_run_history, get_run_snapshot
+
+    snapshot = get_run_snapshot(api, f"{entity}/{project}/{run_id}")
+    history = get_run_history(api, f"{entity}/{project}/{run_id}", snapshot=snapshot)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_CACHE_PATH = os.path.expanduser('~/mango/data/wandb_cache.db')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_SNAPSHOT_TTL = 60.0  # Seconds a running run's snapshot is trusted
+DEFAULT_FINISHED_SNAPSHOT_TTL = 6 * 3600.0  # Same for finished runs, which can still be resumed
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS wandb_cache (
+    key TEXT NOT NULL,
+    kind TEXT NOT NULL,             -- 'snapshot', 'history', 'tail', ...
+    version TEXT,
+    payload BLOB NOT NULL,          -- zlib-compressed JSON
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (key, kind)
+);
+CREATE INDEX IF NOT EXISTS idx_wandb_cache_last_access ON wandb_cache(last_access);
+"""
+
+
+def cache_path() -> str:
+    """Cache file: WANDB_CACHE_PATH, read at call time, else DEFAULT_CACHE_PATH."""
+    return os.environ.get('WANDB_CACHE_PATH', DEFAULT_CACHE_PATH)
+
+
+def _plain(value: Any) -> Any:
+    """Convert W&B summary objects (SummarySubDict etc.) into JSON-safe values."""
+    if hasattr(value, 'items'):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+class WandbCache:
+    """Size-bounded LRU cache of W&B responses in a SQLite file."""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path or cache_path()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.executescript(CACHE_SCHEMA)
+
+    def get(
+        self,
+        key: str,
+        kind: str,
+        version: Optional[str] = None
+    ) -> Optional[Any]:
+        """
+        Look up an entry
+
+        Args:
+            key: Run path ("entity/project/run_id")
+            kind: Entry kind ('snapshot', 'history')
+            version: Required version; None accepts any
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, payload FROM wandb_cache WHERE key = ? AND kind = ?",
+                (key, kind)
+            ).fetchone()
+
+            if row is None or (version is not None and row[0] != version):
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE wandb_cache SET last_access = ? WHERE key = ? AND kind = ?",
+                (now, key, kind)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(zlib.decompress(row[1]))
+
+    def put(self, key: str, kind: str, value: Any, version: Optional[str] = None) -> None:
+        """Store an entry, evicting least recently used entries beyond max_bytes."""
+        payload = zlib.compress(json.dumps(_plain(value)).encode())
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO wandb_cache (
+                    key, kind, version, payload, size, fetched_at, last_access
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (key, kind, version, payload, len(payload), now, now))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM wandb_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        cursor = self._conn.execute(
+            "SELECT key, kind, size FROM wandb_cache ORDER BY last_access"
+        )
+        victims = []
+        for key, kind, size in cursor:
+            if total <= self.max_bytes:
+                break
+            victims.append((key, kind))
+            total -= size
+
+        self._conn.executemany("DELETE FROM wandb_cache WHERE key = ? AND kind = ?", victims)
+
+    def invalidate(self, key: str) -> None:
+        """Drop all entries of one run."""
+        with self._lock:
+            self._conn.execute("DELETE FROM wandb_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._conn.execute("DELETE FROM wandb_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Entry count, stored bytes, and hits/misses of this process."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM wandb_cache"
+            ).fetchone()
+        return {'entries': entries, 'bytes': size, 'hits': self.hits, 'misses': self.misses}
+
+
+_caches: Dict[str, WandbCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(path: Optional[str] = None) -> WandbCache:
+    """Get the process-wide cache for a cache file (default: cache_path())."""
+    path = path or cache_path()
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = WandbCache(path)
+        return cache
+
+
+# ============================================================================
+# Cached W&B reads
+# ============================================================================
+
+def _last_step(run) -> Optional[int]:
+    attrs = getattr(run, '_attrs', None) or {}
+    return (attrs.get('historyKeys') or {}).get('lastStep', attrs.get('historyLineCount'))
+
+
+def run_version(run) -> Optional[str]:
+    """
+    Version of a W&B run without extra API calls
+
+    Built from the attributes the run query already returned: the update time
+    (heartbeatAt for the public API) and the last history step. None if the run
+    object carries neither.
+    """
+    attrs = getattr(run, '_attrs', None) or {}
+    updated_at = attrs.get('updatedAt') or attrs.get('heartbeatAt')
+    last_step = _last_step(run)
+    if updated_at is None and last_step is None:
+        return None
+    return f"{updated_at}|{last_step}"
+
+
+def snapshot_run(run) -> Dict[str, Any]:
+    """Everything the sync needs from a W&B run object, as plain data."""
+    created_at = getattr(run, 'created_at', None)
+    if created_at is not None and not isinstance(created_at, str):
+        created_at = created_at.isoformat() + 'Z'
+
+    return {
+        'id': run.id,
+        'name': getattr(run, 'name', None),
+        'url': run.url,
+        'state': run.state,
+        'created_at': created_at,
+        'summary': _plain(run.summary) if run.summary else {},
+        'last_step': _last_step(run),
+        'version': run_version(run),
+    }
+
+
+def get_run_snapshot(
+    api,
+    run_path: str,
+    cache: Optional[WandbCache] = None,
+    ttl: Optional[float] = None,
+    call: Optional[Callable] = None,
+    finished_ttl: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Snapshot of a run, from cache while it is unlikely to have changed
+
+    Running runs are re-fetched once their snapshot is older than `ttl`; runs
+    that are no longer running once it is older than `finished_ttl`, so a
+    resumed run is picked up again.
+
+    Args:
+        api: wandb.Api() (or a compatible fake)
+        run_path: "entity/project/run_id"
+        cache: Cache to use (default: get_cache())
+        ttl: Seconds a running run's snapshot stays valid (default: DEFAULT_SNAPSHOT_TTL)
+        call: Wrapper for the API call, e.g. partial(call_with_backoff, limiter=...)
+        finished_ttl: Seconds a finished run's snapshot stays valid
+            (default: DEFAULT_FINISHED_SNAPSHOT_TTL)
+    """
+    cache = cache or get_cache()
+    ttl = DEFAULT_SNAPSHOT_TTL if ttl is None else ttl
+    finished_ttl = DEFAULT_FINISHED_SNAPSHOT_TTL if finished_ttl is None else finished_ttl
+    snapshot = cache.get(run_path, 'snapshot')
+    if snapshot is not None:
+        limit = ttl if snapshot['state'] == 'running' else finished_ttl
+        if time.time() - snapshot.get('cached_at', 0) <= limit:
+            return snapshot
+
+    run = call(api.run, run_path) if call else api.run(run_path)
+    return cache_snapshot(run_path, run, cache)
+
+
+def cache_snapshot(run_path: str, run, cache: Optional[WandbCache] = None) -> Dict[str, Any]:
+    """Snapshot a run object that was fetched anyway (e.g. by a name search) and cache it."""
+    cache = cache or get_cache()
+    snapshot = snapshot_run(run)
+    snapshot['cached_at'] = time.time()
+    snapshot['_run'] = run
+    cache.put(run_path, 'snapshot', {k: v for k, v in snapshot.items() if k != '_run'})
+    return snapshot
+
+
+def get_run_history(
+    api,
+    run_path: str,
+    cache: Optional[WandbCache] = None,
+    snapshot: Optional[Dict[str, Any]] = None,
+    call: Optional[Callable] = None
+) -> List[Dict[str, Any]]:
+    """
+    Full history rows of a run (run.scan_history()), cached by run version
+
+    Runs whose version is unknown are always fetched.
+
+    Args:
+        api: wandb.Api() (or a compatible fake)
+        run_path: "entity/project/run_id"
+        cache: Cache to use (default: get_cache())
+        snapshot: Snapshot from get_run_snapshot(), to avoid fetching it again
+        call: Wrapper for API calls, e.g. partial(call_with_backoff, limiter=...)
+    """
+    cache = cache or get_cache()
+    snapshot = snapshot or get_run_snapshot(api, run_path, cache, call=call)
+
+    version = snapshot['version']
+    if version is not None:
+        history = cache.get(run_path, 'history', version=version)
+        if history is not None:
+            return history
+
+    run = snapshot.get('_run')
+    if run is None:
+        run = call(api.run, run_path) if call else api.run(run_path)
+
+    scan = lambda: list(run.scan_history())
+    history = call(scan) if call else scan()
+    if version is not None:
+        cache.put(run_path, 'history', history, version=version)
+    return history
+
+
+def get_run_tail(
+    api,
+    run_path: str,
+    steps: int,
+    cache: Optional[WandbCache] = None,
+    snapshot: Optional[Dict[str, Any]] = None,
+    call: Optional[Callable] = None
+) -> List[Dict[str, Any]]:
+    """
+    History rows of the last `steps` steps only, cached by run version
+
+    Fetches scan_history(min_step=last_step - steps), so the transfer does not
+    grow with the length of the run. Falls back to the full history when the
+    last step is unknown.
+
+    Args:
+        api: wandb.Api() (or a compatible fake)
+        run_path: "entity/project/run_id"
+        steps: Number of trailing steps to fetch
+        cache: Cache to use (default: get_cache())
+        snapshot: Snapshot from get_run_snapshot(), to avoid fetching it again
+        call: Wrapper for API calls, e.g. partial(call_with_backoff, limiter=...)
+    """
+    cache = cache or get_cache()
+    snapshot = snapshot or get_run_snapshot(api, run_path, cache, call=call)
+
+    last_step = snapshot.get('last_step')
+    if last_step is None:
+        return get_run_history(api, run_path, cache, snapshot=snapshot, call=call)
+
+    version = snapshot['version']
+    if version is not None:
+        tail = cache.get(run_path, 'tail', version=f"{version}|{steps}")
+        if tail is not None:
+            return tail
+
+    run = snapshot.get('_run')
+    if run is None:
+        run = call(api.run, run_path) if call else api.run(run_path)
+
+    scan = lambda: list(run.scan_history(min_step=max(0, last_step - steps + 1)))
+    tail = call(scan) if call else scan()
+    if version is not None:
+        cache.put(run_path, 'tail', tail, version=f"{version}|{steps}")
+    return tail
+
+
+def final_record(history: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Last logged value of every key in a history."""
+    record = {}
+    for row in history:
+        record.update((key, value) for key, value in row.items() if value is not None)
+    return record
@@ -0,0 +1,340 @@
+"""
+W&B Client Interface
+
+Everything in training_db that talks to W&B takes an API object with the
+subset of wandb.Api used here (WandbApi below). get_api() returns the real
+client, or a local stand-in when WANDB_FAKE is set:
+
+    WANDB_FAKE=synthetic:200        # 200 generated runs
+    WANDB_FAKE=/tmp/recording.json  # runs recorded with record_runs()
+
+FakeWandbApi serves runs, summaries and paginated histories from memory with
+configurable latency, error rate and history length, so sync throughput can be
+measured and tested offline (see scripts/benchmark_sync.py, test_run_sync.py).
+
+Usage:
+    from training_db.wandb_client import FakeWandbApi, get_api, synthetic_runs
+
+    api = get_api()
+    api = FakeWandbApi(synthetic_runs(500, history_length=2000), latency=0.2, error_rate=0.05)
+"""
+
+import json
+import math
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol, Tuple
+
+from .wandb_cache import _plain
+
+DEFAULT_PAGE_SIZE = 1000  # History rows per page (wandb's scan_history default)
+DEFAULT_ENTITY = 'michael-nagle-lieber-institute-for-brain-development-joh'
+DEFAULT_PROJECT = 'cluster-pareto-grpo-safe'
+
+
+class WandbRun(Protocol):
+    """The parts of wandb.apis.public.Run that training_db uses."""
+
+    id: str
+    name: str
+    url: str
+    state: str
+    created_at: str
+    summary: Dict[str, Any]
+
+    def scan_history(self, page_size: int = DEFAULT_PAGE_SIZE, min_step: Optional[int] = None) -> Iterator[Dict]:
+        ...
+
+
+class WandbApi(Protocol):
+    """The parts of wandb.Api that training_db uses."""
+
+    def run(self, path: str) -> WandbRun:
+        ...
+
+    def runs(self, path: str, filters: Optional[Dict] = None, order: Optional[str] = None) -> Iterable[WandbRun]:
+        ...
+
+
+def get_api(**kwargs) -> WandbApi:
+    """
+    W&B client for this process
+
+    Returns FakeWandbApi when WANDB_FAKE is set ("synthetic:N" or a recording
+    path), otherwise wandb.Api(**kwargs).
+    """
+    fake = os.environ.get('WANDB_FAKE')
+    if fake:
+        if fake.startswith('synthetic:'):
+            return FakeWandbApi(synthetic_runs(int(fake.split(':', 1)[1])))
+        return FakeWandbApi.load(fake)
+
+    import wandb
+    return wandb.Api(**kwargs)
+
+
+def wandb_project() -> Tuple[str, str]:
+    """(entity, project) from WANDB_ENTITY / WANDB_PROJECT, with the training defaults."""
+    return (
+        os.environ.get('WANDB_ENTITY', DEFAULT_ENTITY),
+        os.environ.get('WANDB_PROJECT', DEFAULT_PROJECT),
+    )
+
+
+# ============================================================================
+# Local stand-in
+# ============================================================================
+
+class FakeRun:
+    """In-memory W&B run with a paginated history."""
+
+    def __init__(
+        self,
+        api: 'FakeWandbApi',
+        run_id: str,
+        name: str,
+        state: str,
+        created_at: str,
+        summary: Dict[str, Any],
+        history: List[Dict[str, Any]],
+        heartbeat_at: Optional[str] = None
+    ):
+        self._api = api
+        self.id = run_id
+        self.name = name
+        self.url = f"https://wandb.ai/{api.entity}/{api.project}/runs/{run_id}"
+        self.state = state
+        self.created_at = created_at
+        self.summary = summary
+        self.history_rows = history
+        self.heartbeat_at = heartbeat_at or created_at
+
+    @property
+    def _attrs(self) -> Dict[str, Any]:
+        # What run_version() reads from a real run's GraphQL attributes
+        last_step = self.history_rows[-1].get('_step', len(self.history_rows) - 1) if self.history_rows else -1
+        return {'heartbeatAt': self.heartbeat_at, 'historyKeys': {'lastStep': last_step}}
+
+    def scan_history(self, page_size: int = DEFAULT_PAGE_SIZE, min_step: Optional[int] = None) -> Iterator[Dict]:
+        """Yield history rows, paying one API call (latency, errors) per page."""
+        rows = self.history_rows
+        if min_step is not None:
+            rows = [row for row in rows if row.get('_step', 0) >= min_step]
+        for start in range(0, max(len(rows), 1), page_size):
+            self._api._call(f"history:{self.id}:{start}")
+            for row in rows[start:start + page_size]:
+                yield dict(row)
+
+    def log(self, row: Dict[str, Any], state: Optional[str] = None) -> None:
+        """Append a history step (and update summary/heartbeat) as a live run would."""
+        row = dict(row)
+        row.setdefault('_step', len(self.history_rows))
+        self.history_rows.append(row)
+        self.summary.update({k: v for k, v in row.items() if not k.startswith('_')})
+        self.heartbeat_at = datetime.utcnow().isoformat()
+        if state is not None:
+            self.state = state
+
+
+class FakeWandbApi:
+    """
+    wandb.Api stand-in serving runs from memory
+
+    Args:
+        runs: Run dicts (see synthetic_runs() / record_runs() for the format)
+        latency: Seconds per API call (run lookup, listing page, history page)
+        error_rate: Probability that a call raises ConnectionError
+        fail_first: Fail the first call for every distinct request (deterministic
+            transient errors, for testing retries)
+        per_page: Runs per listing page
+        seed: Seed for error injection
+    """
+
+    def __init__(
+        self,
+        runs: Iterable[Dict[str, Any]] = (),
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        fail_first: bool = False,
+        per_page: int = 50,
+        entity: str = 'fake',
+        project: str = 'project',
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail_first = fail_first
+        self.per_page = per_page
+        self.entity = entity
+        self.project = project
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._runs: Dict[str, FakeRun] = {}
+        self._failed = set()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        for run in runs:
+            self.add_run(**run)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'FakeWandbApi':
+        """Serve runs recorded with record_runs()."""
+        with open(path) as f:
+            recording = json.load(f)
+        kwargs.setdefault('entity', recording.get('entity', 'fake'))
+        kwargs.setdefault('project', recording.get('project', 'project'))
+        return cls(recording['runs'], **kwargs)
+
+    def add_run(
+        self,
+        id: str,
+        name: str,
+        state: str = 'finished',
+        created_at: Optional[str] = None,
+        summary: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, Any]]] = None,
+        heartbeat_at: Optional[str] = None
+    ) -> FakeRun:
+        run = FakeRun(
+            self, id, name, state,
+            created_at or datetime.utcnow().isoformat() + 'Z',
+            dict(summary or {}),
+            list(history or []),
+            heartbeat_at,
+        )
+        self._runs[id] = run
+        return run
+
+    def get(self, run_id: str) -> FakeRun:
+        """Direct access to a fake run (no latency, no errors)."""
+        return self._runs[run_id]
+
+    def _call(self, key: str) -> None:
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = (self.fail_first and key not in self._failed) or self._random.random() < self.error_rate
+            self._failed.add(key)
+            if fail:
+                self.errors += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.in_flight -= 1
+        if fail:
+            raise ConnectionError(f"Injected W&B error ({key})")
+
+    def run(self, path: str) -> FakeRun:
+        run_id = path.split('/')[-1]
+        self._call(f"run:{run_id}")
+        if run_id not in self._runs:
+            raise ValueError(f"Could not find run {path}")
+        return self._runs[run_id]
+
+    def runs(self, path: str, filters: Optional[Dict] = None, order: Optional[str] = None) -> Iterator[FakeRun]:
+        """
+        Paginated listing; supports the filters training_db sends
+
+        filters: {"display_name": name} and/or {"createdAt": {"$gte"|"$gt": iso}}
+        order: "[+-]created_at" (default: newest first, like W&B)
+        """
+        filters = filters or {}
+        runs = sorted(self._runs.values(), key=lambda run: run.created_at,
+                      reverse=not (order or '-').startswith('+'))
+
+        if 'display_name' in filters:
+            runs = [run for run in runs if run.name == filters['display_name']]
+        created = filters.get('createdAt') or {}
+        if '$gte' in created:
+            runs = [run for run in runs if run.created_at >= created['$gte']]
+        if '$gt' in created:
+            runs = [run for run in runs if run.created_at > created['$gt']]
+
+        for start in range(0, max(len(runs), 1), self.per_page):
+            self._call(f"runs:{path}:{json.dumps(filters, sort_keys=True)}:{start}")
+            yield from runs[start:start + self.per_page]
+
+
+def synthetic_runs(
+    count: int,
+    history_length: int = 200,
+    objectives: Iterable[str] = ('COMT_activity_maximize', 'QED_maximize', 'KCNH2_activity_minimize'),
+    running_fraction: float = 0.2,
+    seed: int = 0,
+    start: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """
+    Generate run dicts for FakeWandbApi
+
+    Histories log loss plus objectives/<alias>/raw_mean for every objective,
+    shaped like GRPO training curves; summaries hold the last value of each.
+    """
+    rng = random.Random(seed)
+    start = start or datetime(2025, 1, 1)
+    objectives = list(objectives)
+    runs = []
+
+    for i in range(count):
+        created = start + timedelta(minutes=7 * i)
+        rates = {alias: rng.uniform(0.002, 0.02) for alias in objectives}
+        history = []
+        for step in range(history_length):
+            row = {'_step': step, '_runtime': 30.0 * step, 'loss': 1.0 / math.sqrt(step + 1)}
+            for alias, rate in rates.items():
+                row[f"objectives/{alias}/raw_mean"] = 1 - math.exp(-rate * step) + rng.gauss(0, 0.01)
+            history.append(row)
+
+        summary = dict(history[-1]) if history else {}
+        summary.pop('_step', None)
+        runs.append({
+            'id': f"run{i:05d}",
+            'name': f"config{i % 50:02d}_{created.strftime('%Y%m%d_%H%M')}",
+            'state': 'running' if rng.random() < running_fraction else 'finished',
+            'created_at': created.isoformat() + 'Z',
+            'summary': summary,
+            'history': history,
+        })
+
+    return runs
+
+
+def record_runs(api: WandbApi, paths: Iterable[str], out_path: str) -> int:
+    """
+    Record real W&B runs (metadata, summary, full history) for FakeWandbApi.load()
+
+    Args:
+        api: wandb.Api()
+        paths: Run paths ("entity/project/run_id")
+        out_path: JSON file to write
+
+    Returns:
+        Number of runs recorded
+    """
+    recorded = []
+    entity = project = None
+    for path in paths:
+        entity, project, _ = path.split('/')
+        run = api.run(path)
+        created_at = run.created_at if isinstance(run.created_at, str) else run.created_at.isoformat() + 'Z'
+        recorded.append({
+            'id': run.id,
+            'name': run.name,
+            'state': run.state,
+            'created_at': created_at,
+            'heartbeat_at': (getattr(run, '_attrs', None) or {}).get('heartbeatAt'),
+            'summary': _plain(run.summary),
+            'history': _plain(list(run.scan_history())),
+        })
+
+    with open(out_path, 'w') as f:
+        json.dump({'entity': entity, 'project': project, 'runs': recorded}, f)
+    return len(recorded)
@@ -3,15 +3,22 @@ W&B Data Synchronization
 
 Syncs training run data from W&B to the local database.
 Populates objectives, metrics, and run metadata.
+
+Final objective values are read from the run summary (part of the run query)
+rather than the run history; only objectives missing from the summary cost a
+history fetch, and that fetch is limited to the last SUMMARY_TAIL_STEPS steps.
 """
 
-import os
-import yaml
-import wandb
+import math
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
+
+from .catalog import parse_metric_key
+from .objectives import get_run_objectives, insert_objective, update_objective_metrics
+from .wandb_cache import final_record, get_run_snapshot, get_run_tail
+from .wandb_client import get_api, wandb_project
 
-from .objectives import insert_objective, update_objective_metric
+SUMMARY_TAIL_STEPS = 50  # History steps fetched when the summary lacks an objective
 
 
 def parse_config_objectives(config_path: str) -> List[Dict]:
@@ -34,6 +41,8 @@ def parse_config_objectives(config_path: str) -> List[Dict]:
             print(f"Config file not found: {config_path}")
             return []
 
+        import yaml  # Only needed here; keeps yaml out of trainers' import time
+
         with open(config_file, 'r') as f:
             config = yaml.safe_load(f)
 
@@ -55,6 +64,70 @@ def parse_config_objectives(config_path: str) -> List[Dict]:
         return []
 
 
+def _run_path(wandb_run_id: str) -> str:
+    entity, project = wandb_project()
+    return f"{entity}/{project}/{wandb_run_id}"
+
+
+def objective_metrics(record: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """
+    Objective metric values in a W&B summary or final history record
+
+    Returns:
+        {objective_name: {metric_type: value}}; non-numeric and NaN values are skipped
+    """
+    metrics: Dict[str, Dict[str, float]] = {}
+    for key, value in record.items():
+        # Format: objectives/osimertinib_phco_dissim_minimize/raw_mean
+        parsed = parse_metric_key(key)
+        if parsed is None or isinstance(value, bool):
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+        if not math.isnan(value):
+            metrics.setdefault(parsed[0], {})[parsed[3]] = value
+    return metrics
+
+
+def fetch_final_metrics(
+    api,
+    run_path: str,
+    objective_names: Optional[Iterable[str]] = None,
+    tail_steps: int = SUMMARY_TAIL_STEPS,
+    **kwargs
+) -> Dict[str, Dict[str, float]]:
+    """
+    Final objective metrics of a W&B run, summary first
+
+    Objectives in objective_names whose raw_mean is missing from the summary
+    are looked up in the last tail_steps history steps; values found in the
+    summary take precedence.
+
+    Args:
+        api: wandb.Api() (or a compatible fake)
+        run_path: "entity/project/run_id"
+        objective_names: Objectives the caller needs (default: whatever the summary has)
+        tail_steps: History steps to fetch for missing objectives
+        **kwargs: cache / call, passed to the wandb_cache readers
+
+    Returns:
+        {objective_name: {metric_type: value}}
+    """
+    snapshot = get_run_snapshot(api, run_path, **kwargs)
+    metrics = objective_metrics(snapshot['summary'])
+
+    missing = [name for name in objective_names or () if 'raw_mean' not in metrics.get(name, {})]
+    if missing:
+        tail = get_run_tail(api, run_path, tail_steps, snapshot=snapshot, **kwargs)
+        for name, values in objective_metrics(final_record(tail)).items():
+            for metric_type, value in values.items():
+                metrics.setdefault(name, {}).setdefault(metric_type, value)
+
+    return metrics
+
+
 def sync_run_objectives_from_config(run_id: str, config_path: str) -> int:
     """
     Sync objectives from config file to database
@@ -89,6 +162,9 @@ def sync_run_metrics_from_wandb(run_id: str, wandb_run_id: str) -> int:
     """
     Sync objective metric values from W&B to database
 
+    Fills raw_mean, normalized_mean, raw_std and normalized_std of every
+    objective in one pass, from the run summary (see fetch_final_metrics).
+
     Args:
         run_id: Run identifier
         wandb_run_id: W&B run ID
@@ -97,56 +173,13 @@ def sync_run_metrics_from_wandb(run_id: str, wandb_run_id: str) -> int:
         Number of metrics updated
     """
     try:
-        # Get run data with metrics directly from W&B API
-        entity = os.environ.get('WANDB_ENTITY', 'michael-nagle-lieber-institute-for-brain-development-joh')
-        project = os.environ.get('WANDB_PROJECT', 'cluster-pareto-grpo-safe')
-
-        api = wandb.Api()
-        run = api.run(f"{entity}/{project}/{wandb_run_id}")
-
-        # Get metrics history
-        history = run.history(samples=10000)
-        if history.empty:
-            return 0
-
-        metrics = history.to_dict('records')
-        if not metrics or len(metrics) == 0:
+        # Objectives registered for the run are the ones worth a tail fetch
+        wanted = [obj['objective_name'] for obj in get_run_objectives(run_id)]
+        metrics = fetch_final_metrics(get_api(), _run_path(wandb_run_id), wanted)
+        if not metrics:
             return 0
 
-        # Get the final record (last training step)
-        final_record = metrics[-1]
-
-        count = 0
-
-        # Find all objective metrics and update database
-        for key, value in final_record.items():
-            if key.startswith('objectives/') and '/raw_mean' in key:
-                # Extract objective name
-                # Format: objectives/osimertinib_phco_dissim_minimize/raw_mean
-                # We want: osimertinib_phco_dissim
-                parts = key.replace('objectives/', '').split('/')
-                if len(parts) >= 2:
-                    obj_full_name = parts[0]
-
-                    # Remove _maximize/_minimize suffix to get base name
-                    if obj_full_name.endswith('_maximize'):
-                        obj_name = obj_full_name.replace('_maximize', '')
-                    elif obj_full_name.endswith('_minimize'):
-                        obj_name = obj_full_name.replace('_minimize', '')
-                    else:
-                        obj_name = obj_full_name
-
-                    # Update the metric
-                    if value is not None and str(value) != 'nan':
-                        update_objective_metric(
-                            run_id=run_id,
-                            objective_name=obj_name,
-                            metric_type='raw_mean',
-                            value=float(value)
-                        )
-                        count += 1
-
-        return count
+        return update_objective_metrics(run_id, metrics)
 
     except Exception as e:
         print(f"Error syncing metrics from W&B for {run_id}: {e}")
@@ -226,28 +259,14 @@ def get_objectives_display_data(run_id: str, config_path: Optional[str] = None,
         # Try to get values from W&B
         if wandb_run_id:
             try:
-                entity = os.environ.get('WANDB_ENTITY', 'michael-nagle-lieber-institute-for-brain-development-joh')
-                project = os.environ.get('WANDB_PROJECT', 'cluster-pareto-grpo-safe')
-
-                api = wandb.Api()
-                run = api.run(f"{entity}/{project}/{wandb_run_id}")
-
-                history = run.history(samples=10000)
-                if not history.empty:
-                    metrics = history.to_dict('records')
-                    if metrics and len(metrics) > 0:
-                        final_record = metrics[-1]
-
-                        # Match W&B metrics to config objectives
-                        for obj in config_objs:
-                            obj_name = obj['name']
-
-                            # Try to find matching metric in W&B data
-                            for key, value in final_record.items():
-                                if key.startswith('objectives/') and obj_name in key and '/raw_mean' in key:
-                                    if value is not None and str(value) != 'nan':
-                                        obj['raw_mean'] = float(value)
-                                        break
+                # Cached: unchanged runs cost no W&B calls on re-render
+                metrics = fetch_final_metrics(
+                    get_api(), _run_path(wandb_run_id), [obj['name'] for obj in config_objs]
+                )
+
+                # Match W&B metrics to config objectives
+                for obj in config_objs:
+                    obj.update(metrics.get(obj['name'], {}))
             except:
                 pass
 